@@ -0,0 +1,48 @@
+"""Compare per-job startup overhead of the download engines.
+
+Every job extracts metadata for a ``fake://`` URL (see fake_extractor.py),
+so the timings only contain interpreter startup, yt-dlp import, extractor
+initialisation and the engine's own bookkeeping.
+
+Usage:
+    python benchmarks/bench_engines.py [--jobs 20]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_extractor import make_youtube_dl
+from src.core.engines import InProcessEngine, SubprocessEngine
+
+def run(engine, jobs):
+    timings = []
+    for i in range(jobs):
+        start = time.perf_counter()
+        info = engine.extract_info(f"fake://job{i}")
+        timings.append(time.perf_counter() - start)
+        assert info['id'] == f"job{i}"
+    engine.close()
+    return timings
+
+def report(name, timings):
+    first, rest = timings[0], timings[1:] or timings
+    print(f"{name:<12} first job {first * 1000:8.1f} ms   "
+          f"mean of rest {sum(rest) / len(rest) * 1000:8.1f} ms   "
+          f"total {sum(timings):6.2f} s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=20)
+    args = parser.parse_args()
+
+    fake_cli = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_extractor.py")]
+    report("subprocess", run(SubprocessEngine(fake_cli), args.jobs))
+    report("inprocess", run(InProcessEngine(factory=make_youtube_dl), args.jobs))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Compare extraction throughput of thread and process workers by worker count.
+
+Every job extracts a ``cpu://`` URL (see fake_extractor.py), which spends
+its time in Python code the way a real extraction does. Threads share one
+GIL, so their throughput stays flat; worker processes should scale with
+the worker count up to the number of cores.
+
+Usage:
+    python benchmarks/bench_process_pool.py [--jobs 48] [--workers 1 2 4 8]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_extractor import make_youtube_dl
+from src.core.process_pool import ProcessYoutubeDLPool
+from src.core.ydl_pool import YoutubeDLPool
+
+OPTIONS = {'quiet': True, 'no_warnings': True, 'skip_download': True}
+
+def extract(pool, url):
+    with pool.lease(OPTIONS) as ydl:
+        return ydl.extract_info(url, download=False)
+
+def run(pool, workers, jobs):
+    """Jobs per second with ``workers`` threads leasing from ``pool``."""
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Starts the workers and warms their YoutubeDL instances
+        list(executor.map(lambda i: extract(pool, f"cpu://warmup{i}"), range(workers)))
+        start = time.perf_counter()
+        infos = list(executor.map(lambda i: extract(pool, f"cpu://job{i}"), range(jobs)))
+        elapsed = time.perf_counter() - start
+    pool.close()
+    assert [info['id'] for info in infos] == [f"job{i}" for i in range(jobs)]
+    return jobs / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=48)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} cores, {args.jobs} jobs per run")
+    print(f"{'workers':>7} {'threads':>12} {'processes':>12} {'speedup':>8}")
+    base = None
+    for workers in args.workers:
+        threads = run(YoutubeDLPool(factory=make_youtube_dl, max_idle=workers), workers, args.jobs)
+        processes = run(ProcessYoutubeDLPool(workers, factory=make_youtube_dl), workers, args.jobs)
+        base = base or processes
+        print(f"{workers:>7} {threads:>10.1f}/s {processes:>10.1f}/s {processes / base:>7.2f}x")
+
+if __name__ == '__main__':
+    main()
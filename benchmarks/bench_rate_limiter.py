@@ -0,0 +1,88 @@
+"""Measure achieved vs configured rate of RateLimiter under thread contention.
+
+Every thread acquires tokens in a loop for ``--seconds``. With ``--naive``
+the previous strategy (sleep ``cooldown`` between attempts) is measured as
+well, for comparison.
+
+Usage:
+    python benchmarks/bench_rate_limiter.py [--threads 64] [--rate 200] [--seconds 3] [--naive]
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from src.utils.rate_limiter import RateLimiter
+
+class PollingLimiter:
+    """The former algorithm: retry after a fixed cooldown sleep."""
+
+    def __init__(self, rate, period, burst, cooldown):
+        self.rate, self.period, self.burst, self.cooldown = rate, period, burst, cooldown
+        self.tokens = burst
+        self.last_update = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        start = time.monotonic()
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.last_update) * self.rate / self.period)
+                self.last_update = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                if timeout is not None and now - start >= timeout:
+                    return False
+            time.sleep(self.cooldown)
+
+def run(limiter, threads, seconds):
+    grants = []
+    lock = threading.Lock()
+    stop = time.monotonic() + seconds
+
+    def worker():
+        while True:
+            remaining = stop - time.monotonic()
+            if remaining <= 0 or not limiter.acquire(timeout=remaining):
+                return
+            with lock:
+                grants.append(time.monotonic())
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return grants
+
+def report(name, grants, rate, seconds):
+    achieved = len(grants) / seconds
+    gaps = [b - a for a, b in zip(grants, grants[1:])]
+    jitter = statistics.pstdev(gaps) * 1000 if len(gaps) > 1 else 0.0
+    print(f"{name:<8} configured {rate:8.1f}/s   achieved {achieved:8.1f}/s "
+          f"({achieved / rate * 100:5.1f}%)   gap stdev {jitter:6.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--rate", type=float, default=200.0, help="Tokens per second")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--cooldown", type=float, default=0.1, help="Sleep of the naive limiter")
+    parser.add_argument("--naive", action="store_true", help="Also run the polling limiter")
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads, {args.seconds:.1f} s, burst 1")
+    report("exact", run(RateLimiter(args.rate, 1, 1), args.threads, args.seconds), args.rate, args.seconds)
+    if args.naive:
+        naive = PollingLimiter(args.rate, 1, 1, args.cooldown)
+        report("polling", run(naive, args.threads, args.seconds), args.rate, args.seconds)
+
+if __name__ == '__main__':
+    main()
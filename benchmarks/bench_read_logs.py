@@ -0,0 +1,81 @@
+"""Benchmark reading the tail of large log files.
+
+Generates synthetic log files (several GB in total by default), then reads
+the last N lines with the block-wise reverse reader and, optionally, with
+the old ``readlines()`` approach. Each method runs in its own process so
+that the reported peak RSS is not polluted by the other.
+
+Usage:
+    python benchmarks/bench_read_logs.py [--size-gb 4] [--files 4] [--lines 200] [--naive]
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from src.utils.log_reader import read_last_lines
+
+LINE = "2024-01-01 12:00:00,000 - INFO - Downloaded chunk {:>10} of https://youtu.be/dQw4w9WgXcQ\n"
+
+def generate(directory, size_bytes, files):
+    paths = []
+    per_file = size_bytes // files
+    block = "".join(LINE.format(i) for i in range(10000)).encode()
+    for n in range(files):
+        path = os.path.join(directory, f"bench_{n}.log")
+        with open(path, 'wb') as f:
+            written = 0
+            while written < per_file:
+                f.write(block)
+                written += len(block)
+        os.utime(path, (n, n))
+        paths.append(path)
+    return paths
+
+def naive(paths, max_lines):
+    all_logs = []
+    for path in paths:
+        with open(path, 'r') as f:
+            all_logs.extend(f.readlines()[-max_lines:])
+    return all_logs[-max_lines:]
+
+def measure(method, paths, max_lines, results):
+    start = time.perf_counter()
+    lines = method(paths, max_lines)
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((len(lines), elapsed, peak_kb))
+
+def run(name, method, paths, max_lines):
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=measure, args=(method, paths, max_lines, results))
+    process.start()
+    count, elapsed, peak_kb = results.get()
+    process.join()
+    print(f"{name:<10} {count:>6} lines  {elapsed * 1000:10.1f} ms  peak RSS {peak_kb / 1024:8.1f} MiB")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-gb", type=float, default=4.0)
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--lines", type=int, default=200)
+    parser.add_argument("--naive", action="store_true", help="also run the readlines() approach")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        paths = generate(directory, int(args.size_gb * 1024 ** 3), args.files)
+        print(f"generated {args.size_gb} GB in {args.files} files in {time.perf_counter() - start:.1f} s")
+
+        run("tail", read_last_lines, paths, args.lines)
+        if args.naive:
+            run("readlines", naive, paths, args.lines)
+
+if __name__ == '__main__':
+    main()
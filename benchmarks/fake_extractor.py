@@ -0,0 +1,82 @@
+"""Local fake yt-dlp extractors used by the benchmarks.
+
+``fake://<id>`` URLs resolve to a small info dictionary without any network
+access, so timings measure engine overhead and not YouTube.
+``cpu://<id>`` URLs do the kind of work a real extraction spends its CPU
+time on, parsing a large JSON document and running regular expressions
+over a player script, before resolving the same way.
+
+Run this file directly to get a yt-dlp command line that knows the fake
+extractor, which is what the subprocess engine benchmark launches.
+"""
+import json
+import re
+import sys
+
+import yt_dlp
+from yt_dlp.extractor.common import InfoExtractor
+
+class FakeIE(InfoExtractor):
+    IE_NAME = 'fake'
+    _VALID_URL = r'fake://(?P<id>[^/?#]+)'
+
+    def _real_extract(self, url):
+        video_id = self._match_id(url)
+        return {
+            'id': video_id,
+            'title': f'Fake video {video_id}',
+            'url': f'http://127.0.0.1:9/{video_id}.mp4',
+            'ext': 'mp4',
+            'duration': 60
+        }
+
+# Stand-ins for an initial player response and a player script
+_PLAYER_RESPONSE = json.dumps({'streamingData': {'adaptiveFormats': [
+    {'itag': i, 'url': f'https://example.invalid/{i}?sig={"x" * 200}', 'bitrate': i * 1000,
+     'mimeType': 'video/mp4; codecs="avc1.4d401f"', 'qualityLabel': f'{i}p'}
+    for i in range(400)
+]}})
+_PLAYER_JS = ";".join(f"var f{i}=function(a){{a=a.split('');a.reverse();return a.join('')}}"
+                      for i in range(2000))
+_FUNCTION_RE = re.compile(r"var (f\d+)=function\(a\)\{([^}]*)\}")
+
+class CPUBoundIE(InfoExtractor):
+    IE_NAME = 'cpu'
+    _VALID_URL = r'cpu://(?P<id>[^/?#]+)'
+    _ROUNDS = 25  # Some 50 ms of CPU per extraction
+
+    def _real_extract(self, url):
+        video_id = self._match_id(url)
+        formats = []
+        for _ in range(self._ROUNDS):
+            formats = json.loads(_PLAYER_RESPONSE)['streamingData']['adaptiveFormats']
+            functions = dict(_FUNCTION_RE.findall(_PLAYER_JS))
+        return {
+            'id': video_id,
+            'title': f'CPU-bound video {video_id} ({len(formats)} formats, {len(functions)} functions)',
+            'url': f'http://127.0.0.1:9/{video_id}.mp4',
+            'ext': 'mp4',
+            'duration': 60
+        }
+
+def make_youtube_dl(options):
+    """Create a YoutubeDL that tries the fake extractors first."""
+    ydl = yt_dlp.YoutubeDL(options, auto_init=False)
+    ydl.add_info_extractor(FakeIE())
+    ydl.add_info_extractor(CPUBoundIE())
+    ydl.add_default_info_extractors()
+    return ydl
+
+def main(argv=None):
+    add_default = yt_dlp.YoutubeDL.add_default_info_extractors
+
+    def add_with_fake(ydl):
+        ydl.add_info_extractor(FakeIE())
+        ydl.add_info_extractor(CPUBoundIE())
+        add_default(ydl)
+
+    yt_dlp.YoutubeDL.add_default_info_extractors = add_with_fake
+    yt_dlp.main(argv)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
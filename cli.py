@@ -0,0 +1,31 @@
+"""Headless entry point: batch downloads without the GUI.
+
+Usage:
+    python cli.py [-f mp3] [-j 8] [urls.txt ...] < more_urls.txt > results.jsonl
+"""
+import os
+import sys
+import logging
+from pathlib import Path
+from datetime import datetime
+
+# Add the project root directory to Python path
+ROOT_DIR = Path(__file__).parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.config.settings import LOGS_DIR
+from src.core.batch import main
+
+if __name__ == "__main__":
+    # stdout carries the JSONL records; logs go to the file and stderr
+    os.makedirs(LOGS_DIR, exist_ok=True)
+    log_file = os.path.join(LOGS_DIR, f"youtube_downloader_{datetime.now().strftime('%Y%m%d')}.log")
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(log_file),
+            logging.StreamHandler(sys.stderr)
+        ]
+    )
+    sys.exit(main())
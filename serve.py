@@ -0,0 +1,30 @@
+"""Daemon entry point: one shared downloader behind a local HTTP API.
+
+Usage:
+    python serve.py [--port 8765] [-j 4] [-o ~/Downloads/YouTube]
+"""
+import os
+import sys
+import logging
+from pathlib import Path
+from datetime import datetime
+
+# Add the project root directory to Python path
+ROOT_DIR = Path(__file__).parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.config.settings import LOGS_DIR
+from src.core.daemon import main
+
+if __name__ == "__main__":
+    os.makedirs(LOGS_DIR, exist_ok=True)
+    log_file = os.path.join(LOGS_DIR, f"youtube_downloader_{datetime.now().strftime('%Y%m%d')}.log")
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(log_file),
+            logging.StreamHandler(sys.stderr)
+        ]
+    )
+    sys.exit(main())
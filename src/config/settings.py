@@ -8,6 +8,11 @@ SRC_DIR = Path(__file__).parent.parent
 BASE_DIR = SRC_DIR.parent
 DOWNLOADS_DIR = str(Path.home() / "Downloads" / "YouTube")
 LOGS_DIR = str(Path.home() / ".my-yt-down" / "logs")
+CACHE_DIR = str(Path.home() / ".my-yt-down" / "cache")
+JOURNAL_PATH = str(Path.home() / ".my-yt-down" / "journal.jsonl")
+DAEMON_JOURNAL_PATH = str(Path.home() / ".my-yt-down" / "daemon-journal.jsonl")
+BATCH_JOURNAL_PATH = str(Path.home() / ".my-yt-down" / "batch-journal.jsonl")
+ASYNC_JOURNAL_PATH = str(Path.home() / ".my-yt-down" / "async-journal.jsonl")
 
 # System requirements
 MIN_DISK_SPACE = 1024 * 1024 * 1024  # 1GB in bytes
@@ -19,9 +24,71 @@ VALID_URL_REGEX = re.compile(
 
 # Download settings
 MAX_CONCURRENT_DOWNLOADS = 3
+RESUME_INCOMPLETE_JOBS = True  # Resubmit jobs interrupted by a crash on startup
+JOURNAL_COMPACT_BYTES = 4 * 1024 * 1024  # Journal size that triggers compaction
+ASYNC_FINISHED_JOBS = 1000  # Finished jobs AsyncMediaDownloader still reports, older ones are dropped
+PROGRESS_RATE_HZ = 10  # Progress updates delivered per second
+MAX_DOWNLOAD_SIZE = 2048 * 1024 * 1024  # bytes, larger files are refused
+BANDWIDTH_LIMIT = None  # bytes per second shared by all downloads, None is unlimited
+SOCKET_BUDGET = 16  # Connections shared by the fragments of all running downloads
+MAX_FRAGMENT_DOWNLOADS = 8  # DASH/HLS fragments one download fetches at once
+POSTPROCESS_WORKERS = None  # Parallel ffmpeg conversions, None uses the number of cores
+YDL_POOL_MAX_IDLE = 2  # Idle YoutubeDL instances kept per option set
+YDL_POOL_MAX_JOBS = 50  # Jobs served by a YoutubeDL instance before it is recreated
+EXECUTION_MODE = "thread"  # "process" runs yt-dlp in worker processes, so extraction uses every core
+PROCESS_WORKERS = None  # Worker processes in "process" mode, None: one per concurrent download, plus one
+PROCESS_START_METHOD = "spawn"  # Forking a process that runs threads is unsafe
+PROCESS_CANCEL_TIMEOUT = 5  # seconds a worker gets to stop a cancelled job before it is killed
 DEFAULT_THEME = "blue"
 DEFAULT_APPEARANCE = "System"
 
+# Rate limits, per host
+RATE_LIMIT_REQUESTS = 30  # Requests per period
+RATE_LIMIT_PERIOD = 60  # seconds
+RATE_LIMIT_BURST = 10
+RATE_LIMIT_COST_INFO = 0.5  # Tokens used by a metadata lookup
+RATE_LIMIT_COST_DOWNLOAD = 1  # Tokens used by a download
+RATE_CONTROL = {
+    "min_rate": 1,  # Requests per period, at least
+    "decrease_factor": 0.5,  # Rate multiplier on HTTP 429 and similar throttling
+    "increase_step": 1,  # Requests per period regained per success
+    "hold_seconds": 10  # Throttling errors within this window do not cut again
+}
+
+# Retries of failed downloads, with exponential backoff and jitter
+MAX_RETRIES = 3  # Extra attempts after a transient or throttling error
+RETRY_DELAY = 2  # seconds, backoff of the first retry
+RETRY_MAX_DELAY = 60  # seconds
+
+# Download daemon (serve.py)
+DAEMON_HOST = "127.0.0.1"  # Only local clients by default
+DAEMON_PORT = 8765
+DAEMON_MAX_BODY = 64 * 1024  # bytes, larger requests are refused
+DAEMON_SSE_KEEPALIVE = 15  # seconds between comments on idle event streams
+DAEMON_SSE_BACKLOG = 100  # Event batches buffered per stream before a slow client is dropped
+DAEMON_FINISHED_JOBS = 1000  # Finished jobs still listed; older ones are forgotten
+
+# Playlists
+PLAYLIST_SETTINGS = {
+    "max_items": 50,  # 0 downloads every entry
+    "reverse_order": False,
+    "skip_existing": True,
+    "entry_retries": 2,  # Extra attempts for an entry that failed
+    "retry_delay": 5  # seconds
+}
+
+# Download archive
+ARCHIVE_PATH = os.path.join(CACHE_DIR, "archive.sqlite3")
+ARCHIVE_CHECKSUMS = True  # SHA-256 of every finished download
+
+# Metadata cache
+INFO_CACHE_PATH = os.path.join(CACHE_DIR, "info.sqlite3")  # None disables the disk tier
+INFO_CACHE_TTL = 6 * 3600  # seconds
+INFO_CACHE_PLAYLIST_TTL = 10 * 60  # seconds
+INFO_CACHE_MAX_ENTRIES = 512
+INFO_CACHE_MAX_BYTES = 32 * 1024 * 1024  # in memory
+INFO_CACHE_MAX_DISK_BYTES = 256 * 1024 * 1024
+
 # Media formats
 VIDEO_FORMATS = {
     'MP4': 'mp4',
@@ -68,6 +135,10 @@ ERROR_MESSAGES = {
 
 # GUI settings
 WINDOW_SIZE = "800x600"
+GUI_UPDATE_INTERVAL_MS = 100  # How often queued GUI updates are applied
+STATUS_MAX_LINES = 500  # Status lines kept in the status box
+LOGS_UPDATE_INTERVAL_MS = 1000  # Log panel polling interval while it is visible
+LOGS_MAX_LINES = 2000  # Log lines kept in the log panel
 MIN_WINDOW_SIZE = (700, 800)
 PADDING = {
     'small': 5,
@@ -1,4 +1,23 @@
-"""Core package initialization."""
-from src.core.downloader import MediaDownloader, DownloadOptions, DownloadError
+"""Core package initialization.
 
-__all__ = ['MediaDownloader', 'DownloadOptions', 'DownloadError']
+The exports are loaded on first access, so importing one core module does
+not import all of them (``AsyncMediaDownloader`` pulls in asyncio).
+"""
+import importlib
+
+_EXPORTS = {
+    'MediaDownloader': 'src.core.downloader',
+    'DownloadOptions': 'src.core.downloader',
+    'DownloadError': 'src.core.downloader',
+    'DownloadCancelled': 'src.core.downloader',
+    'AsyncMediaDownloader': 'src.core.async_downloader'
+}
+
+__all__ = ['MediaDownloader', 'AsyncMediaDownloader', 'DownloadOptions', 'DownloadError', 'DownloadCancelled']
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,526 @@
+"""Asyncio download orchestration.
+
+``AsyncMediaDownloader`` runs each job as a coroutine. Jobs waiting for a
+slot hold no thread, subprocess jobs are driven with
+``asyncio.create_subprocess_exec``, and in-process jobs run on a small
+bounded executor. This keeps thousands of queued jobs cheap.
+
+Jobs go through the same hooks as ``MediaDownloader``: per-host rate
+limits, retries of transient failures, the download archive and a job
+journal of their own.
+"""
+import asyncio
+import json
+import logging
+import os
+import signal
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
+
+from src.config.settings import (
+    ASYNC_FINISHED_JOBS,
+    ASYNC_JOURNAL_PATH,
+    MAX_CONCURRENT_DOWNLOADS,
+    MAX_RETRIES,
+    PROGRESS_RATE_HZ,
+    RATE_CONTROL,
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_COST_DOWNLOAD,
+    RATE_LIMIT_COST_INFO,
+    RATE_LIMIT_PERIOD,
+    RATE_LIMIT_REQUESTS,
+    RETRY_DELAY,
+    RETRY_MAX_DELAY
+)
+from src.core.downloader import (
+    DownloadCancelled,
+    DownloadError,
+    DownloadOptions,
+    build_ydl_options
+)
+from src.core.engines import (
+    EngineCancelled, EngineError, InProcessEngine, SubprocessEngine, fragment_concurrency
+)
+from src.utils.archive import DownloadArchive, find_media
+from src.utils.info_cache import InfoCache
+from src.utils.journal import JobJournal
+from src.utils.progress import ProgressBus, ProgressEvent
+from src.utils.rate_control import AdaptiveRateController
+from src.utils.rate_limiter import HostRateLimiter
+from src.utils.retry import RetryPolicy, classify_error
+from src.utils.utils import extract_video_id, remove_partial_files
+
+async def terminate_process_group_async(process: asyncio.subprocess.Process,
+                                        grace: float = 2.0) -> None:
+    """Stop an asyncio subprocess and its children, escalating to SIGKILL.
+
+    Args:
+        process: Process started with ``start_new_session=True`` on POSIX
+        grace: Seconds to wait after SIGTERM before killing
+    """
+    if process.returncode is not None:
+        return
+    try:
+        if os.name == 'posix':
+            os.killpg(process.pid, signal.SIGTERM)
+        else:
+            process.terminate()
+        try:
+            await asyncio.wait_for(process.wait(), grace)
+        except asyncio.TimeoutError:
+            if os.name == 'posix':
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+            await process.wait()
+    except ProcessLookupError:
+        pass
+
+class AsyncMediaDownloader:
+    """Downloads media from coroutines.
+
+    At most ``max_concurrent`` jobs run at once. The others wait on a
+    semaphore. Progress goes through a ``ProgressBus`` and can be consumed
+    with ``async for event in downloader.events()``. Only the last
+    ``keep_finished`` finished jobs are still reported by
+    ``get_download_status``.
+
+    Attributes:
+        engine_name (str): ``"inprocess"`` or ``"subprocess"``
+        max_concurrent (int): Jobs running at the same time
+        progress_bus (ProgressBus): Coalesced progress of every job
+        rate_control (AdaptiveRateController): Per-host request rates
+        retry_policy (RetryPolicy): Retries of transient and throttling failures
+    """
+
+    def __init__(self, engine: str = "inprocess",
+                 max_concurrent: int = MAX_CONCURRENT_DOWNLOADS,
+                 command: Union[str, List[str]] = "yt-dlp",
+                 factory: Optional[Callable[[Dict], object]] = None,
+                 info_cache: Optional[InfoCache] = None,
+                 journal: Optional[JobJournal] = None,
+                 archive: Optional[DownloadArchive] = None,
+                 rate_control: Optional[AdaptiveRateController] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 keep_finished: int = ASYNC_FINISHED_JOBS):
+        if engine not in (InProcessEngine.name, SubprocessEngine.name):
+            raise ValueError(f"Unknown download engine: {engine}")
+        self.engine_name = engine
+        self.max_concurrent = max_concurrent
+        self._subprocess = SubprocessEngine(command)
+        self._inprocess = InProcessEngine(factory=factory) if engine == InProcessEngine.name else None
+        # Download slots plus spare threads, so metadata lookups and cache
+        # I/O still run while every slot is busy
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent + 2,
+                                            thread_name_prefix="async-downloader")
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._info_cache = info_cache or InfoCache()
+        self.progress_bus = ProgressBus(rate_hz=PROGRESS_RATE_HZ)
+        self.progress_bus.subscribe(self._forward_events)
+        self._listeners: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+        self._listeners_lock = threading.Lock()
+        self._jobs: Dict[str, Dict] = {}
+        self._finished: deque = deque()
+        self.keep_finished = keep_finished
+        self._logger = logging.getLogger(__name__)
+        # Its own journal: the GUI resumes the jobs it finds in the default one
+        self._journal = journal or JobJournal(ASYNC_JOURNAL_PATH)
+        self._archive = archive or DownloadArchive()
+        self.rate_control = rate_control or AdaptiveRateController(
+            HostRateLimiter(RATE_LIMIT_REQUESTS, RATE_LIMIT_PERIOD, RATE_LIMIT_BURST),
+            **RATE_CONTROL
+        )
+        self.retry_policy = retry_policy or RetryPolicy(MAX_RETRIES, RETRY_DELAY, RETRY_MAX_DELAY)
+
+    async def download(self, url: str, options: Union[DownloadOptions, Dict],
+                       download_id: Optional[str] = None) -> str:
+        """
+        Download ``url`` and return once the job has finished.
+
+        With ``DownloadOptions``, media already in the archive is not
+        downloaded again. Failures are retried as ``retry_policy`` allows.
+
+        Args:
+            url: YouTube URL to download from
+            options: Download options, or a ready yt-dlp option dictionary
+            download_id: ID to track the job with (generated if omitted)
+
+        Returns:
+            str: The download ID
+
+        Raises:
+            DownloadCancelled: If the job was cancelled with ``cancel``
+            DownloadError: If the download failed
+        """
+        loop = asyncio.get_running_loop()
+        download_id = download_id or uuid.uuid4().hex
+        video_id = extract_video_id(url)
+        if isinstance(options, DownloadOptions):
+            ydl_opts = build_ydl_options(options, fragment_concurrency(self.max_concurrent))
+            fields = {'options': asdict(options)}
+            archived = video_id and await loop.run_in_executor(
+                self._executor, self._archive.lookup, video_id, options.format, options.quality
+            )
+        else:
+            ydl_opts = dict(options)
+            fields = {'ydl_options': ydl_opts}
+            archived = None
+        job = self._jobs[download_id] = {
+            'url': url,
+            'status': 'queued',
+            'progress': 0,
+            'error': None,
+            'retries': 0,
+            'path': None,
+            'files': [],
+            'keep_partial': False,
+            'interrupted': False,
+            'in_executor': False,
+            'cancel_event': threading.Event(),
+            'task': asyncio.current_task()
+        }
+        if archived:
+            self._logger.info(f"Already downloaded, skipping: {archived['path']}")
+            job.update(status='completed', progress=100.0, path=archived['path'], task=None)
+            self.progress_bus.publish(ProgressEvent(download_id, 'completed', percent=100.0,
+                                                    filename=archived['path'], timestamp=time.time()))
+            self._remember_finished(download_id)
+            return download_id
+        self._journal.record(download_id, 'submitted', url=url, **fields)
+
+        try:
+            async with self._semaphore:
+                if job['cancel_event'].is_set():
+                    raise DownloadCancelled(f"Download {download_id} cancelled")
+                self._journal.record(download_id, 'started')
+                await self._run_with_retries(url, ydl_opts, download_id)
+        except (asyncio.CancelledError, DownloadCancelled) as e:
+            cancelled_by_us = job['cancel_event'].is_set()
+            # Also stops an in-process job whose caller went away
+            job['cancel_event'].set()
+            self._finish(download_id, 'cancelled')
+            if isinstance(e, asyncio.CancelledError):
+                if not cancelled_by_us:
+                    raise
+                task = asyncio.current_task()
+                if hasattr(task, 'uncancel'):
+                    task.uncancel()
+            raise DownloadCancelled(f"Download {download_id} cancelled") from None
+        except DownloadError as e:
+            job['error'] = str(e)
+            self._finish(download_id, 'failed')
+            raise
+
+        if isinstance(options, DownloadOptions) and video_id:
+            job['path'] = find_media(options.output_dir, video_id)
+            if job['path']:
+                await loop.run_in_executor(self._executor, self._archive.add, video_id,
+                                           options.format, options.quality, job['path'])
+        self._finish(download_id, 'completed')
+        return download_id
+
+    async def _run_with_retries(self, url: str, ydl_opts: Dict, download_id: str) -> None:
+        """Run a job, retrying transient and throttling failures.
+
+        Each attempt waits for a rate limit token of the URL's host first.
+        yt-dlp continues from the ``.part`` files of the failed attempt.
+        """
+        job = self._jobs[download_id]
+        attempt = 0
+        while True:
+            await self.rate_control.limiter.acquire_async(url, RATE_LIMIT_COST_DOWNLOAD)
+            if job['cancel_event'].is_set():
+                raise DownloadCancelled(f"Download {download_id} cancelled")
+            job['status'] = 'downloading'
+            try:
+                if self._inprocess is not None:
+                    await self._run_inprocess(url, ydl_opts, download_id)
+                else:
+                    await self._run_subprocess(url, ydl_opts, download_id)
+            except DownloadCancelled:
+                raise
+            except DownloadError as e:
+                self.rate_control.record_failure(url, e)
+                category = classify_error(e)
+                if not self.retry_policy.should_retry(category, attempt):
+                    self._logger.error(f"Download failed ({category}): {str(e)}")
+                    job['error_category'] = category
+                    raise
+                delay = self.retry_policy.backoff(attempt)
+                attempt += 1
+                job['retries'] = attempt
+                self._logger.warning(f"Retrying {url} in {delay:.1f}s "
+                                     f"({attempt}/{self.retry_policy.max_retries}, {category}): {str(e)}")
+                self._journal.record(download_id, 'retrying', attempt=attempt, category=category)
+                # A cancel interrupts the delay through the task
+                await asyncio.sleep(delay)
+                continue
+            self.rate_control.record_success(url)
+            return
+
+    async def _run_inprocess(self, url: str, ydl_opts: Dict, download_id: str) -> None:
+        """Run a job on a pooled YoutubeDL instance in the executor."""
+        loop = asyncio.get_running_loop()
+        job = self._jobs[download_id]
+        job['in_executor'] = True
+        try:
+            await loop.run_in_executor(
+                self._executor,
+                self._inprocess.download,
+                url,
+                ydl_opts,
+                lambda event: self._on_progress(download_id, event),
+                job['cancel_event']
+            )
+        except EngineCancelled:
+            raise DownloadCancelled(f"Download {download_id} cancelled")
+        except EngineError as e:
+            raise DownloadError(str(e)) from e
+        finally:
+            job['in_executor'] = False
+
+    async def _run_subprocess(self, url: str, ydl_opts: Dict, download_id: str) -> None:
+        """Run a job as a yt-dlp process read from the event loop."""
+        cmd = self._subprocess.build_command(url, ydl_opts)
+        self._logger.debug(f"Running command: {' '.join(cmd)}")
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            # Own process group, so cancelling also stops ffmpeg children
+            start_new_session=(os.name == 'posix')
+        )
+        stderr = asyncio.ensure_future(process.stderr.read())
+        try:
+            async for raw_line in process.stdout:
+                event = self._subprocess.parse_output_line(raw_line.decode('utf-8', errors='replace'))
+                if event is not None:
+                    self._on_progress(download_id, event)
+            await process.wait()
+        except asyncio.CancelledError:
+            stderr.cancel()
+            await terminate_process_group_async(process)
+            raise
+
+        error = (await stderr).decode('utf-8', errors='replace').strip()
+        if process.returncode != 0:
+            raise DownloadError(error or f"yt-dlp exited with code {process.returncode}")
+
+    def _on_progress(self, download_id: str, event: ProgressEvent) -> None:
+        """Record a job's progress; called from the loop or executor threads."""
+        job = self._jobs[download_id]
+        if event.filename and event.filename not in job['files']:
+            job['files'].append(event.filename)
+            self._journal.add_file(download_id, event.filename)
+        if event.percent is not None:
+            job['progress'] = event.percent
+        self.progress_bus.publish(event._replace(task_id=download_id, timestamp=time.time()))
+
+    def _finish(self, download_id: str, status: str) -> None:
+        """Journal the final state of a job.
+
+        A job stopped by ``close`` is journaled as interrupted, so
+        ``resume_incomplete_jobs`` picks it up again.
+        """
+        job = self._jobs[download_id]
+        job['status'] = status
+        job['task'] = None
+        if status == 'cancelled' and not job['keep_partial']:
+            remove_partial_files(job['files'])
+        if status == 'cancelled' and job['interrupted']:
+            self._journal.record(download_id, 'interrupted')
+        elif status == 'cancelled':
+            self._journal.record(download_id, 'cancelled', kept_partial=job['keep_partial'])
+        elif status == 'failed':
+            self._journal.record(download_id, 'failed', error=job['error'], category=job.get('error_category'))
+        else:
+            self._journal.record(download_id, 'completed', path=job['path'])
+        self.progress_bus.publish(ProgressEvent(download_id, status, timestamp=time.time()))
+        self._remember_finished(download_id)
+
+    def _remember_finished(self, download_id: str) -> None:
+        """Keep the status of a finished job, dropping the oldest beyond ``keep_finished``."""
+        self._finished.append(download_id)
+        while len(self._finished) > self.keep_finished:
+            old_id = self._finished.popleft()
+            # The ID may have been reused by a job that is still running
+            if self._jobs.get(old_id, {}).get('task') is None:
+                self._jobs.pop(old_id, None)
+
+    def cancel(self, download_id: str, keep_partial: bool = False) -> bool:
+        """
+        Cancel a queued or running download.
+
+        Must be called from the event loop thread. The ``download`` call of
+        the job raises ``DownloadCancelled``.
+
+        Args:
+            download_id: ID of the job
+            keep_partial: Keep ``.part`` files so a later download can resume
+
+        Returns:
+            bool: True if the job was still queued or running
+        """
+        job = self._jobs.get(download_id)
+        if job is None or job['status'] not in ('queued', 'downloading'):
+            return False
+        job['keep_partial'] = keep_partial
+        job['cancel_event'].set()
+        # Wakes a job waiting for a slot, a rate limit token or a retry, or
+        # reading a subprocess; an in-process job stops at its next
+        # progress hook instead
+        task = job['task']
+        if task is not None and not job['in_executor']:
+            task.cancel()
+        return True
+
+    def get_download_status(self, download_id: str) -> Dict:
+        """Get status of a download."""
+        job = self._jobs.get(download_id)
+        if job is None:
+            return {'status': 'not_found'}
+        return {
+            'url': job['url'],
+            'status': job['status'],
+            'progress': job['progress'],
+            'error': job['error'],
+            'retries': job['retries'],
+            'path': job['path']
+        }
+
+    async def resume_incomplete_jobs(self) -> List[str]:
+        """
+        Run the jobs the journal shows as interrupted, and wait for them.
+
+        yt-dlp continues from the ``.part`` files those jobs left behind.
+
+        Returns:
+            list: IDs of the resumed jobs, whether they succeeded or not
+        """
+        jobs = []
+        for job in self._journal.incomplete():
+            if job['job_id'] in self._jobs:
+                continue
+            if 'options' in job:
+                try:
+                    options = DownloadOptions(**job['options'])
+                except TypeError as e:
+                    self._logger.error(f"Cannot resume download {job['job_id']}: {str(e)}")
+                    self._journal.record(job['job_id'], 'failed', error=str(e))
+                    continue
+            else:
+                options = job.get('ydl_options', {})
+            self._logger.info(f"Resuming interrupted download: {job['url']}")
+            jobs.append((job['job_id'], self.download(job['url'], options, download_id=job['job_id'])))
+        results = await asyncio.gather(*(coro for _, coro in jobs), return_exceptions=True)
+        for (job_id, _), result in zip(jobs, results):
+            if isinstance(result, DownloadError):
+                self._logger.error(f"Resumed download {job_id} failed: {str(result)}")
+        return [job_id for job_id, _ in jobs]
+
+    async def get_media_info(self, url: str, refresh: bool = False) -> Dict:
+        """
+        Extract metadata for a video or playlist without downloading it.
+
+        Playlists are extracted flat. Results are served from the info cache
+        unless ``refresh`` is set.
+
+        Raises:
+            DownloadError: If extraction fails
+        """
+        loop = asyncio.get_running_loop()
+        if not refresh:
+            info = await loop.run_in_executor(self._executor, self._info_cache.get, url)
+            if info is not None:
+                return info
+
+        await self.rate_control.limiter.acquire_async(url, RATE_LIMIT_COST_INFO)
+        try:
+            if self._inprocess is not None:
+                info = await loop.run_in_executor(self._executor, self._inprocess.extract_info, url, True)
+            else:
+                info = await self._extract_info_subprocess(url)
+        except EngineError as e:
+            self.rate_control.record_failure(url, e)
+            self._logger.error(f"Failed to extract info: {str(e)}")
+            raise DownloadError(f"Failed to extract info: {str(e)}")
+        self.rate_control.record_success(url)
+
+        await loop.run_in_executor(self._executor, self._info_cache.set, url, info)
+        return info
+
+    async def _extract_info_subprocess(self, url: str) -> Dict:
+        process = await asyncio.create_subprocess_exec(
+            *self._subprocess.command, "--dump-single-json", "--flat-playlist", url,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        stdout, stderr = await process.communicate()
+        if process.returncode != 0:
+            raise EngineError(stderr.decode('utf-8', errors='replace').strip())
+        try:
+            return json.loads(stdout)
+        except json.JSONDecodeError as e:
+            raise EngineError(f"Invalid info JSON: {e}")
+
+    async def events(self) -> AsyncIterator[ProgressEvent]:
+        """
+        Iterate over progress events of all jobs.
+
+        Events arrive in the batches flushed by the progress bus, so
+        intermediate progress of a job may be skipped; terminal events
+        (completed, failed, cancelled) are always delivered. The iteration
+        ends when the downloader is closed.
+        """
+        listener = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._listeners_lock:
+            self._listeners.append(listener)
+        try:
+            while True:
+                batch = await listener[1].get()
+                if batch is None:
+                    return
+                for event in batch:
+                    yield event
+        finally:
+            with self._listeners_lock:
+                if listener in self._listeners:
+                    self._listeners.remove(listener)
+
+    def _forward_events(self, batch: Optional[List[ProgressEvent]]) -> None:
+        """Hand a bus batch to every ``events()`` iterator on its own loop."""
+        with self._listeners_lock:
+            listeners = list(self._listeners)
+        for loop, queue in listeners:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, batch)
+            except RuntimeError:
+                # The listener's loop is closed
+                pass
+
+    async def close(self) -> None:
+        """Stop running jobs and release all resources.
+
+        The jobs keep their partial files and are journaled as interrupted.
+        """
+        for download_id in list(self._jobs):
+            if self.cancel(download_id, keep_partial=True):
+                self._jobs[download_id]['interrupted'] = True
+        self.progress_bus.close()
+        self._forward_events(None)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._inprocess is not None:
+            self._inprocess.close()
+        self._info_cache.close()
+        self._archive.close()
+
+    async def __aenter__(self) -> 'AsyncMediaDownloader':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
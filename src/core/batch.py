@@ -0,0 +1,300 @@
+"""Headless batch downloads: URLs in, JSONL progress and results out.
+
+Input is read line by line from files or stdin. A line is either a URL,
+or a JSON object with ``url`` and optional ``format``, ``quality``,
+``output_dir``, ``playlist`` and ``rate_limit`` overriding the command
+line defaults. Blank lines and lines starting with ``#`` are skipped.
+
+Every line written to stdout is one JSON object with an ``event`` key:
+``queued``, ``progress``, ``result``, ``rejected`` and finally
+``summary``. Logs go to stderr, so stdout can be piped to other tools.
+
+Nothing here imports tkinter, so it runs on servers without a display.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from dataclasses import replace
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+from urllib.parse import urlparse
+
+from src.config.settings import (
+    AUDIO_FORMATS,
+    BATCH_JOURNAL_PATH,
+    DOWNLOADS_DIR,
+    EXECUTION_MODE,
+    MAX_CONCURRENT_DOWNLOADS
+)
+from src.core.downloader import DownloadError, DownloadOptions, MediaDownloader
+from src.utils.journal import JobJournal
+from src.utils.progress import ProgressEvent
+
+# Statuses after which a job does not change any more
+FINAL_STATUSES = frozenset({'completed', 'failed', 'cancelled'})
+
+# Per-job fields and the JSON types they accept
+_JOB_FIELDS = {
+    'format': str,
+    'quality': str,
+    'output_dir': str,
+    'playlist': bool,
+    'rate_limit': (int, type(None))
+}
+
+def job_options(defaults: DownloadOptions, **fields) -> DownloadOptions:
+    """Apply per-item fields to the default options.
+
+    An audio format (``mp3``, ``aac``...) turns on audio conversion, in
+    whatever case it is written. A quality meant for the other media type
+    is replaced by that type's default.
+    """
+    unknown = set(fields) - set(_JOB_FIELDS)
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(sorted(unknown))}")
+    options = replace(defaults, **fields)
+    audio = options.format.lower() in AUDIO_FORMATS.values()
+    if audio != defaults.convert_audio and 'quality' not in fields:
+        options = replace(options, quality='Best' if audio else '720p')
+    if audio:
+        options = replace(options, format=options.format.lower())
+    return replace(options, convert_audio=audio)
+
+def job_from_item(item: Dict, defaults: DownloadOptions) -> Tuple[str, DownloadOptions]:
+    """Validate a job given as a JSON object.
+
+    Args:
+        item: Object with ``url`` and optional per-job fields
+        defaults: Options of the fields the item does not set
+
+    Returns:
+        tuple: ``(url, options)``
+
+    Raises:
+        ValueError: If the URL is not http(s), or a field is unknown or of
+            the wrong type
+    """
+    if not isinstance(item, dict) or not isinstance(item.get('url'), str):
+        raise ValueError("expected an object with a \"url\"")
+    fields = dict(item)
+    url = fields.pop('url')
+    parts = urlparse(url)
+    if parts.scheme not in ('http', 'https') or not parts.netloc:
+        raise ValueError(f"not an http(s) URL: {url}")
+    for name, value in fields.items():
+        expected = _JOB_FIELDS.get(name)
+        # bool is an int, but not a valid rate limit
+        if expected is not None and (not isinstance(value, expected) or
+                                     (isinstance(value, bool) and expected is not bool)):
+            raise ValueError(f"invalid {name}: {value!r}")
+    return url, job_options(defaults, **fields)
+
+def parse_jobs(lines: Iterable[str], defaults: DownloadOptions
+               ) -> Iterator[Tuple[int, Optional[str], Optional[DownloadOptions], Optional[str]]]:
+    """Parse input lines into jobs.
+
+    Args:
+        lines: Input lines, URLs or JSON objects
+        defaults: Options of lines that do not set their own
+
+    Yields:
+        tuple: ``(line number, url, options, None)``, or
+        ``(line number, url or None, None, error)`` for a line that is invalid
+    """
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        item = {'url': line}
+        try:
+            if line.startswith('{'):
+                item = json.loads(line)
+            url, options = job_from_item(item, defaults)
+        except ValueError as e:
+            url = item.get('url') if isinstance(item, dict) else None
+            yield number, url if isinstance(url, str) else None, None, str(e)
+            continue
+        yield number, url, options, None
+
+class BatchRunner:
+    """Feeds jobs to a ``MediaDownloader`` and reports them as JSONL.
+
+    Input is consumed lazily, so results are reported while stdin is still
+    being read; the downloader's scheduler bounds how many jobs run.
+
+    Attributes:
+        downloader (MediaDownloader): Downloader running the jobs
+        progress (bool): Write ``progress`` records as well
+    """
+
+    def __init__(self, downloader: MediaDownloader, out: TextIO = sys.stdout,
+                 progress: bool = True, clock: Callable[[], float] = time.monotonic):
+        self.downloader = downloader
+        self.progress = progress
+        self._out = out
+        self._clock = clock
+        self._write_lock = threading.Lock()
+        self._changed = threading.Condition()
+        self._pending: Dict[str, Dict] = {}
+        self._settled: set = set()
+        self._bytes: Dict[str, int] = {}
+        self._counts = {'completed': 0, 'failed': 0, 'cancelled': 0, 'rejected': 0}
+
+    def emit(self, event: str, **fields) -> None:
+        """Write one JSON record."""
+        line = json.dumps(dict(event=event, **fields), ensure_ascii=False)
+        with self._write_lock:
+            self._out.write(line + "\n")
+            self._out.flush()
+
+    def _on_progress(self, events: List[ProgressEvent]) -> None:
+        settled = False
+        for event in events:
+            if event.downloaded_bytes:
+                self._bytes[event.task_id] = max(self._bytes.get(event.task_id, 0), event.downloaded_bytes)
+            if event.status in FINAL_STATUSES:
+                with self._changed:
+                    self._settled.add(event.task_id)
+                settled = True
+            elif self.progress and event.status == 'downloading':
+                self.emit('progress', id=event.task_id, percent=event.percent,
+                          downloaded_bytes=event.downloaded_bytes, total_bytes=event.total_bytes,
+                          speed=event.speed, eta=event.eta)
+        if settled:
+            with self._changed:
+                self._changed.notify_all()
+
+    def _reap(self) -> None:
+        """Report the jobs that have finished."""
+        with self._changed:
+            done = [job_id for job_id in self._pending if job_id in self._settled]
+        for job_id in done:
+            status = self.downloader.get_download_status(job_id)
+            with self._changed:
+                self._settled.discard(job_id)
+                if status['status'] not in FINAL_STATUSES:
+                    # The event was older than the job's current state
+                    continue
+                job = self._pending.pop(job_id)
+            self._counts[status['status']] += 1
+            self.emit('result', id=job_id, url=job['url'], line=job['line'], status=status['status'],
+                      path=status.get('path'), error=status.get('error'),
+                      retries=status.get('retries', 0), bytes=self._bytes.get(job_id, 0),
+                      seconds=round(self._clock() - job['started'], 3))
+
+    def run(self, lines: Iterable[str], defaults: DownloadOptions) -> Dict:
+        """Download every job of ``lines`` and wait for all of them.
+
+        On KeyboardInterrupt the remaining jobs are cancelled, keeping their
+        partial files so that running the batch again continues them.
+
+        Returns:
+            dict: The summary record
+        """
+        started = self._clock()
+        unsubscribe = self.downloader.subscribe_progress(self._on_progress)
+        try:
+            try:
+                for number, url, options, error in parse_jobs(lines, defaults):
+                    if error is None:
+                        try:
+                            job_id = self.downloader.download(url, options)
+                        except DownloadError as e:
+                            error = str(e)
+                    if error is not None:
+                        self._counts['rejected'] += 1
+                        self.emit('rejected', line=number, url=url, error=error)
+                        continue
+                    with self._changed:
+                        self._pending[job_id] = {'url': url, 'line': number, 'started': self._clock()}
+                    self.emit('queued', id=job_id, url=url, line=number)
+                    self._reap()
+                self._wait()
+            except KeyboardInterrupt:
+                for job_id in list(self._pending):
+                    self.downloader.cancel_download(job_id, keep_partial=True)
+                self._wait()
+        finally:
+            unsubscribe()
+        return self._summary(self._clock() - started)
+
+    def _wait(self) -> None:
+        while self._pending:
+            with self._changed:
+                if not self._pending.keys() & self._settled:
+                    self._changed.wait(0.5)
+            self._reap()
+
+    def _summary(self, elapsed: float) -> Dict:
+        total_bytes = sum(self._bytes.values())
+        jobs = sum(self._counts.values())
+        summary = dict(
+            jobs=jobs, **self._counts, bytes=total_bytes, seconds=round(elapsed, 3),
+            bytes_per_second=round(total_bytes / elapsed) if elapsed > 0 else 0,
+            jobs_per_minute=round(60 * jobs / elapsed, 2) if elapsed > 0 else 0
+        )
+        self.emit('summary', **summary)
+        return summary
+
+def _read_inputs(paths: List[str]) -> Iterator[str]:
+    for path in paths:
+        if path == '-':
+            yield from sys.stdin
+        else:
+            with open(path, encoding='utf-8') as f:
+                yield from f
+
+def main(argv: Optional[list] = None, downloader: Optional[MediaDownloader] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Download URLs from files or stdin, reporting JSONL on stdout"
+    )
+    parser.add_argument("inputs", nargs="*", default=["-"],
+                        help="Files with one URL or JSON object per line, - for stdin")
+    parser.add_argument("-f", "--format", default="MP4", help="Default format (MP4, mp3, aac...)")
+    parser.add_argument("-q", "--quality", help="Default quality (720p, 192kbps...)")
+    parser.add_argument("-o", "--output-dir", default=DOWNLOADS_DIR)
+    parser.add_argument("-j", "--concurrency", type=int, default=MAX_CONCURRENT_DOWNLOADS,
+                        help="Downloads running at the same time")
+    parser.add_argument("--processes", action="store_true",
+                        help="Run yt-dlp in worker processes, so extraction uses every core")
+    parser.add_argument("--playlist", action="store_true", help="Treat URLs as playlists")
+    parser.add_argument("--rate-limit", type=int, help="Per-download limit in bytes per second")
+    parser.add_argument("--no-progress", action="store_true", help="Only write results")
+    args = parser.parse_args(argv)
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    missing = [path for path in args.inputs if path != '-' and not os.path.isfile(path)]
+    if missing:
+        parser.error(f"no such file: {', '.join(missing)}")
+
+    audio = args.format.lower() in AUDIO_FORMATS.values()
+    defaults = DownloadOptions(
+        format=args.format.lower() if audio else args.format,
+        quality=args.quality or ('Best' if audio else '720p'),
+        output_dir=args.output_dir,
+        playlist=args.playlist,
+        convert_audio=audio,
+        rate_limit=args.rate_limit
+    )
+    # Batches journal apart from the GUI, which would otherwise resume
+    # them; jobs of earlier runs are left alone
+    owned = downloader is None
+    downloader = downloader or MediaDownloader(journal=JobJournal(BATCH_JOURNAL_PATH), resume=False,
+                                               max_concurrent=args.concurrency,
+                                               execution_mode='process' if args.processes else EXECUTION_MODE)
+    try:
+        summary = BatchRunner(downloader, progress=not args.no_progress).run(
+            _read_inputs(args.inputs), defaults
+        )
+    finally:
+        if owned:
+            # After a normal run nothing is left; after Ctrl+C the rest of
+            # the batch is interrupted rather than downloaded, and running
+            # it again continues from the partial files
+            downloader.close(cancel_pending=True)
+    return 0 if summary['jobs'] == summary['completed'] else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,461 @@
+"""Download daemon: one shared ``MediaDownloader`` behind a local HTTP API.
+
+Several tools can submit jobs to the same process, so they share its
+scheduler, rate limiter, bandwidth budget and metadata cache instead of
+each running its own.
+
+Endpoints, all JSON except the event stream:
+
+    POST   /jobs          Submit ``{"url": ..., "format": ..., ...}``, 202
+    GET    /jobs          Jobs submitted to the daemon, ``?status=`` filters
+    GET    /jobs/<id>     Status of one job
+    DELETE /jobs/<id>     Cancel a job, ``?keep_partial=1`` keeps .part files
+    GET    /events        Server-sent events, ``?id=<job>`` for one job only
+
+Only the last ``DAEMON_FINISHED_JOBS`` finished jobs are kept; older
+ones are forgotten and answer 404.
+
+Job objects accept the same fields as lines of the batch CLI, with
+``output_dir`` taken relative to the default output directory and kept
+inside it.
+
+Only local tools are meant to reach the daemon, so requests whose Host
+is not the address it listens on, or that carry an Origin header (any
+web page), are refused: otherwise a page could submit jobs through DNS
+rebinding or a cross-site form post.
+"""
+import argparse
+import ipaddress
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dataclasses import replace
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from src.config.settings import (
+    DAEMON_FINISHED_JOBS,
+    DAEMON_HOST,
+    DAEMON_JOURNAL_PATH,
+    DAEMON_MAX_BODY,
+    DAEMON_PORT,
+    DAEMON_SSE_BACKLOG,
+    DAEMON_SSE_KEEPALIVE,
+    DOWNLOADS_DIR,
+    EXECUTION_MODE,
+    MAX_CONCURRENT_DOWNLOADS,
+    RESUME_INCOMPLETE_JOBS
+)
+from src.core.batch import FINAL_STATUSES, job_from_item, job_options
+from src.core.downloader import DownloadError, DownloadOptions, MediaDownloader
+from src.utils.journal import JobJournal
+from src.utils.progress import ProgressEvent
+
+class DownloadDaemon:
+    """HTTP front end of a ``MediaDownloader``.
+
+    Attributes:
+        downloader (MediaDownloader): Downloader shared by all clients
+        defaults (DownloadOptions): Options of fields a job does not set
+    """
+
+    def __init__(self, downloader: Optional[MediaDownloader] = None,
+                 defaults: Optional[DownloadOptions] = None,
+                 host: str = DAEMON_HOST, port: int = DAEMON_PORT,
+                 max_finished: int = DAEMON_FINISHED_JOBS):
+        # A downloader passed in is left open by shutdown(). An owned one
+        # has its own journal, so the GUI and the CLI do not resume its jobs
+        self._owned = downloader is None
+        self.downloader = downloader or MediaDownloader(journal=JobJournal(DAEMON_JOURNAL_PATH), resume=False)
+        self.defaults = defaults or DownloadOptions(format="MP4", quality="720p", output_dir=DOWNLOADS_DIR)
+        self._logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict] = {}
+        self._max_finished = max_finished
+        self._streams: List[queue.Queue] = []
+        self._thread: Optional[threading.Thread] = None
+        self._served = False
+        self._server = _DaemonServer((host, port), self)
+        self._unsubscribe = self.downloader.subscribe_progress(self._broadcast)
+        if self._owned and RESUME_INCOMPLETE_JOBS:
+            self.resume()
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """Host and port the daemon listens on (useful with port 0)."""
+        return self._server.server_address[:2]
+
+    def serve_forever(self) -> None:
+        """Handle requests until ``shutdown`` is called."""
+        self._logger.info("Download daemon listening on http://%s:%d", *self.address)
+        self._served = True
+        self._server.serve_forever()
+
+    def start(self) -> 'DownloadDaemon':
+        """Handle requests on a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, name="download-daemon", daemon=True)
+        self._thread.start()
+        return self
+
+    def shutdown(self) -> None:
+        """Stop serving, end the event streams and close an owned downloader."""
+        with self._lock:
+            streams, self._streams = self._streams, []
+        for stream in streams:
+            self._end_stream(stream)
+        # BaseServer.shutdown() waits for a serve_forever() that has to run
+        if self._served:
+            self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+        self._unsubscribe()
+        if self._owned:
+            self.downloader.close(cancel_pending=True)
+
+    def submit(self, item: Dict) -> Dict:
+        """Validate a job object and queue it.
+
+        Raises:
+            ValueError: If the object is not a valid job
+            DownloadError: If the downloader refuses the job
+        """
+        url, options = job_from_item(item, self.defaults)
+        if isinstance(item, dict) and 'output_dir' in item:
+            options = replace(options, output_dir=self._output_dir(item['output_dir']))
+        job_id = self.downloader.download(url, options)
+        with self._lock:
+            self._jobs[job_id] = {'submitted': time.time()}
+        self._evict_finished()
+        return self.job(job_id)
+
+    def allows_host(self, host: Optional[str]) -> bool:
+        """Whether a Host header names the address the daemon listens on.
+
+        A daemon bound to all interfaces has no single name to check.
+        """
+        address, port = self.address
+        ip = ipaddress.ip_address(address)
+        if ip.is_unspecified:
+            return True
+        names = {f"[{address}]" if ip.version == 6 else address}
+        if ip.is_loopback:
+            names.add("localhost")
+        allowed = {f"{name}:{port}" for name in names}
+        if port == 80:
+            # Clients leave out the default port
+            allowed |= names
+        return host is not None and host.lower() in allowed
+
+    def _output_dir(self, path: str) -> str:
+        """Resolve a job's ``output_dir`` under the default output directory.
+
+        Raises:
+            ValueError: If the path leads outside of it
+        """
+        root = os.path.realpath(self.defaults.output_dir)
+        target = os.path.realpath(os.path.join(root, path))
+        if os.path.commonpath([root, target]) != root:
+            raise ValueError(f"output_dir outside of {root}: {path}")
+        return target
+
+    def resume(self) -> List[str]:
+        """Resubmit the jobs the downloader's journal shows as interrupted.
+
+        Returns:
+            list: IDs of the resumed jobs, which are listed like submitted ones
+        """
+        job_ids = self.downloader.resume_incomplete_jobs()
+        with self._lock:
+            for job_id in job_ids:
+                self._jobs[job_id] = {'submitted': time.time()}
+        self._evict_finished()
+        return job_ids
+
+    def _evict_finished(self) -> None:
+        """Forget the oldest finished jobs beyond ``max_finished``."""
+        with self._lock:
+            finished = [job_id for job_id in self._jobs
+                        if self.downloader.get_download_status(job_id)['status'] in FINAL_STATUSES]
+            for job_id in finished[:max(len(finished) - self._max_finished, 0)]:
+                # A job whose worker is still returning is dropped next time
+                if self.downloader.forget(job_id):
+                    del self._jobs[job_id]
+
+    def job(self, job_id: str) -> Dict:
+        """Status of a job submitted to the daemon.
+
+        Raises:
+            KeyError: If no such job was submitted here
+        """
+        with self._lock:
+            job = dict(self._jobs[job_id])
+        return dict(id=job_id, **job, **self.downloader.get_download_status(job_id))
+
+    def jobs(self, status: Optional[str] = None) -> List[Dict]:
+        """All jobs, oldest first, optionally only those with ``status``."""
+        with self._lock:
+            job_ids = list(self._jobs)
+        jobs = [self.job(job_id) for job_id in job_ids]
+        return [job for job in jobs if status is None or job['status'] == status]
+
+    def cancel(self, job_id: str, keep_partial: bool = False) -> Dict:
+        """Cancel a job and return its status.
+
+        Raises:
+            KeyError: If no such job was submitted here
+        """
+        with self._lock:
+            if job_id not in self._jobs:
+                raise KeyError(job_id)
+        self.downloader.cancel_download(job_id, keep_partial)
+        return self.job(job_id)
+
+    def open_stream(self) -> queue.Queue:
+        """Register an event stream.
+
+        It receives batches of progress events, and None when the stream
+        has to end.
+        """
+        stream = queue.Queue(maxsize=DAEMON_SSE_BACKLOG)
+        with self._lock:
+            self._streams.append(stream)
+        return stream
+
+    def close_stream(self, stream: queue.Queue) -> None:
+        with self._lock:
+            if stream in self._streams:
+                self._streams.remove(stream)
+
+    def _broadcast(self, events: List[ProgressEvent]) -> None:
+        """Fan a batch out to every stream, dropping streams that fall behind."""
+        with self._lock:
+            streams = list(self._streams)
+        for stream in streams:
+            try:
+                stream.put_nowait(events)
+            except queue.Full:
+                # The client reconnects and gets a fresh snapshot
+                self.close_stream(stream)
+                self._end_stream(stream)
+
+    @staticmethod
+    def _end_stream(stream: queue.Queue) -> None:
+        """Make the handler reading ``stream`` end its response."""
+        with stream.mutex:
+            stream.queue.clear()
+        stream.put_nowait(None)
+
+class _DaemonServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], app: DownloadDaemon):
+        self.app = app
+        super().__init__(address, _Handler)
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "DownTube"
+
+    @property
+    def app(self) -> DownloadDaemon:
+        return self.server.app
+
+    def log_message(self, format, *args):
+        logging.getLogger(__name__).debug("%s - %s", self.address_string(), format % args)
+
+    def _send_json(self, status: int, body, headers: Optional[Dict] = None) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status: HTTPStatus, message: str, headers: Optional[Dict] = None) -> None:
+        self._send_json(status, {'error': message}, headers)
+
+    def _route(self) -> Tuple[str, Optional[str], Dict[str, List[str]]]:
+        """Split the request path into resource, job ID and query."""
+        parts = urlparse(self.path)
+        segments = [s for s in parts.path.split('/') if s]
+        resource = segments[0] if segments else ''
+        job_id = segments[1] if len(segments) == 2 else None
+        if len(segments) > 2:
+            resource = ''
+        return resource, job_id, parse_qs(parts.query)
+
+    def _not_allowed(self, allow: str) -> None:
+        self._send_error(HTTPStatus.METHOD_NOT_ALLOWED, "method not allowed", {"Allow": allow})
+
+    def _refuse_foreign(self) -> bool:
+        """Answer 403 to requests sent by a browser page or to another host name."""
+        if self.headers.get("Origin") is not None:
+            message = "cross-origin requests are not allowed"
+        elif not self.app.allows_host(self.headers.get("Host")):
+            message = f"unexpected Host: {self.headers.get('Host')}"
+        else:
+            return False
+        # Any body is left unread
+        self.close_connection = True
+        self._send_error(HTTPStatus.FORBIDDEN, message)
+        return True
+
+    def do_GET(self):
+        if self._refuse_foreign():
+            return
+        resource, job_id, query = self._route()
+        if resource == 'jobs' and job_id is None:
+            status = query.get('status', [None])[0]
+            self._send_json(HTTPStatus.OK, {'jobs': self.app.jobs(status)})
+        elif resource == 'jobs':
+            try:
+                self._send_json(HTTPStatus.OK, self.app.job(job_id))
+            except KeyError:
+                self._send_error(HTTPStatus.NOT_FOUND, f"no such job: {job_id}")
+        elif resource == 'events' and job_id is None:
+            self._stream_events(query.get('id', [None])[0])
+        else:
+            self._send_error(HTTPStatus.NOT_FOUND, "not found")
+
+    def do_POST(self):
+        if self._refuse_foreign():
+            return
+        resource, job_id, _ = self._route()
+        if resource != 'jobs':
+            self._send_error(HTTPStatus.NOT_FOUND, "not found")
+            return
+        if job_id is not None:
+            self._not_allowed("GET, DELETE")
+            return
+        # Forms cannot send it, so no page can post a job without CORS
+        content_type = self.headers.get("Content-Type", "").split(';')[0].strip().lower()
+        if content_type != "application/json":
+            self.close_connection = True
+            self._send_error(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, "Content-Type must be application/json")
+            return
+        length = self.headers.get("Content-Length")
+        if length is None or not length.isdigit():
+            self.close_connection = True
+            self._send_error(HTTPStatus.LENGTH_REQUIRED, "Content-Length required")
+            return
+        if int(length) > DAEMON_MAX_BODY:
+            # The body is not read, so the connection cannot be reused
+            self.close_connection = True
+            self._send_error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"body over {DAEMON_MAX_BODY} bytes")
+            return
+        body = self.rfile.read(int(length))
+        try:
+            job = self.app.submit(json.loads(body))
+        except ValueError as e:
+            self._send_error(HTTPStatus.BAD_REQUEST, str(e))
+            return
+        except DownloadError as e:
+            self._send_error(HTTPStatus.UNPROCESSABLE_ENTITY, str(e))
+            return
+        self._send_json(HTTPStatus.ACCEPTED, job, {"Location": f"/jobs/{job['id']}"})
+
+    def do_DELETE(self):
+        if self._refuse_foreign():
+            return
+        resource, job_id, query = self._route()
+        if resource != 'jobs':
+            self._send_error(HTTPStatus.NOT_FOUND, "not found")
+            return
+        if job_id is None:
+            self._not_allowed("GET, POST")
+            return
+        keep_partial = query.get('keep_partial', ['0'])[0].lower() in ('1', 'true', 'yes')
+        try:
+            self._send_json(HTTPStatus.ACCEPTED, self.app.cancel(job_id, keep_partial))
+        except KeyError:
+            self._send_error(HTTPStatus.NOT_FOUND, f"no such job: {job_id}")
+
+    def _write_event(self, event: str, data: Dict) -> None:
+        self.wfile.write(f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode('utf-8'))
+
+    def _stream_events(self, job_id: Optional[str]) -> None:
+        """Send a ``status`` snapshot of the jobs, then their ``progress`` events."""
+        # Subscribed before the snapshot, so no event falls in between
+        stream = self.app.open_stream()
+        try:
+            try:
+                snapshot = self.app.jobs() if job_id is None else [self.app.job(job_id)]
+            except KeyError:
+                self._send_error(HTTPStatus.NOT_FOUND, f"no such job: {job_id}")
+                return
+            # No Content-Length: the stream ends when the connection closes
+            self.close_connection = True
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for job in snapshot:
+                self._write_event('status', job)
+            self.wfile.flush()
+            while True:
+                try:
+                    events = stream.get(timeout=DAEMON_SSE_KEEPALIVE)
+                except queue.Empty:
+                    # Keeps proxies from timing out, and notices gone clients
+                    self.wfile.write(b": keepalive\n\n")
+                    self.wfile.flush()
+                    continue
+                if events is None:
+                    break
+                for event in events:
+                    if job_id is None or event.task_id == job_id:
+                        data = event._asdict()
+                        data['id'] = data.pop('task_id')
+                        self._write_event('progress', data)
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.app.close_stream(stream)
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve the downloader over a local HTTP API")
+    parser.add_argument("--host", default=DAEMON_HOST)
+    parser.add_argument("--port", type=int, default=DAEMON_PORT)
+    parser.add_argument("-f", "--format", default="MP4", help="Default format (MP4, mp3, aac...)")
+    parser.add_argument("-q", "--quality", help="Default quality (720p, 192kbps...)")
+    parser.add_argument("-o", "--output-dir", default=DOWNLOADS_DIR)
+    parser.add_argument("-j", "--concurrency", type=int, default=MAX_CONCURRENT_DOWNLOADS,
+                        help="Downloads running at the same time")
+    parser.add_argument("--processes", action="store_true",
+                        help="Run yt-dlp in worker processes, so extraction uses every core")
+    args = parser.parse_args(argv)
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
+    fields = dict(format=args.format)
+    if args.quality:
+        fields['quality'] = args.quality
+    defaults = job_options(DownloadOptions(format="MP4", quality="720p", output_dir=args.output_dir), **fields)
+    downloader = MediaDownloader(journal=JobJournal(DAEMON_JOURNAL_PATH), resume=False,
+                                 max_concurrent=args.concurrency,
+                                 execution_mode='process' if args.processes else EXECUTION_MODE)
+    try:
+        daemon = DownloadDaemon(downloader, defaults, host=args.host, port=args.port)
+        if RESUME_INCOMPLETE_JOBS:
+            daemon.resume()
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            daemon.shutdown()
+    finally:
+        # Queued jobs are interrupted, not downloaded before exiting, and
+        # resume on the next start
+        downloader.close(cancel_pending=True)
+    return 0
@@ -3,26 +3,60 @@ from pathlib import Path
 import os
 import logging
 import threading
-from concurrent.futures import ThreadPoolExecutor
-from dataclasses import dataclass
-from typing import Optional, Callable, Dict
-import yt_dlp
+from dataclasses import asdict, dataclass, replace
+from typing import Optional, Callable, Dict, List
+import uuid
 import time
 
 from src.config.settings import (
+    BANDWIDTH_LIMIT,
     DOWNLOADS_DIR,
+    EXECUTION_MODE,
     VIDEO_FORMATS,
     AUDIO_FORMATS,
     VIDEO_QUALITIES,
     AUDIO_QUALITIES,
-    ERROR_MESSAGES
+    ERROR_MESSAGES,
+    MAX_CONCURRENT_DOWNLOADS,
+    MAX_DOWNLOAD_SIZE,
+    MAX_RETRIES,
+    PLAYLIST_SETTINGS,
+    PROCESS_WORKERS,
+    PROGRESS_RATE_HZ,
+    RATE_CONTROL,
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_COST_DOWNLOAD,
+    RATE_LIMIT_COST_INFO,
+    RATE_LIMIT_PERIOD,
+    RATE_LIMIT_REQUESTS,
+    RESUME_INCOMPLETE_JOBS,
+    RETRY_DELAY,
+    RETRY_MAX_DELAY
 )
+from src.core.engines import fragment_concurrency
+from src.core.format_planner import TRANSCODE, apply_audio_plan
+from src.core.playlist import expand_playlist, is_playlist
+from src.core.postprocess import PostProcessingPool, split_postprocessors
+from src.core.process_pool import ProcessYoutubeDLPool
+from src.core.ydl_pool import YoutubeDLPool, set_ratelimit
+from src.utils.archive import DownloadArchive
+from src.utils.bandwidth import BandwidthAllocator
+from src.utils.info_cache import InfoCache
+from src.utils.journal import JobJournal
+from src.utils.progress import ProgressBus, ProgressEvent, event_from_hook
+from src.utils.rate_control import AdaptiveRateController
+from src.utils.rate_limiter import HostRateLimiter
+from src.utils.retry import RetryPolicy, classify_error
+from src.utils.scheduler import DownloadScheduler
 from src.utils.utils import (
     validate_url,
     check_disk_space,
     ensure_dir,
+    estimate_filesize,
     get_safe_filename,
-    get_available_filename
+    get_available_filename,
+    extract_video_id,
+    remove_partial_files
 )
 
 @dataclass
@@ -33,23 +67,129 @@ class DownloadOptions:
     output_dir: str = DOWNLOADS_DIR
     playlist: bool = False
     convert_audio: bool = False
+    rate_limit: Optional[int] = None  # bytes per second, on top of the shared budget
+    fragments: Optional[int] = None  # DASH/HLS fragments fetched at once, None tunes it
 
 class DownloadError(Exception):
     """Custom exception for download-related errors."""
     pass
 
+class DownloadCancelled(DownloadError):
+    """Raised inside a running download when it gets cancelled."""
+    pass
+
+def build_ydl_options(options: DownloadOptions, concurrent_fragments: int = 1) -> dict:
+    """Build options dictionary for yt-dlp.
+
+    Progress hooks are not part of the options: they are attached per job
+    by the YoutubeDL pool, so equal options share a warm instance.
+    ``concurrent_fragments`` applies unless ``options.fragments`` is set.
+    """
+    # The video ID in the name lets the archive be rebuilt from disk
+    output_template = str(Path(options.output_dir) / '%(title)s [%(id)s].%(ext)s')
+    
+    ydl_opts = {
+        'format': get_format_string(options),
+        'outtmpl': output_template,
+        'quiet': True,
+        'no_warnings': True,
+        'concurrent_fragment_downloads': options.fragments or concurrent_fragments,
+        # Checked by yt-dlp once the size is known, when it was not up front
+        'max_filesize': MAX_DOWNLOAD_SIZE
+    }
+    if options.rate_limit:
+        ydl_opts['ratelimit'] = options.rate_limit
+    
+    if options.convert_audio:
+        ydl_opts.update({
+            'postprocessors': [{
+                'key': 'FFmpegExtractAudio',
+                'preferredcodec': options.format.lower(),
+                'preferredquality': options.quality.replace('kbps', '')
+            }]
+        })
+        
+    return ydl_opts
+
+def get_format_string(options: DownloadOptions) -> str:
+    """Generate format string based on options."""
+    if options.format in AUDIO_FORMATS.values():
+        return 'bestaudio'
+    
+    quality_map = {
+        '2160p (4K)': '2160',
+        '1440p (2K)': '1440',
+        '1080p': '1080',
+        '720p': '720',
+        '480p': '480',
+        '360p': '360'
+    }
+    
+    quality = quality_map.get(options.quality, '720')
+    return f'bestvideo[height<={quality}]+bestaudio/best[height<={quality}]'
+
 class MediaDownloader:
     """Handles downloading media from YouTube with progress tracking."""
     
-    def __init__(self):
-        self._executor = ThreadPoolExecutor(max_workers=8)
+    def __init__(self, info_cache: Optional[InfoCache] = None,
+                 journal: Optional[JobJournal] = None,
+                 resume: bool = RESUME_INCOMPLETE_JOBS,
+                 archive: Optional[DownloadArchive] = None,
+                 rate_control: Optional[AdaptiveRateController] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 max_concurrent: int = MAX_CONCURRENT_DOWNLOADS,
+                 execution_mode: str = EXECUTION_MODE,
+                 ydl_pool: Optional[YoutubeDLPool] = None,
+                 postprocess: Optional[PostProcessingPool] = None):
+        if execution_mode not in ('thread', 'process'):
+            raise ValueError(f"Unknown execution mode: {execution_mode}")
+        # Downloads and playlist expansions; playlist entries use the
+        # playlist ID as owner so several playlists share workers fairly
+        self._scheduler = DownloadScheduler(max_workers=max_concurrent)
+        # Parallel fragments per download, so that all workers together stay
+        # within SOCKET_BUDGET connections
+        self._fragments = fragment_concurrency(max_concurrent)
+        # Audio conversions run here once the raw stream is on disk, so
+        # they never hold one of the download workers
+        self._postprocess = postprocess or PostProcessingPool()
+        self._lock = threading.Lock()
+        if ydl_pool is not None:
+            self._ydl_pool = ydl_pool
+        elif execution_mode == 'process':
+            # yt-dlp runs in worker processes, one per download worker and
+            # one for metadata lookups, so extraction is not bound by the GIL
+            self._ydl_pool = ProcessYoutubeDLPool(workers=PROCESS_WORKERS or max_concurrent + 1)
+        else:
+            self._ydl_pool = YoutubeDLPool()
+        self._info_cache = info_cache or InfoCache()
+        # yt-dlp hooks fire for every chunk; the bus coalesces them per
+        # download and calls the per-download callbacks at PROGRESS_RATE_HZ.
+        self.progress_bus = ProgressBus(rate_hz=PROGRESS_RATE_HZ)
+        self.progress_bus.subscribe(self._dispatch_progress)
         self._active_downloads: Dict[str, Dict] = {}
         self._logger = logging.getLogger(__name__)
         self._current_download = None
         self._cancel_event = threading.Event()
+        # Finished downloads, checked before any network access
+        self._archive = archive or DownloadArchive()
+        # Every job is journaled so that a crash or kill does not lose it
+        self._journal = journal or JobJournal()
+        # Per-host request rates, lowered while a site throttles us
+        self.rate_control = rate_control or AdaptiveRateController(
+            HostRateLimiter(RATE_LIMIT_REQUESTS, RATE_LIMIT_PERIOD, RATE_LIMIT_BURST),
+            **RATE_CONTROL
+        )
+        # BANDWIDTH_LIMIT split between running downloads, rebalanced as
+        # they start and finish
+        self.bandwidth = BandwidthAllocator(BANDWIDTH_LIMIT)
+        # Transient and throttling failures are retried with backoff
+        self.retry_policy = retry_policy or RetryPolicy(MAX_RETRIES, RETRY_DELAY, RETRY_MAX_DELAY)
+        if resume:
+            self.resume_incomplete_jobs()
 
     def download(self, url: str, options: DownloadOptions, 
-                progress_callback: Optional[Callable] = None) -> str:
+                progress_callback: Optional[Callable] = None,
+                download_id: Optional[str] = None) -> str:
         """
         Start a download with the specified options.
         
@@ -57,6 +197,7 @@ class MediaDownloader:
             url: YouTube URL to download from
             options: Download configuration options
             progress_callback: Optional callback for progress updates
+            download_id: Reuse an existing ID (when resuming a journaled job)
             
         Returns:
             str: Download ID for tracking
@@ -65,92 +206,435 @@ class MediaDownloader:
             DownloadError: If download initialization fails
         """
         try:
-            ydl_opts = self._build_ydl_options(options, progress_callback)
-            download_id = str(len(self._active_downloads))
-            
-            future = self._executor.submit(
-                self._download_media,
-                url,
-                ydl_opts,
-                download_id
-            )
-            
-            self._active_downloads[download_id] = {
-                'future': future,
-                'progress': 0,
-                'status': 'downloading'
-            }
-            
-            return download_id
-            
+            return self._submit(url, options, progress_callback, download_id)
         except Exception as e:
             self._logger.error(f"Failed to start download: {str(e)}")
             raise DownloadError(f"Failed to initialize download: {str(e)}")
 
-    def _build_ydl_options(self, options: DownloadOptions, 
-                          progress_callback: Optional[Callable]) -> dict:
-        """Build options dictionary for yt-dlp."""
-        output_template = str(Path(options.output_dir) / '%(title)s.%(ext)s')
-        
-        ydl_opts = {
-            'format': self._get_format_string(options),
-            'outtmpl': output_template,
-            'progress_hooks': [
-                lambda d: self._progress_hook(d, progress_callback)
-            ],
+    def _submit(self, url: str, options: DownloadOptions,
+                progress_callback: Optional[Callable] = None,
+                download_id: Optional[str] = None,
+                parent_id: Optional[str] = None) -> str:
+        """Register and queue a download, or the expansion of a playlist."""
+        download_id = download_id or uuid.uuid4().hex
+        
+        if not options.playlist:
+            self._check_download_size(url)
+            archived = self._find_archived(url, options)
+            if archived is not None:
+                self._logger.info(f"Already downloaded, skipping: {archived['path']}")
+                self._active_downloads[download_id] = {
+                    'url': url,
+                    'progress': 100.0,
+                    'status': 'completed',
+                    'callback': progress_callback,
+                    'cancel_event': threading.Event(),
+                    'parent': parent_id,
+                    'children': [],
+                    'path': archived['path'],
+                    'skipped': True
+                }
+                self.progress_bus.publish(ProgressEvent(
+                    download_id, 'completed', percent=100.0,
+                    filename=archived['path'], timestamp=time.time()
+                ))
+                return download_id
+        
+        self._journal.record(download_id, 'submitted', url=url, options=asdict(options))
+        
+        self._active_downloads[download_id] = {
+            'url': url,
+            'progress': 0,
+            'status': 'downloading',
+            'callback': progress_callback,
+            'cancel_event': threading.Event(),
+            'keep_partial': False,
+            'options': options,
+            'parent': parent_id,
+            'children': [],
+            'expanded': False
+        }
+        if options.playlist:
+            # Expanding runs ahead of queued entry downloads
+            self._scheduler.submit(
+                self._expand_playlist, url, options, download_id,
+                task_id=download_id, priority=-1
+            )
+        else:
+            self._scheduler.submit(
+                self._download_media, url, self._build_ydl_options(options), download_id,
+                task_id=download_id, owner=parent_id or "default"
+            )
+        return download_id
+
+    def _check_download_size(self, url: str, info: Optional[Dict] = None) -> None:
+        """
+        Refuse a download that is larger than MAX_DOWNLOAD_SIZE.
+        
+        Uses ``info`` or cached metadata, so no request is made for the check.
+        
+        Raises:
+            DownloadError: If the extracted size exceeds the limit
+        """
+        info = info or self._info_cache.get(url)
+        if not info or is_playlist(info):
+            return
+        size = estimate_filesize(info)
+        if size and size > MAX_DOWNLOAD_SIZE:
+            raise DownloadError(
+                f"{url} is {size // (1024 * 1024)} MB, over the limit of "
+                f"{MAX_DOWNLOAD_SIZE // (1024 * 1024)} MB"
+            )
+
+    def _find_archived(self, url: str, options: DownloadOptions) -> Optional[Dict]:
+        """Look a URL up in the download archive without network access."""
+        video_id = extract_video_id(url)
+        if video_id is None:
+            return None
+        return self._archive.lookup(video_id, options.format, options.quality)
+
+    def resume_incomplete_jobs(self) -> List[str]:
+        """
+        Resubmit jobs the journal shows as interrupted.
+        
+        yt-dlp continues from the ``.part`` files those jobs left behind, and
+        jobs that completed are not in the list, so nothing is fetched twice.
+        
+        Returns:
+            list: IDs of the resumed downloads
+        """
+        resumed = []
+        for job in self._journal.incomplete():
+            # Jobs without options were journaled by the legacy downloader
+            if job['job_id'] in self._active_downloads or 'options' not in job:
+                continue
+            try:
+                options = DownloadOptions(**job['options'])
+                resumed.append(self.download(job['url'], options, download_id=job['job_id']))
+                self._logger.info(f"Resuming interrupted download: {job['url']}")
+            except (TypeError, DownloadError) as e:
+                self._logger.error(f"Cannot resume download {job['job_id']}: {str(e)}")
+                self._journal.record(job['job_id'], 'failed', error=str(e))
+        return resumed
+
+    def get_media_info(self, url: str, refresh: bool = False) -> Dict:
+        """
+        Extract metadata for a video or playlist without downloading it.
+        
+        Playlists are extracted flat (entries are not resolved). Results are
+        served from the info cache unless ``refresh`` is set.
+        
+        Raises:
+            DownloadError: If extraction fails
+        """
+        if not refresh:
+            info = self._info_cache.get(url)
+            if info is not None:
+                return info
+        
+        options = {
             'quiet': True,
-            'no_warnings': True
+            'no_warnings': True,
+            'skip_download': True,
+            'extract_flat': 'in_playlist'
         }
+        self._acquire_rate_limit(url, RATE_LIMIT_COST_INFO)
+        try:
+            with self._ydl_pool.lease(options) as ydl:
+                info = ydl.sanitize_info(ydl.extract_info(url, download=False))
+        except Exception as e:
+            self.rate_control.record_failure(url, e)
+            self._logger.error(f"Failed to extract info: {str(e)}")
+            raise DownloadError(f"Failed to extract info: {str(e)}")
         
-        if options.convert_audio:
-            ydl_opts.update({
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': options.format.lower(),
-                    'preferredquality': options.quality.replace('kbps', '')
-                }]
-            })
-            
-        return ydl_opts
+        self.rate_control.record_success(url)
+        self._info_cache.set(url, info)
+        return info
+
+    def _acquire_rate_limit(self, url: str, cost: float,
+                            cancel_event: Optional[threading.Event] = None) -> None:
+        """
+        Wait for rate limit tokens of the host of ``url``.
+        
+        Raises:
+            DownloadCancelled: If ``cancel_event`` is set while waiting
+        """
+        bucket = self.rate_control.limiter.for_url(url)
+        if bucket.try_acquire(cost):
+            return
+        self._logger.info(f"Rate limit reached, waiting for {url}")
+        # Short waits, so a cancelled download leaves the queue promptly
+        while not bucket.acquire(timeout=0.5, cost=cost):
+            if cancel_event is not None and cancel_event.is_set():
+                raise DownloadCancelled(f"Download of {url} cancelled")
+
+    def _build_ydl_options(self, options: DownloadOptions) -> dict:
+        """Build options dictionary for yt-dlp."""
+        return build_ydl_options(options, self._fragments)
 
     def _get_format_string(self, options: DownloadOptions) -> str:
         """Generate format string based on options."""
-        if options.format in AUDIO_FORMATS.values():
-            return 'bestaudio'
-        
-        quality_map = {
-            '2160p (4K)': '2160',
-            '1440p (2K)': '1440',
-            '1080p': '1080',
-            '720p': '720',
-            '480p': '480',
-            '360p': '360'
+        return get_format_string(options)
+
+    def _expand_playlist(self, url: str, options: DownloadOptions, download_id: str) -> None:
+        """
+        Resolve a playlist and queue one download per entry.
+        
+        Entries are selected with PLAYLIST_SETTINGS (max_items,
+        reverse_order, skip_existing). A URL that turns out to be a single
+        video is downloaded as this job.
+        """
+        download = self._active_downloads[download_id]
+        try:
+            info = self.get_media_info(url)
+        except DownloadError as e:
+            download['status'] = 'failed'
+            download['error'] = str(e)
+            self._journal.record(download_id, 'failed', error=str(e))
+            self.progress_bus.publish(ProgressEvent(download_id, 'failed', timestamp=time.time()))
+            return
+        
+        if not is_playlist(info):
+            try:
+                self._check_download_size(url, info)
+            except DownloadError as e:
+                download['status'] = 'failed'
+                download['error'] = str(e)
+                self._journal.record(download_id, 'failed', error=str(e))
+                self.progress_bus.publish(ProgressEvent(download_id, 'failed', timestamp=time.time()))
+                return
+            self._download_media(url, self._build_ydl_options(options), download_id)
+            return
+        
+        entries = expand_playlist(
+            info,
+            max_items=PLAYLIST_SETTINGS['max_items'],
+            reverse_order=PLAYLIST_SETTINGS['reverse_order'],
+            skip_existing=PLAYLIST_SETTINGS['skip_existing'],
+            output_dir=options.output_dir
+        )
+        self._logger.info(f"Playlist {url}: downloading {len(entries)} entries")
+        entry_options = replace(options, playlist=False)
+        for entry in entries:
+            if download['cancel_event'].is_set():
+                break
+            try:
+                child_id = self._submit(entry.url, entry_options, parent_id=download_id)
+            except Exception as e:
+                # A refused entry (too large, for one) does not stop the others
+                child_id = self._fail_entry(entry.url, entry_options, download_id, str(e))
+            with self._lock:
+                download['children'].append(child_id)
+        with self._lock:
+            download['expanded'] = True
+        
+        # The entries are journaled on their own; resuming must not expand
+        # the playlist again
+        self._journal.record(download_id, 'completed', entries=len(download['children']))
+        if download['cancel_event'].is_set():
+            # Entries queued while the cancel was in progress
+            for child_id in download['children']:
+                self.cancel_download(child_id)
+            if download['status'] == 'downloading':
+                self._finish_cancelled(download_id)
+        elif not entries:
+            download['status'] = 'completed'
+            self.progress_bus.publish(ProgressEvent(download_id, 'completed', timestamp=time.time()))
+        else:
+            self._update_parent(download_id)
+
+    def _fail_entry(self, url: str, options: DownloadOptions, parent_id: str, error: str) -> str:
+        """Register a playlist entry that could not be queued as failed."""
+        self._logger.error(f"Cannot download playlist entry {url}: {error}")
+        child_id = uuid.uuid4().hex
+        self._active_downloads[child_id] = {
+            'url': url,
+            'progress': 0,
+            'status': 'failed',
+            'error': error,
+            'callback': None,
+            'cancel_event': threading.Event(),
+            'keep_partial': False,
+            'options': options,
+            'parent': parent_id,
+            'children': [],
+            'expanded': False
         }
+        self.progress_bus.publish(ProgressEvent(child_id, 'failed', timestamp=time.time()))
+        return child_id
+
+    def _update_parent(self, download_id: str) -> None:
+        """Publish the progress of a playlist from the state of its entries."""
+        download = self._active_downloads[download_id]
+        with self._lock:
+            children = [self._active_downloads[child_id] for child_id in download['children']]
+            finished = [child for child in children
+                        if child['status'] not in ('downloading', 'processing')]
+            if (download['status'] != 'downloading' or not download['expanded']
+                    or download['cancel_event'].is_set()):
+                return
+            percent = 100.0 * len(finished) / len(children)
+            download['progress'] = percent
+            done = len(finished) == len(children)
+            if done:
+                failed = [child for child in finished if child['status'] == 'failed']
+                download['status'] = 'failed' if failed else 'completed'
+                if failed:
+                    download['error'] = f"{len(failed)} of {len(children)} entries failed"
         
-        quality = quality_map.get(options.quality, '720')
-        return f'bestvideo[height<={quality}]+bestaudio/best[height<={quality}]'
+        status = download['status'] if done else 'downloading'
+        self.progress_bus.publish(ProgressEvent(download_id, status, percent=percent, timestamp=time.time()))
 
     def _download_media(self, url: str, ydl_opts: dict, download_id: str) -> None:
-        """Execute the actual download."""
-        try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
-            self._active_downloads[download_id]['status'] = 'completed'
-        except Exception as e:
-            self._logger.error(f"Download failed: {str(e)}")
-            self._active_downloads[download_id]['status'] = 'failed'
-            self._active_downloads[download_id]['error'] = str(e)
+        """Execute the actual download on a pooled YoutubeDL instance.
+        
+        Failures are classified (see ``classify_error``) and transient or
+        throttling ones retried under ``retry_policy``; playlist entries use
+        ``entry_retries`` and ``retry_delay`` of PLAYLIST_SETTINGS instead.
+        yt-dlp continues from the ``.part`` files of the failed attempt.
+        """
+        download = self._active_downloads[download_id]
+        if download['cancel_event'].is_set():
+            self._finish_cancelled(download_id)
+            return
+        policy = self.retry_policy
+        if download['parent']:
+            policy = replace(policy, max_retries=PLAYLIST_SETTINGS['entry_retries'],
+                             base_delay=PLAYLIST_SETTINGS['retry_delay'])
+        # Fetch a stream in the target codec when there is one, so audio
+        # is copied rather than re-encoded
+        ydl_opts, plan = apply_audio_plan(ydl_opts, self._info_cache.get(url))
+        if plan is None or plan.action == TRANSCODE:
+            ydl_opts, deferred = split_postprocessors(ydl_opts)
+        else:
+            # A stream copy is cheap enough to stay with the download
+            deferred = []
+        hooks = [lambda d: self._progress_hook(d, download_id)]
+        pp_hooks = [lambda d: self._postprocessor_hook(d, download_id)]
+        self._journal.record(download_id, 'started')
+        attempt = 0
+        while True:
+            try:
+                self._acquire_rate_limit(url, RATE_LIMIT_COST_DOWNLOAD, download['cancel_event'])
+                with self.bandwidth.register(download_id, download['options'].rate_limit) as share, \
+                        self._ydl_pool.lease(dict(ydl_opts, ratelimit=share.rate), progress_hooks=hooks,
+                                             postprocessor_hooks=pp_hooks) as ydl:
+                    # Other downloads starting or finishing change our share
+                    unsubscribe = share.subscribe(lambda rate: set_ratelimit(ydl, rate))
+                    try:
+                        if ydl.download([url]) != 0:
+                            raise DownloadError(f"yt-dlp reported errors for {url}")
+                    finally:
+                        unsubscribe()
+                self.rate_control.record_success(url)
+                if deferred and download.get('path'):
+                    download['status'] = 'processing'
+                    self._postprocess.submit(
+                        download_id, download['path'], deferred,
+                        lambda path, error: self._finish_postprocess(download_id, path, error),
+                        owner=download['parent'] or "default"
+                    )
+                else:
+                    download['status'] = 'completed'
+                    self._journal.record(download_id, 'completed', path=download.get('path'))
+                    self._archive_download(download)
+                break
+            except Exception as e:
+                if download['cancel_event'].is_set():
+                    self._finish_cancelled(download_id)
+                    return
+                self.rate_control.record_failure(url, e)
+                category = classify_error(e)
+                if policy.should_retry(category, attempt):
+                    delay = policy.backoff(attempt)
+                    attempt += 1
+                    download['retries'] = attempt
+                    self._logger.warning(f"Retrying {url} in {delay:.1f}s "
+                                         f"({attempt}/{policy.max_retries}, {category}): {str(e)}")
+                    self._journal.record(download_id, 'retrying', attempt=attempt, category=category)
+                    # Waiting on the event lets a cancel interrupt the delay
+                    if download['cancel_event'].wait(delay):
+                        self._finish_cancelled(download_id)
+                        return
+                    continue
+                self._logger.error(f"Download failed ({category}): {str(e)}")
+                download['status'] = 'failed'
+                download['error'] = str(e)
+                download['error_category'] = category
+                self._journal.record(download_id, 'failed', error=str(e), category=category)
+                break
+        self.progress_bus.publish(ProgressEvent(download_id, download['status'], timestamp=time.time()))
+        if download['parent']:
+            self._update_parent(download['parent'])
+
+    def _finish_postprocess(self, download_id: str, path: Optional[str],
+                            error: Optional[Exception]) -> None:
+        """Complete a download once the post-processing pool is done with it."""
+        download = self._active_downloads[download_id]
+        if error is None:
+            download['path'] = path
+            download['status'] = 'completed'
+            self._journal.record(download_id, 'completed', path=path)
+            self._archive_download(download)
+        else:
+            download['status'] = 'failed'
+            download['error'] = f"Post-processing failed: {str(error)}"
+            self._journal.record(download_id, 'failed', error=download['error'])
+        self.progress_bus.publish(ProgressEvent(download_id, download['status'], timestamp=time.time()))
+        if download['parent']:
+            self._update_parent(download['parent'])
+
+    def pipeline_stats(self) -> Dict[str, Dict]:
+        """Queue depth, worker usage and counters of both stages."""
+        return {'download': self._scheduler.stats(), 'postprocess': self._postprocess.stats()}
+
+    def _postprocessor_hook(self, d: dict, download_id: str) -> None:
+        """Remember the final file of a download once post-processing is done."""
+        if d.get('status') == 'finished':
+            info = d.get('info_dict') or {}
+            download = self._active_downloads[download_id]
+            download['video_id'] = info.get('id')
+            download['path'] = info.get('filepath') or download.get('path')
+
+    def _archive_download(self, download: Dict) -> None:
+        """Add a finished download to the archive."""
+        if download.get('video_id') and download.get('path'):
+            options = download['options']
+            self._archive.add(download['video_id'], options.format, options.quality, download['path'])
 
-    def _progress_hook(self, d: dict, callback: Optional[Callable]) -> None:
+    def _progress_hook(self, d: dict, download_id: str) -> None:
         """Handle download progress updates."""
-        if d['status'] == 'downloading':
-            progress = d.get('_percent_str', '0%').replace('%', '')
-            try:
-                progress = float(progress)
-                if callback:
-                    callback(progress)
-            except ValueError:
-                pass
+        if self._active_downloads[download_id]['cancel_event'].is_set():
+            # Propagates out of ydl.download(), freeing the worker
+            raise DownloadCancelled(f"Download {download_id} cancelled")
+        event = event_from_hook(d, download_id)
+        if event.filename:
+            self._journal.add_file(download_id, event.filename)
+        self.progress_bus.publish(event)
+
+    def _dispatch_progress(self, events: List[ProgressEvent]) -> None:
+        """Deliver a coalesced batch of progress events to download callbacks."""
+        for event in events:
+            download = self._active_downloads.get(event.task_id)
+            if download is None or event.percent is None:
+                continue
+            download['progress'] = event.percent
+            callback = download.get('callback')
+            if callback and event.status == 'downloading':
+                callback(event.percent)
+
+    def subscribe_progress(self, callback: Callable[[List[ProgressEvent]], None]) -> Callable[[], None]:
+        """
+        Receive batches of progress events for all downloads.
+        
+        Args:
+            callback: Called with a list of ProgressEvent, at most
+                PROGRESS_RATE_HZ times per second
+            
+        Returns:
+            Callable: Function that removes the subscription
+        """
+        return self.progress_bus.subscribe(callback)
 
     def get_download_status(self, download_id: str) -> Dict:
         """Get the current status of a download."""
@@ -158,22 +642,134 @@ class MediaDownloader:
             raise KeyError(f"Download ID {download_id} not found")
         
         return {
+            'url': self._active_downloads[download_id]['url'],
             'progress': self._active_downloads[download_id]['progress'],
             'status': self._active_downloads[download_id]['status'],
-            'error': self._active_downloads[download_id].get('error')
+            'error': self._active_downloads[download_id].get('error'),
+            'retries': self._active_downloads[download_id].get('retries', 0),
+            'path': self._active_downloads[download_id].get('path')
         }
 
-    def cancel_download(self, download_id: str) -> None:
-        """Cancel an active download."""
-        if download_id in self._active_downloads:
-            self._active_downloads[download_id]['future'].cancel()
-            self._active_downloads[download_id]['status'] = 'cancelled'
+    def forget(self, download_id: str) -> bool:
+        """
+        Drop a finished download, with the entries of a playlist.
+        
+        Long-running front ends call this so that the state of every
+        download ever made is not kept in memory. Afterwards
+        ``get_download_status`` raises KeyError for it.
+        
+        Returns:
+            bool: False, and nothing is dropped, while the download or one
+            of its entries has not finished
+        """
+        with self._lock:
+            if download_id not in self._active_downloads or not self._is_finished(download_id):
+                return False
+            forgotten = [download_id]
+            for forgotten_id in forgotten:
+                forgotten.extend(self._active_downloads.pop(forgotten_id)['children'])
+        for forgotten_id in forgotten:
+            self._scheduler.forget(forgotten_id)
+        return True
+
+    def _is_finished(self, download_id: str) -> bool:
+        """Whether a download and its entries are done, including their worker tasks."""
+        download = self._active_downloads[download_id]
+        if download['status'] in ('downloading', 'processing'):
+            return False
+        options = download.get('options')
+        if options is not None and options.playlist and not download['expanded']:
+            return False
+        try:
+            # The status is final a little before the worker returns
+            if self._scheduler.get_status(download_id)['status'] in ('queued', 'running'):
+                return False
+        except KeyError:
+            pass
+        return all(self._is_finished(child_id) for child_id in download['children'])
+
+    def cancel_download(self, download_id: str, keep_partial: bool = False) -> None:
+        """
+        Cancel a queued or running download.
+        
+        A queued download is removed from the queue. A running one stops at
+        its next progress hook, which frees its worker right away. One that
+        waits for post-processing leaves that queue.
+        
+        Args:
+            download_id: ID returned by ``download``
+            keep_partial: Keep ``.part`` files so that downloading the same
+                URL again continues where this one stopped
+        """
+        download = self._active_downloads.get(download_id)
+        if download is None:
+            return
+        if download['status'] == 'processing':
+            # A conversion that has started is left to finish
+            if self._postprocess.cancel(download_id):
+                download['keep_partial'] = keep_partial
+                if not keep_partial:
+                    remove_partial_files([download['path']])
+                self._finish_cancelled(download_id)
+            return
+        if download['status'] != 'downloading':
+            return
+        download['keep_partial'] = keep_partial
+        download['cancel_event'].set()
+        with self._lock:
+            children = list(download['children'])
+        for child_id in children:
+            self.cancel_download(child_id, keep_partial)
+        if self._scheduler.cancel(download_id) or children:
+            self._finish_cancelled(download_id)
+
+    def _finish_cancelled(self, download_id: str) -> None:
+        """Record a cancellation and clean up partial files.
+
+        A download stopped by ``close`` is journaled as interrupted rather
+        than cancelled, so the next run resumes it.
+        """
+        download = self._active_downloads[download_id]
+        download['status'] = 'cancelled'
+        job = self._journal.get(download_id) or {}
+        if not download['keep_partial']:
+            remove_partial_files(job.get('files', []))
+        if download.get('interrupted'):
+            self._journal.record(download_id, 'interrupted')
+        else:
+            self._journal.record(download_id, 'cancelled', kept_partial=download['keep_partial'])
+        self.progress_bus.publish(ProgressEvent(download_id, 'cancelled', timestamp=time.time()))
+        self._logger.info(f"Download cancelled: {download_id}")
+        if download['parent']:
+            self._update_parent(download['parent'])
+
+    def close(self, cancel_pending: bool = False) -> None:
+        """
+        Release the workers and caches.
+        
+        By default every queued and running download is finished first.
+        With ``cancel_pending`` they are stopped instead, keeping their
+        partial files, so an interrupted batch stops right away. They are
+        journaled as interrupted, not cancelled, and resume on the next run.
+        """
+        if cancel_pending:
+            for download_id in list(self._active_downloads):
+                self._active_downloads[download_id]['interrupted'] = True
+                self.cancel_download(download_id, keep_partial=True)
+            self._cancel_event.set()
+        self._scheduler.shutdown(cancel_pending=cancel_pending)
+        self._postprocess.shutdown(cancel_pending=cancel_pending)
+        self.progress_bus.close()
+        self._ydl_pool.close()
+        self._info_cache.close()
+        self._archive.close()
 
     def start_download(self, url: str):
         """Start the download process for the given URL."""
         self._cancel_event.clear()  # Clear the cancel event
         logging.info(f"Starting download for URL: {url}")  # Log for debugging
-        self._current_download = self._executor.submit(self._download, url)
+        # Runs on a download worker like every other job
+        self._current_download = self._scheduler.submit(self._download, url)
         logging.info(f"Download started for URL: {url}")  # Log for debugging
         logging.debug(f"Current download set: {self._current_download}")
 
@@ -200,7 +796,7 @@ class MediaDownloader:
         if self._current_download:
             self._cancel_event.set()  # Set the cancel event
             logging.info("Cancel event set.")  # Log for debugging
-            self._current_download.cancel()  # Cancel the current download task
+            self._scheduler.cancel(self._current_download)  # Drop it if it has not started yet
             logging.info("Download request to cancel sent.")
             self._current_download = None  # Reset current download reference
         else:
@@ -0,0 +1,302 @@
+"""Download engines: in-process yt_dlp.YoutubeDL or a yt-dlp subprocess.
+
+Both engines take the same yt-dlp option dictionary (the keys accepted by
+``yt_dlp.YoutubeDL``), so callers build their options once and pick the
+backend through configuration.
+"""
+import json
+import logging
+import os
+import signal
+import subprocess
+import threading
+from typing import Callable, Dict, List, Optional, Union
+
+from src.config.settings import MAX_FRAGMENT_DOWNLOADS, SOCKET_BUDGET
+from src.core.ydl_pool import YoutubeDLPool, set_ratelimit
+from src.utils.bandwidth import BandwidthShare
+from src.utils.progress import ProgressEvent, event_from_hook, parse_progress_line
+
+ProgressCallback = Callable[[ProgressEvent], None]
+
+DESTINATION_PREFIX = "[download] Destination: "
+
+class EngineError(Exception):
+    """Raised when an engine fails to extract or download media."""
+    pass
+
+class EngineCancelled(EngineError):
+    """Raised when a download stops because its cancel event was set."""
+    pass
+
+def terminate_process_group(process: subprocess.Popen, grace: float = 2.0) -> None:
+    """Stop a process and its children (ffmpeg, ...), escalating to SIGKILL.
+
+    Args:
+        process: Process started with ``start_new_session=True`` on POSIX
+        grace: Seconds to wait after SIGTERM before killing
+    """
+    if process.poll() is not None:
+        return
+    try:
+        if os.name == 'posix':
+            os.killpg(process.pid, signal.SIGTERM)
+        else:
+            process.terminate()
+        process.wait(grace)
+    except subprocess.TimeoutExpired:
+        if os.name == 'posix':
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+        process.wait()
+    except ProcessLookupError:
+        pass
+
+def fragment_concurrency(workers: int, budget: int = SOCKET_BUDGET,
+                         limit: int = MAX_FRAGMENT_DOWNLOADS) -> int:
+    """Fragments each download may fetch at once, for ``workers`` parallel jobs.
+
+    Job and fragment parallelism multiply, so the socket budget is divided
+    between the workers. With two or more, yt-dlp also downloads the video
+    and audio of a DASH format at the same time.
+
+    Args:
+        workers: Downloads running at the same time
+        budget: Connections allowed for all of them together
+        limit: Upper bound for a single download
+
+    Returns:
+        int: Value for yt-dlp's ``concurrent_fragment_downloads`` (``-N``)
+    """
+    return max(1, min(limit, budget // max(1, workers)))
+
+class DownloadEngine:
+    """Base class for download backends."""
+
+    name = "base"
+
+    def extract_info(self, url: str, flat: bool = False) -> Dict:
+        """Extract metadata for a URL without downloading it.
+
+        Args:
+            url: Media or playlist URL
+            flat: Do not resolve playlist entries (``--flat-playlist``)
+
+        Returns:
+            dict: Info dictionary as produced by yt-dlp
+        """
+        raise NotImplementedError
+
+    def download(self, url: str, options: Dict,
+                 progress_callback: Optional[ProgressCallback] = None,
+                 cancel_event: Optional[threading.Event] = None,
+                 bandwidth: Optional[BandwidthShare] = None) -> None:
+        """Download a URL using yt-dlp options.
+
+        Args:
+            url: Media URL
+            options: yt-dlp option dictionary
+            progress_callback: Optional callback receiving ProgressEvent records
+            cancel_event: Stops the download when set
+            bandwidth: Rate share of the job; overrides ``ratelimit`` in
+                ``options`` and, where the engine can, follows rebalancing
+
+        Raises:
+            EngineCancelled: If ``cancel_event`` was set
+            EngineError: If the download failed
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release resources held by the engine."""
+        pass
+
+class SubprocessEngine(DownloadEngine):
+    """Runs the yt-dlp command line tool once per job."""
+
+    name = "subprocess"
+
+    def __init__(self, command: Union[str, List[str]] = "yt-dlp"):
+        self.command = [command] if isinstance(command, str) else list(command)
+        self.logger = logging.getLogger(__name__)
+
+    def build_command(self, url: str, options: Dict) -> List[str]:
+        """Translate yt-dlp options into command line arguments."""
+        cmd = list(self.command)
+        if options.get('no_warnings'):
+            cmd.append("--no-warnings")
+        cmd.append("--newline")
+        if options.get('format'):
+            cmd.extend(["-f", options['format']])
+        if options.get('merge_output_format'):
+            cmd.extend(["--merge-output-format", options['merge_output_format']])
+        for pp in options.get('postprocessors', []):
+            if pp.get('key') == 'FFmpegExtractAudio':
+                cmd.extend(["-x", "--audio-format", pp.get('preferredcodec', 'best')])
+                if pp.get('preferredquality') is not None:
+                    cmd.extend(["--audio-quality", str(pp['preferredquality'])])
+        for args in options.get('postprocessor_args', {}).values():
+            cmd.extend(["--postprocessor-args", " ".join(args)])
+        if options.get('concurrent_fragment_downloads', 1) > 1:
+            cmd.extend(["-N", str(options['concurrent_fragment_downloads'])])
+        if options.get('ratelimit'):
+            cmd.extend(["--limit-rate", str(int(options['ratelimit']))])
+        if options.get('max_filesize'):
+            cmd.extend(["--max-filesize", str(int(options['max_filesize']))])
+        if options.get('outtmpl'):
+            cmd.extend(["-o", options['outtmpl']])
+        cmd.append(url)
+        return cmd
+
+    def extract_info(self, url: str, flat: bool = False) -> Dict:
+        cmd = list(self.command) + ["--dump-single-json"]
+        if flat:
+            cmd.append("--flat-playlist")
+        cmd.append(url)
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            return json.loads(result.stdout)
+        except subprocess.CalledProcessError as e:
+            raise EngineError(e.stderr.strip() if e.stderr else str(e))
+        except json.JSONDecodeError as e:
+            raise EngineError(f"Invalid info JSON: {e}")
+
+    def download(self, url: str, options: Dict,
+                 progress_callback: Optional[ProgressCallback] = None,
+                 cancel_event: Optional[threading.Event] = None,
+                 bandwidth: Optional[BandwidthShare] = None) -> None:
+        if bandwidth is not None:
+            # The rate is fixed for the lifetime of the process, later
+            # rebalancing only reaches jobs that start after it
+            options = dict(options, ratelimit=bandwidth.rate)
+        cmd = self.build_command(url, options)
+        self.logger.debug(f"Running command: {' '.join(cmd)}")
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+            # Own process group, so cancelling also stops ffmpeg children
+            start_new_session=(os.name == 'posix')
+        )
+        if cancel_event is not None:
+            threading.Thread(
+                target=self._watch_cancel,
+                args=(process, cancel_event),
+                daemon=True
+            ).start()
+
+        # Monitor progress
+        while True:
+            line = process.stdout.readline()
+            if not line and process.poll() is not None:
+                break
+
+            if progress_callback:
+                event = self.parse_output_line(line)
+                if event is not None:
+                    progress_callback(event)
+
+        if cancel_event is not None and cancel_event.is_set():
+            raise EngineCancelled(f"Download cancelled: {url}")
+        if process.returncode != 0:
+            raise EngineError(process.stderr.read().strip())
+
+    @staticmethod
+    def parse_output_line(line: str) -> Optional[ProgressEvent]:
+        """Turn a line of yt-dlp output into a progress event, if it is one."""
+        if not line.startswith("[download]"):
+            return None
+        if line.startswith(DESTINATION_PREFIX):
+            filename = line[len(DESTINATION_PREFIX):].strip()
+            return ProgressEvent("", "downloading", filename=filename + ".part")
+        return parse_progress_line(line)
+
+    @staticmethod
+    def _watch_cancel(process: subprocess.Popen, cancel_event: threading.Event,
+                      interval: float = 0.05) -> None:
+        """Terminate ``process`` as soon as ``cancel_event`` is set."""
+        while not cancel_event.wait(interval):
+            if process.poll() is not None:
+                return
+        terminate_process_group(process)
+
+class InProcessEngine(DownloadEngine):
+    """Runs jobs on warm ``yt_dlp.YoutubeDL`` instances in this process.
+
+    Instances come from a ``YoutubeDLPool``, so extractors, cookie jars and
+    HTTP openers are initialised once per option set instead of once per job.
+    """
+
+    name = "inprocess"
+
+    def __init__(self, factory: Optional[Callable[[Dict], object]] = None,
+                 pool: Optional[YoutubeDLPool] = None):
+        self.pool = pool or YoutubeDLPool(factory=factory)
+        self.logger = logging.getLogger(__name__)
+
+    def extract_info(self, url: str, flat: bool = False) -> Dict:
+        options = {'quiet': True, 'no_warnings': True, 'skip_download': True}
+        if flat:
+            options['extract_flat'] = 'in_playlist'
+        try:
+            with self.pool.lease(options) as ydl:
+                info = ydl.extract_info(url, download=False)
+                return ydl.sanitize_info(info)
+        except Exception as e:
+            raise EngineError(str(e)) from e
+
+    def download(self, url: str, options: Dict,
+                 progress_callback: Optional[ProgressCallback] = None,
+                 cancel_event: Optional[threading.Event] = None,
+                 bandwidth: Optional[BandwidthShare] = None) -> None:
+        def hook(d):
+            # yt-dlp calls hooks for every chunk, so raising here stops the
+            # transfer within one chunk of the cancel request
+            if cancel_event is not None and cancel_event.is_set():
+                raise EngineCancelled(f"Download cancelled: {url}")
+            if progress_callback:
+                progress_callback(event_from_hook(d))
+
+        if bandwidth is not None:
+            options = dict(options, ratelimit=bandwidth.rate)
+        try:
+            with self.pool.lease(dict(options, quiet=True), progress_hooks=[hook]) as ydl:
+                unsubscribe = bandwidth.subscribe(lambda rate: set_ratelimit(ydl, rate)) if bandwidth else None
+                try:
+                    if ydl.download([url]) != 0:
+                        raise EngineError(f"yt-dlp reported errors for {url}")
+                finally:
+                    if unsubscribe:
+                        unsubscribe()
+        except EngineError:
+            raise
+        except Exception as e:
+            if cancel_event is not None and cancel_event.is_set():
+                raise EngineCancelled(f"Download cancelled: {url}")
+            raise EngineError(str(e)) from e
+
+    def close(self) -> None:
+        self.pool.close()
+
+ENGINES = {
+    SubprocessEngine.name: SubprocessEngine,
+    InProcessEngine.name: InProcessEngine
+}
+
+def create_engine(name: str, **kwargs) -> DownloadEngine:
+    """Create a download engine by name.
+
+    Args:
+        name: ``"inprocess"`` or ``"subprocess"``
+        **kwargs: Passed to the engine constructor
+
+    Raises:
+        ValueError: If the engine name is unknown
+    """
+    try:
+        return ENGINES[name](**kwargs)
+    except KeyError:
+        raise ValueError(f"Unknown download engine: {name}")
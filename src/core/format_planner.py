@@ -0,0 +1,138 @@
+"""Choose the audio stream so that a conversion can copy instead of re-encode.
+
+``FFmpegExtractAudio`` only copies the stream when the downloaded file
+already has the target codec, but ``bestaudio`` picks the best stream
+regardless of codec (on YouTube usually Opus, even when AAC is wanted).
+The planner picks a stream in the target codec, at or above the requested
+bitrate, and decides what is left to do with it:
+
+- ``download``: the stream is already the final file, no ffmpeg at all
+- ``remux``: same codec, other container; a cheap stream copy
+- ``transcode``: nothing suitable, re-encode as before
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DOWNLOAD = 'download'
+REMUX = 'remux'
+TRANSCODE = 'transcode'
+
+# Target codec -> (acodec prefixes that can be copied, extension yt-dlp
+# gives the converted file)
+COPYABLE_CODECS = {
+    'aac': (('mp4a', 'aac'), 'm4a'),
+    'm4a': (('mp4a', 'aac'), 'm4a'),
+    'opus': (('opus',), 'opus'),
+    'vorbis': (('vorbis',), 'ogg'),
+    'mp3': (('mp3',), 'mp3')
+}
+
+@dataclass
+class AudioPlan:
+    """How to produce an audio file from the available formats.
+
+    Attributes:
+        action (str): ``download``, ``remux`` or ``transcode``
+        format_id (str): Stream to download, None to keep the selector
+        abr (float): Bitrate of that stream in kbps
+    """
+    action: str
+    format_id: Optional[str] = None
+    abr: Optional[float] = None
+
+def target_bitrate(quality) -> Optional[float]:
+    """Requested bitrate in kbps from a ``preferredquality`` value.
+
+    Values up to 10 are VBR levels and names like ``Best`` carry no
+    bitrate; both return None.
+    """
+    try:
+        bitrate = float(str(quality).lower().replace('kbps', '').replace('k', ''))
+    except (TypeError, ValueError):
+        return None
+    return bitrate if bitrate > 10 else None
+
+def plan_audio(formats: Iterable[Dict], codec: str, quality=None) -> AudioPlan:
+    """Plan the extraction of ``codec`` audio from a list of formats.
+
+    Without a requested bitrate the best stream in the target codec is
+    used: copying it loses nothing, while re-encoding another lossy stream
+    would.
+
+    Args:
+        formats: ``formats`` of the extracted info
+        codec: ``preferredcodec`` of the conversion
+        quality: ``preferredquality`` of the conversion
+
+    Returns:
+        AudioPlan: The stream to fetch and what to do with it
+    """
+    if codec not in COPYABLE_CODECS:
+        return AudioPlan(TRANSCODE)
+    prefixes, extension = COPYABLE_CODECS[codec]
+    bitrate = target_bitrate(quality)
+    candidates = [
+        f for f in formats
+        if f.get('vcodec') == 'none' and f.get('format_id')
+        and (f.get('acodec') or '').lower().startswith(prefixes)
+        and (bitrate is None or (f.get('abr') or 0) >= bitrate)
+    ]
+    if not candidates:
+        return AudioPlan(TRANSCODE)
+    # Highest bitrate first; on a tie the one not needing a remux
+    best = max(candidates, key=lambda f: (f.get('abr') or 0, f.get('ext') == extension))
+    action = DOWNLOAD if best.get('ext') == extension else REMUX
+    return AudioPlan(action, best['format_id'], best.get('abr'))
+
+def audio_format_selector(codec: str, quality=None) -> Optional[str]:
+    """yt-dlp format selector preferring copyable streams of ``codec``.
+
+    Used when the formats are not known yet; yt-dlp then applies the same
+    preference while selecting.
+    """
+    if codec not in COPYABLE_CODECS:
+        return None
+    bitrate = target_bitrate(quality)
+    abr = f"[abr>=?{bitrate:g}]" if bitrate else ""
+    return "/".join(f"bestaudio[acodec^={prefix}]{abr}" for prefix in COPYABLE_CODECS[codec][0])
+
+def apply_audio_plan(options: Dict, info: Optional[Dict] = None) -> Tuple[Dict, Optional[AudioPlan]]:
+    """Rewrite yt-dlp options of an audio download to avoid re-encoding.
+
+    With the formats of ``info`` the stream is chosen here; without them
+    the format selector is extended so that yt-dlp prefers the same
+    streams, and FFmpegExtractAudio copies when it gets one.
+
+    Args:
+        options: yt-dlp options with an ``FFmpegExtractAudio`` postprocessor
+        info: Extracted info of the video, if known
+
+    Returns:
+        tuple: New options, and the plan (None when it is left to yt-dlp
+        or there is no audio extraction)
+    """
+    postprocessors: List[Dict] = options.get('postprocessors') or []
+    extract = next((pp for pp in postprocessors if pp.get('key') == 'FFmpegExtractAudio'), None)
+    if extract is None:
+        return options, None
+    codec = extract.get('preferredcodec')
+    quality = extract.get('preferredquality')
+    options = dict(options)
+
+    formats = (info or {}).get('formats')
+    if not formats:
+        selector = audio_format_selector(codec, quality)
+        if selector:
+            options['format'] = f"{selector}/{options['format']}" if options.get('format') else selector
+        return options, None
+
+    plan = plan_audio(formats, codec, quality)
+    if plan.action != TRANSCODE:
+        options['format'] = plan.format_id
+    if plan.action == DOWNLOAD:
+        remaining = [pp for pp in postprocessors if pp is not extract]
+        if remaining:
+            options['postprocessors'] = remaining
+        else:
+            del options['postprocessors']
+    return options, plan
@@ -0,0 +1,105 @@
+"""Playlist expansion: turn a playlist into one download job per entry.
+
+Expansion works on flat extraction results (``extract_flat`` /
+``--flat-playlist``), so resolving a channel with thousands of videos costs
+one request per page instead of one per video.
+"""
+import logging
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+from src.utils.archive import PARTIAL_SUFFIXES, parse_video_id
+
+_logger = logging.getLogger(__name__)
+
+@dataclass
+class PlaylistEntry:
+    """One video of an expanded playlist."""
+    index: int
+    url: str
+    video_id: Optional[str] = None
+    title: Optional[str] = None
+
+def is_playlist(info: Dict) -> bool:
+    """Check whether extracted info describes a playlist."""
+    return info.get('_type') in ('playlist', 'multi_video')
+
+def entry_url(entry: Dict) -> Optional[str]:
+    """Get a downloadable URL for a flat playlist entry."""
+    url = entry.get('webpage_url') or entry.get('url')
+    if url and '://' in url:
+        return url
+    video_id = entry.get('id') or url
+    if video_id and entry.get('ie_key', 'Youtube') == 'Youtube':
+        return f"https://www.youtube.com/watch?v={video_id}"
+    return url
+
+def _filename_stem(title: str) -> str:
+    """Sanitize a title the way yt-dlp does for ``%(title)s``."""
+    from yt_dlp.utils import sanitize_filename
+    return sanitize_filename(title)
+
+def existing_stems(directory: str) -> Set[str]:
+    """List names (without extension) of finished files in a directory.
+
+    Args:
+        directory: Download directory
+
+    Returns:
+        set: File name stems; empty if the directory does not exist
+    """
+    stems = set()
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.is_file() and not entry.name.endswith(PARTIAL_SUFFIXES):
+                    stems.add(os.path.splitext(entry.name)[0])
+    except FileNotFoundError:
+        pass
+    return stems
+
+def expand_playlist(info: Dict, max_items: Optional[int] = None, reverse_order: bool = False,
+                    skip_existing: bool = False, output_dir: Optional[str] = None) -> List[PlaylistEntry]:
+    """Select the entries of a playlist to download.
+
+    ``reverse_order`` is applied first, then ``max_items`` keeps the first
+    items, then ``skip_existing`` drops entries whose video ID or title
+    already matches a file in ``output_dir``.
+
+    Args:
+        info: Flat extraction result of a playlist
+        max_items: Maximum number of entries, None or 0 for all
+        reverse_order: Start from the last entry
+        skip_existing: Skip entries already present in ``output_dir``
+        output_dir: Directory the entries are downloaded to
+
+    Returns:
+        list: Entries to download, in download order
+    """
+    entries = []
+    for index, entry in enumerate(info.get('entries') or [], start=1):
+        if not entry:
+            # Unavailable videos show up as None
+            continue
+        url = entry_url(entry)
+        if url is None:
+            _logger.warning(f"Skipping playlist entry {index} without URL")
+            continue
+        entries.append(PlaylistEntry(index, url, entry.get('id'), entry.get('title')))
+
+    if reverse_order:
+        entries.reverse()
+    if max_items:
+        entries = entries[:max_items]
+
+    if skip_existing and output_dir:
+        stems = existing_stems(output_dir)
+        if stems:
+            ids = {parse_video_id(stem) for stem in stems} - {None}
+            entries = [
+                entry for entry in entries
+                if entry.video_id not in ids
+                and (not entry.title or _filename_stem(entry.title) not in stems)
+            ]
+    return entries
@@ -0,0 +1,139 @@
+"""Post-processing stage: CPU-bound ffmpeg work off the download workers.
+
+yt-dlp runs its postprocessors in the thread that downloaded the file, so
+an MP3 transcode would keep a network worker busy. The downloaders take
+the CPU-heavy postprocessors out of the yt-dlp options, fetch the raw
+stream, and hand the file to a ``PostProcessingPool`` sized to the cores.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.config.settings import POSTPROCESS_WORKERS
+from src.utils.scheduler import DownloadScheduler
+
+# yt-dlp postprocessors that run on the pool: option key -> class name
+DEFERRED_POSTPROCESSORS = {
+    'FFmpegExtractAudio': 'FFmpegExtractAudioPP'
+}
+
+PostprocessCallback = Callable[[Optional[str], Optional[Exception]], None]
+
+def split_postprocessors(options: Dict) -> Tuple[Dict, List[Dict]]:
+    """Separate the deferred postprocessors from yt-dlp options.
+
+    Args:
+        options: yt-dlp option dictionary
+
+    Returns:
+        tuple: Options for the download stage, and the postprocessor
+        entries (in order) to run on the pool afterwards
+    """
+    postprocessors = options.get('postprocessors') or []
+    deferred = [pp for pp in postprocessors if pp.get('key') in DEFERRED_POSTPROCESSORS]
+    if not deferred:
+        return options, []
+    options = dict(options)
+    inline = [pp for pp in postprocessors if pp.get('key') not in DEFERRED_POSTPROCESSORS]
+    if inline:
+        options['postprocessors'] = inline
+    else:
+        del options['postprocessors']
+    return options, deferred
+
+def run_postprocessors(path: str, postprocessors: List[Dict]) -> str:
+    """Run yt-dlp postprocessors on a downloaded file.
+
+    Args:
+        path: Downloaded file
+        postprocessors: Entries as in yt-dlp's ``postprocessors`` option
+
+    Returns:
+        str: Path of the resulting file
+
+    Raises:
+        yt_dlp.utils.PostProcessingError: If ffmpeg fails or is missing
+    """
+    import yt_dlp.postprocessor
+
+    info = {'filepath': path, 'ext': os.path.splitext(path)[1][1:]}
+    for spec in postprocessors:
+        cls = getattr(yt_dlp.postprocessor, DEFERRED_POSTPROCESSORS[spec['key']])
+        args = {k: v for k, v in spec.items() if k not in ('key', 'when')}
+        files_to_delete, info = cls(None, **args).run(info)
+        for leftover in files_to_delete:
+            try:
+                os.remove(leftover)
+            except OSError as e:
+                logging.getLogger(__name__).warning(f"Failed to remove {leftover}: {e}")
+    return info['filepath']
+
+class PostProcessingPool:
+    """Queue and workers of the post-processing stage.
+
+    Jobs are scheduled like downloads (priority, then round-robin between
+    owners) on their own ``DownloadScheduler``, so conversions queue up
+    here instead of holding download workers.
+
+    Attributes:
+        max_workers (int): Conversions running at the same time
+    """
+
+    def __init__(self, max_workers: Optional[int] = POSTPROCESS_WORKERS,
+                 runner: Callable[[str, List[Dict]], str] = run_postprocessors):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._runner = runner
+        self._scheduler = DownloadScheduler(max_workers=self.max_workers, name="postprocess")
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger(__name__)
+        self._counters = {'completed': 0, 'failed': 0, 'busy_seconds': 0.0, 'wait_seconds': 0.0}
+
+    def submit(self, job_id: str, path: str, postprocessors: List[Dict],
+               callback: PostprocessCallback, priority: int = 0, owner: str = "default") -> str:
+        """Queue the post-processing of a downloaded file.
+
+        Args:
+            job_id: Download the file belongs to
+            path: Downloaded file
+            postprocessors: Deferred entries from ``split_postprocessors``
+            callback: Called on a pool worker with ``(path, None)`` on
+                success or ``(None, error)`` on failure
+            priority: Lower runs first
+            owner: Caller identifier used for fair ordering
+
+        Returns:
+            str: The job ID
+        """
+        submitted = time.monotonic()
+
+        def job() -> None:
+            started = time.monotonic()
+            try:
+                result, error = self._runner(path, postprocessors), None
+            except Exception as e:
+                self._logger.error(f"Post-processing of {path} failed: {e}")
+                result, error = None, e
+            with self._lock:
+                self._counters['failed' if error else 'completed'] += 1
+                self._counters['busy_seconds'] += time.monotonic() - started
+                self._counters['wait_seconds'] += started - submitted
+            callback(result, error)
+
+        return self._scheduler.submit(job, task_id=job_id, priority=priority, owner=owner)
+
+    def cancel(self, job_id: str) -> bool:
+        """Drop a job that has not started yet."""
+        return self._scheduler.cancel(job_id)
+
+    def stats(self) -> Dict:
+        """Get queue depth, worker usage and counters of the stage."""
+        stats = self._scheduler.stats()
+        with self._lock:
+            stats.update(self._counters)
+        return stats
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False) -> None:
+        """Stop the workers once the queued jobs are done, or drop the queued ones."""
+        self._scheduler.shutdown(wait=wait, cancel_pending=cancel_pending)
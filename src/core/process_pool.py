@@ -0,0 +1,391 @@
+"""Worker processes for yt-dlp, so extraction uses more than one core.
+
+Extraction is CPU-bound Python (player JS and signature handling, large
+JSON documents), and downloads running on threads share one GIL.
+``ProcessYoutubeDLPool`` has the interface of ``YoutubeDLPool``, but every
+lease runs on one of a set of long-lived worker processes. Each worker
+keeps its own ``YoutubeDLPool``, so instances stay warm between jobs.
+
+Progress and postprocessor hooks are sent back over the worker's pipe
+and called in this process. Cancelling and bandwidth changes travel the
+other way and are handled by the worker at its next progress hook.
+"""
+import logging
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+from src.config.settings import PROCESS_CANCEL_TIMEOUT, PROCESS_START_METHOD, PROGRESS_RATE_HZ
+from src.core.ydl_pool import YoutubeDLPool, set_ratelimit
+
+# Fields of hook dictionaries sent back to this process; the rest (the full
+# info dict, the downloader object...) is large or cannot be pickled
+HOOK_FIELDS = ('status', 'downloaded_bytes', 'total_bytes', 'total_bytes_estimate', 'speed', 'eta',
+               'elapsed', 'filename', 'tmpfilename', 'fragment_index', 'fragment_count', 'postprocessor')
+HOOK_INFO_FIELDS = ('id', 'title', 'ext', 'filepath', 'webpage_url')
+
+class WorkerError(Exception):
+    """Error of a job in a worker process.
+
+    Carries the message and the HTTP status of the original error, and an
+    OSError as its cause when it had an errno, so ``classify_error`` sorts
+    it like the original.
+    """
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+class WorkerCancelled(Exception):
+    """Raised in a worker when this process cancels its job."""
+    pass
+
+def _portable(d: Dict) -> Dict:
+    """The part of a hook dictionary that is sent to the parent process."""
+    portable = {key: d[key] for key in HOOK_FIELDS if key in d}
+    info = d.get('info_dict')
+    if isinstance(info, dict):
+        portable['info_dict'] = {key: info[key] for key in HOOK_INFO_FIELDS if key in info}
+    return portable
+
+def _describe_error(error: BaseException) -> Dict:
+    """Message, HTTP status and errno of an error and the ones it wraps."""
+    details = {'message': str(error), 'status': None, 'errno': None}
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        status = getattr(error, 'status', None) or getattr(error, 'code', None)
+        if details['status'] is None and isinstance(status, int) and 100 <= status < 600:
+            details['status'] = status
+        if details['errno'] is None and isinstance(error, OSError) and error.errno:
+            details['errno'] = error.errno
+        exc_info = getattr(error, 'exc_info', None)
+        wrapped = exc_info[1] if isinstance(exc_info, tuple) and len(exc_info) > 1 else None
+        error = wrapped or error.__cause__ or error.__context__
+    return details
+
+def _worker_main(conn, factory: Optional[Callable[[Dict], object]], progress_interval: float) -> None:
+    """Serve jobs sent over ``conn`` until it is closed or receives None."""
+    # Ctrl+C reaches the whole process group; the parent decides what stops
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    pool = YoutubeDLPool(factory=factory)
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            if message is None:
+                break
+            if message[0] in ('cancel', 'ratelimit'):
+                # Meant for a job that has already finished
+                continue
+            try:
+                conn.send(('result', _run_job(pool, conn, progress_interval, *message)))
+            except Exception as e:
+                conn.send(('error', _describe_error(e)))
+    finally:
+        pool.close()
+        conn.close()
+
+def _run_job(pool: YoutubeDLPool, conn, progress_interval: float, command: str, options: Dict, *args):
+    leased = []
+    last_progress = [0.0]
+
+    def handle_control():
+        while conn.poll():
+            message = conn.recv()
+            if message[0] == 'cancel':
+                raise WorkerCancelled("Cancelled by the parent process")
+            if message[0] == 'ratelimit' and leased:
+                set_ratelimit(leased[0], message[1])
+
+    def progress_hook(d):
+        handle_control()
+        now = time.monotonic()
+        # Chunk-level updates are thinned out; the others always get through
+        if d.get('status') == 'downloading' and now - last_progress[0] < progress_interval:
+            return
+        last_progress[0] = now
+        conn.send(('progress', _portable(d)))
+
+    def postprocessor_hook(d):
+        handle_control()
+        conn.send(('postprocessor', _portable(d)))
+
+    with pool.lease(options, progress_hooks=[progress_hook], postprocessor_hooks=[postprocessor_hook]) as ydl:
+        leased.append(ydl)
+        if command == 'download':
+            return ydl.download(*args)
+        if command == 'extract_info':
+            url, download = args
+            # Sanitized here, since the info has to be pickled
+            return ydl.sanitize_info(ydl.extract_info(url, download=download))
+        raise ValueError(f"Unknown worker command: {command}")
+
+class _Worker:
+    """A worker process and the parent's end of its pipe."""
+
+    def __init__(self, context, factory: Optional[Callable[[Dict], object]], progress_interval: float):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child, factory, progress_interval),
+                                       name="ydl-worker", daemon=True)
+        self.process.start()
+        child.close()
+        # The job thread receives while bandwidth updates send
+        self.send_lock = threading.Lock()
+
+    def send(self, message) -> None:
+        with self.send_lock:
+            self.conn.send(message)
+
+    def stop(self, timeout: float = PROCESS_CANCEL_TIMEOUT) -> None:
+        """Ask the worker to exit, killing it if it does not."""
+        try:
+            self.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        self.kill()
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+class _RemoteParams(dict):
+    """Params of a ``RemoteYoutubeDL``; a new ``ratelimit`` is sent to the worker."""
+
+    def __init__(self, options: Dict, on_ratelimit: Callable[[Optional[float]], None]):
+        super().__init__(options)
+        self._on_ratelimit = on_ratelimit
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        if key == 'ratelimit':
+            self._on_ratelimit(value)
+
+    def pop(self, key, *default):
+        value = super().pop(key, *default)
+        if key == 'ratelimit':
+            self._on_ratelimit(None)
+        return value
+
+class RemoteYoutubeDL:
+    """A leased worker, used like a ``yt_dlp.YoutubeDL`` instance.
+
+    Supports ``download``, ``extract_info`` and ``sanitize_info``, and
+    ``set_ratelimit`` through ``params``. Hooks are called on the thread
+    that waits for the job. When one raises, the job is cancelled in the
+    worker and the exception propagates.
+
+    Attributes:
+        params (dict): Options of the job
+        broken (bool): The worker did not finish a job cleanly and must be
+            replaced
+    """
+
+    def __init__(self, worker: _Worker, options: Dict, progress_hooks: List[Callable],
+                 postprocessor_hooks: List[Callable], cancel_timeout: float = PROCESS_CANCEL_TIMEOUT):
+        self._worker = worker
+        self._progress_hooks = progress_hooks
+        self._postprocessor_hooks = postprocessor_hooks
+        self._cancel_timeout = cancel_timeout
+        self._running = False
+        self.broken = False
+        self.params = _RemoteParams(options, self._send_ratelimit)
+
+    def _send_ratelimit(self, rate: Optional[float]) -> None:
+        if self._running:
+            try:
+                self._worker.send(('ratelimit', rate))
+            except (OSError, ValueError):
+                pass
+
+    def download(self, urls: List[str]) -> int:
+        return self._call('download', list(urls))
+
+    def extract_info(self, url: str, download: bool = True) -> Dict:
+        return self._call('extract_info', url, download)
+
+    @staticmethod
+    def sanitize_info(info: Dict) -> Dict:
+        """The worker already returns sanitized info."""
+        return info
+
+    def _call(self, command: str, *args):
+        if self.broken:
+            raise WorkerError("Worker process is gone")
+        self._running = True
+        try:
+            self._worker.send((command, dict(self.params)) + args)
+            return self._wait()
+        except BaseException:
+            if self._running:
+                # Interrupted while the job still runs, the worker's state is unknown
+                self.broken = True
+            raise
+        finally:
+            self._running = False
+
+    def _receive(self, timeout: Optional[float] = None):
+        if timeout is not None and not self._worker.conn.poll(timeout):
+            return None
+        try:
+            return self._worker.conn.recv()
+        except EOFError:
+            self.broken = True
+            self._running = False
+            raise WorkerError(f"Worker process exited with code {self._worker.process.exitcode}")
+
+    def _wait(self):
+        while True:
+            kind, payload = self._receive()
+            if kind in ('result', 'error'):
+                self._running = False
+                return self._result(kind, payload)
+            hooks = self._progress_hooks if kind == 'progress' else self._postprocessor_hooks
+            try:
+                for hook in hooks:
+                    hook(payload)
+            except BaseException:
+                self._cancel()
+                raise
+
+    @staticmethod
+    def _result(kind: str, payload):
+        if kind == 'result':
+            return payload
+        error = WorkerError(payload['message'], payload['status'])
+        if payload['errno']:
+            error.__cause__ = OSError(payload['errno'], os.strerror(payload['errno']))
+        raise error
+
+    def _cancel(self) -> None:
+        """Stop the job in the worker, waiting at most ``cancel_timeout`` for it."""
+        try:
+            self._worker.send(('cancel',))
+        except (OSError, ValueError):
+            self.broken = True
+            return
+        deadline = time.monotonic() + self._cancel_timeout
+        while self._running:
+            message = self._receive(max(0.0, deadline - time.monotonic()))
+            if message is None:
+                self.broken = True
+                return
+            if message[0] in ('result', 'error'):
+                self._running = False
+
+class ProcessYoutubeDLPool:
+    """Leases jobs to long-lived worker processes holding warm YoutubeDL instances.
+
+    Workers start on first use, up to ``workers``; a lease waits while all
+    of them are busy. A worker that dies, or does not stop a cancelled job
+    within ``cancel_timeout``, is killed and replaced by the next lease.
+
+    Attributes:
+        workers (int): Worker processes at most
+        cancel_timeout (float): Seconds a worker gets to stop a cancelled job
+    """
+
+    def __init__(self, workers: Optional[int] = None, factory: Optional[Callable[[Dict], object]] = None,
+                 start_method: str = PROCESS_START_METHOD, progress_rate_hz: float = PROGRESS_RATE_HZ,
+                 cancel_timeout: float = PROCESS_CANCEL_TIMEOUT):
+        # The factory is pickled for the workers, so it has to be a
+        # module-level function
+        self.factory = factory
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.cancel_timeout = cancel_timeout
+        # Only loaded in process mode, it is not needed for startup
+        import multiprocessing
+        self._context = multiprocessing.get_context(start_method)
+        self._progress_interval = 1.0 / progress_rate_hz if progress_rate_hz else 0.0
+        self._available = threading.Condition()
+        self._idle: List[_Worker] = []
+        self._running = 0
+        self._closed = False
+        self._logger = logging.getLogger(__name__)
+        self._stats = {'started': 0, 'replaced': 0, 'jobs': 0}
+
+    def _checkout(self) -> _Worker:
+        with self._available:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Process pool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._running < self.workers:
+                    self._running += 1
+                    self._stats['started'] += 1
+                    break
+                self._available.wait()
+        try:
+            return _Worker(self._context, self.factory, self._progress_interval)
+        except BaseException:
+            with self._available:
+                self._running -= 1
+                self._available.notify()
+            raise
+
+    def _checkin(self, worker: _Worker, broken: bool) -> None:
+        with self._available:
+            self._stats['jobs'] += 1
+            keep = not broken and not self._closed and worker.process.is_alive()
+            if keep:
+                self._idle.append(worker)
+            else:
+                self._running -= 1
+                if broken:
+                    self._stats['replaced'] += 1
+            self._available.notify()
+        if broken:
+            self._logger.warning(f"Replacing worker process {worker.process.pid}")
+            worker.kill()
+        elif not keep:
+            worker.stop()
+
+    @contextmanager
+    def lease(self, options: Dict, progress_hooks: Optional[List[Callable]] = None,
+              postprocessor_hooks: Optional[List[Callable]] = None) -> Iterator[RemoteYoutubeDL]:
+        """Lease a worker for one job.
+
+        Args:
+            options: yt-dlp options, without hooks; ``ratelimit`` applies to
+                this lease only
+            progress_hooks: Called here with the worker's progress dictionaries
+            postprocessor_hooks: Called here with its postprocessor dictionaries
+
+        Yields:
+            RemoteYoutubeDL: Handle of the worker
+        """
+        options = {k: v for k, v in options.items() if k not in ('progress_hooks', 'postprocessor_hooks')}
+        worker = self._checkout()
+        ydl = RemoteYoutubeDL(worker, options, list(progress_hooks or []),
+                              list(postprocessor_hooks or []), self.cancel_timeout)
+        try:
+            yield ydl
+        finally:
+            self._checkin(worker, ydl.broken)
+
+    def stats(self) -> Dict[str, int]:
+        """Worker and job counters."""
+        with self._available:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._idle)
+            stats['busy'] = self._running - len(self._idle)
+        return stats
+
+    def close(self) -> None:
+        """Stop idle workers; busy ones stop when their job is done."""
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._running -= len(idle)
+            self._available.notify_all()
+        for worker in idle:
+            worker.stop()
@@ -0,0 +1,169 @@
+"""Pool of long-lived yt_dlp.YoutubeDL instances."""
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+from src.config.settings import YDL_POOL_MAX_IDLE, YDL_POOL_MAX_JOBS
+
+# Options that change per job and are dispatched through the pooled
+# instance instead of being part of its identity.
+PER_JOB_OPTIONS = ('progress_hooks', 'postprocessor_hooks')
+
+# Options set on the leased instance's params for one job; the bandwidth
+# share of a job changes while it runs, so it must not split the pool.
+PER_LEASE_PARAMS = ('ratelimit',)
+
+def pool_key(options: Dict) -> str:
+    """Build the pool key for a set of yt-dlp options.
+
+    Args:
+        options: yt-dlp option dictionary
+
+    Returns:
+        str: Canonical representation of the options that affect behaviour
+    """
+    stable = {k: v for k, v in options.items() if k not in PER_JOB_OPTIONS + PER_LEASE_PARAMS}
+    return json.dumps(stable, sort_keys=True, default=repr)
+
+def set_ratelimit(ydl, rate: Optional[float]) -> None:
+    """Change the download rate limit of a YoutubeDL instance.
+
+    yt-dlp reads ``ratelimit`` from its params for every chunk, so this
+    also applies to a download in progress.
+
+    Args:
+        ydl: YoutubeDL instance
+        rate: Bytes per second, None for unlimited
+    """
+    params = getattr(ydl, 'params', None)
+    if not isinstance(params, dict):
+        return
+    if rate:
+        params['ratelimit'] = rate
+    else:
+        params.pop('ratelimit', None)
+
+class PooledInstance:
+    """A YoutubeDL instance together with its swappable hooks."""
+
+    def __init__(self, key: str, options: Dict, factory: Callable[[Dict], object]):
+        self.key = key
+        self.jobs = 0
+        self.progress_hooks: List[Callable] = []
+        self.postprocessor_hooks: List[Callable] = []
+
+        opts = {k: v for k, v in options.items() if k not in PER_JOB_OPTIONS + PER_LEASE_PARAMS}
+        opts['progress_hooks'] = [self._dispatch_progress]
+        opts['postprocessor_hooks'] = [self._dispatch_postprocessor]
+        self.ydl = factory(opts)
+
+    def _dispatch_progress(self, d: dict) -> None:
+        for hook in list(self.progress_hooks):
+            hook(d)
+
+    def _dispatch_postprocessor(self, d: dict) -> None:
+        for hook in list(self.postprocessor_hooks):
+            hook(d)
+
+    def close(self) -> None:
+        try:
+            self.ydl.close()
+        except Exception as e:
+            logging.getLogger(__name__).debug(f"Failed to close YoutubeDL: {e}")
+
+class YoutubeDLPool:
+    """Keyed pool of warm YoutubeDL instances.
+
+    Instances are keyed by the options that change their behaviour (format,
+    output template, postprocessors, ...) and leased to one job at a time,
+    since YoutubeDL is not thread-safe. Progress and postprocessor hooks are
+    swapped in for the duration of the lease. An instance is dropped after
+    ``max_jobs`` leases or when a job on it raises.
+
+    Attributes:
+        max_idle (int): Idle instances kept per key
+        max_jobs (int): Jobs served by an instance before it is recycled
+    """
+
+    def __init__(self, factory: Optional[Callable[[Dict], object]] = None,
+                 max_idle: int = YDL_POOL_MAX_IDLE, max_jobs: int = YDL_POOL_MAX_JOBS):
+        self.factory = factory or self._default_factory
+        self.max_idle = max_idle
+        self.max_jobs = max_jobs
+        self._idle: Dict[str, List[PooledInstance]] = {}
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger(__name__)
+        self._stats = {'created': 0, 'reused': 0, 'recycled': 0}
+
+    @staticmethod
+    def _default_factory(options: Dict):
+        import yt_dlp
+        return yt_dlp.YoutubeDL(options)
+
+    def _checkout(self, options: Dict) -> PooledInstance:
+        key = pool_key(options)
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                self._stats['reused'] += 1
+                return idle.pop()
+            self._stats['created'] += 1
+        return PooledInstance(key, options, self.factory)
+
+    def _checkin(self, instance: PooledInstance, healthy: bool) -> None:
+        instance.progress_hooks = []
+        instance.postprocessor_hooks = []
+        instance.jobs += 1
+
+        keep = healthy and instance.jobs < self.max_jobs
+        with self._lock:
+            if keep:
+                idle = self._idle.setdefault(instance.key, [])
+                if len(idle) < self.max_idle:
+                    idle.append(instance)
+                    return
+            else:
+                self._stats['recycled'] += 1
+        instance.close()
+
+    @contextmanager
+    def lease(self, options: Dict, progress_hooks: Optional[List[Callable]] = None,
+              postprocessor_hooks: Optional[List[Callable]] = None) -> Iterator:
+        """Lease a YoutubeDL instance for one job.
+
+        Args:
+            options: yt-dlp options; per-job hooks in it are ignored and
+                ``ratelimit`` applies to this lease only
+            progress_hooks: Hooks active only during this lease
+            postprocessor_hooks: Postprocessor hooks active only during this lease
+
+        Yields:
+            yt_dlp.YoutubeDL: Instance reserved for the caller
+        """
+        instance = self._checkout(options)
+        set_ratelimit(instance.ydl, options.get('ratelimit'))
+        instance.progress_hooks = list(progress_hooks or [])
+        instance.postprocessor_hooks = list(postprocessor_hooks or [])
+        healthy = False
+        try:
+            yield instance.ydl
+            healthy = True
+        finally:
+            self._checkin(instance, healthy)
+
+    def stats(self) -> Dict[str, int]:
+        """Get creation, reuse and recycling counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle'] = sum(len(idle) for idle in self._idle.values())
+        return stats
+
+    def close(self) -> None:
+        """Close all idle instances."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for instances in idle.values():
+            for instance in instances:
+                instance.close()
@@ -7,22 +7,37 @@ import threading
 import queue
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Callable
-from concurrent.futures import ThreadPoolExecutor
-from dataclasses import dataclass
+from typing import Dict, List, Optional, Callable, Union
+from dataclasses import dataclass, field, replace
 import uuid
 
-from config import (
-    FORMATS, MAX_RETRIES, RETRY_DELAY, MAX_CONCURRENT_DOWNLOADS,
-    LOG_DIR, DOWNLOADS_DIR, CHUNK_SIZE, DOWNLOAD_TIMEOUT, MAX_DOWNLOAD_SIZE,
+from src.legacy_config import (
+    FORMATS, MAX_RETRIES, RETRY_DELAY, RETRY_MAX_DELAY, MAX_CONCURRENT_DOWNLOADS, MAX_QUEUED_DOWNLOADS,
+    LOG_DIR, DOWNLOADS_DIR, JOURNAL_PATH, CHUNK_SIZE, DOWNLOAD_TIMEOUT, MAX_DOWNLOAD_SIZE, BANDWIDTH_LIMIT,
     PREVIEW_DURATION, RATE_LIMIT_REQUESTS, RATE_LIMIT_PERIOD,
-    RATE_LIMIT_BURST, RATE_LIMIT_COOLDOWN
+    RATE_LIMIT_BURST, RATE_LIMIT_COOLDOWN, RATE_LIMIT_COST_INFO, RATE_LIMIT_COST_DOWNLOAD,
+    RATE_CONTROL,
+    DOWNLOAD_ENGINE, PROGRESS_RATE_HZ,
+    PLAYLIST_SETTINGS, SOCKET_BUDGET, MAX_FRAGMENT_DOWNLOADS, POSTPROCESS_WORKERS
 )
-from utils import (
-    validate_url, check_disk_space, sanitize_filename,
-    ValidationError
+from src.utils.utils import (
+    validate_url, check_disk_space, extract_video_id, estimate_filesize, remove_partial_files
 )
-from utils.rate_limiter import RateLimiter
+from src.utils.rate_limiter import HostRateLimiter
+from src.utils.rate_control import AdaptiveRateController
+from src.utils.scheduler import DownloadScheduler
+from src.utils.info_cache import InfoCache
+from src.utils.progress import ProgressBus, ProgressEvent
+from src.utils.journal import JobJournal
+from src.utils.archive import DownloadArchive, find_media
+from src.utils.bandwidth import BandwidthAllocator
+from src.utils.retry import RetryPolicy, classify_error
+from src.core.engines import (
+    DownloadEngine, EngineCancelled, EngineError, create_engine, fragment_concurrency
+)
+from src.core.format_planner import TRANSCODE, apply_audio_plan
+from src.core.playlist import expand_playlist, is_playlist
+from src.core.postprocess import PostProcessingPool, split_postprocessors
 
 class DownloadError(Exception):
     """Exceção customizada para erros de download."""
@@ -36,9 +51,19 @@ class DownloadTask:
     format_options: Dict
     callback: Optional[Callable] = None
     process: Optional[subprocess.Popen] = None
+    task_id: Optional[str] = None
+    priority: int = 0
+    owner: str = "default"
     status: str = "pending"
     progress: float = 0.0
     error: Optional[str] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+    keep_partial: bool = False
+    retries: int = 0  # Retries made so far
+    retry_policy: Optional[RetryPolicy] = None
+    rate_limit: Optional[int] = None
+    output_file: Optional[str] = None
+    error_category: Optional[str] = None
 
 class MediaDownloader:
     """YouTube media downloader with support for multiple formats and qualities.
@@ -86,26 +111,91 @@ class MediaDownloader:
         'opus_low': {'format': 'bestaudio/best', 'ext': 'opus', 'audio_quality': 7}
     }
     
-    def __init__(self, download_dir=None):
-        """Initialize the MediaDownloader."""
+    def __init__(self, download_dir=None, engine: Union[str, DownloadEngine, None] = None,
+                 resume: bool = False, info_cache: Optional[InfoCache] = None,
+                 journal: Optional[JobJournal] = None, archive: Optional[DownloadArchive] = None):
+        """Initialize the MediaDownloader.
+
+        Args:
+            download_dir: Directory where downloads will be saved
+            engine: ``"inprocess"`` or ``"subprocess"``, defaults to
+                DOWNLOAD_ENGINE; an engine instance is used as it is
+            resume: Resubmit jobs the journal shows as interrupted. Off by
+                default, since several instances may share the journal
+            info_cache: Metadata cache, the shared on-disk one by default
+            journal: Job journal, JOURNAL_PATH of the legacy settings by default
+            archive: Download archive, the default archive file by default
+        """
         self.setup_logging()
         self.yt_dlp_path = "/home/piperun/my_yt_down/venv/bin/yt-dlp"
         self.download_dir = Path(download_dir) if download_dir else Path.home() / "Downloads"
         self.download_dir.mkdir(parents=True, exist_ok=True)
         self.logger = logging.getLogger(__name__)
         
-        # Initialize rate limiter with configured values
-        self.rate_limiter = RateLimiter(
+        # The in-process engine keeps warm YoutubeDL instances between jobs;
+        # the subprocess engine runs the yt-dlp executable once per job.
+        engine = engine or DOWNLOAD_ENGINE
+        if isinstance(engine, DownloadEngine):
+            self.engine = engine
+        elif engine == "subprocess":
+            self.engine = create_engine(engine, command=self.yt_dlp_path)
+        else:
+            self.engine = create_engine(engine)
+        
+        # Initialize rate limiter with configured values, one bucket per host
+        self.rate_limiter = HostRateLimiter(
             rate=RATE_LIMIT_REQUESTS,
             period=RATE_LIMIT_PERIOD,
             burst=RATE_LIMIT_BURST,
             cooldown=RATE_LIMIT_COOLDOWN
         )
+        # Lowers a host's rate when it answers with 429 / throttling errors
+        # and recovers it step by step afterwards
+        self.rate_control = AdaptiveRateController(self.rate_limiter, **RATE_CONTROL)
+        
+        # BANDWIDTH_LIMIT dividido entre os downloads em andamento
+        self.bandwidth = BandwidthAllocator(BANDWIDTH_LIMIT)
+        
+        # Progress lines are parsed once and coalesced per task before the
+        # task callbacks run, at most PROGRESS_RATE_HZ times per second.
+        self.progress_bus = ProgressBus(rate_hz=PROGRESS_RATE_HZ)
+        self.progress_bus.subscribe(self._dispatch_progress)
         
-        # Task management
+        # Extracted metadata, shared with other processes through the disk tier
+        self.info_cache = info_cache or InfoCache()
+        
+        # Task management: a fixed pool of workers pulls from a priority queue,
+        # so submitting hundreds of URLs never runs more than
+        # MAX_CONCURRENT_DOWNLOADS yt-dlp processes at once.
         self.active_tasks: Dict[str, DownloadTask] = {}
-        self.task_queue = queue.Queue()
-        self.executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_DOWNLOADS)
+        self.scheduler = DownloadScheduler(
+            max_workers=MAX_CONCURRENT_DOWNLOADS,
+            max_queue_size=MAX_QUEUED_DOWNLOADS
+        )
+        
+        # Fragmentos DASH/HLS em paralelo por download, dentro de SOCKET_BUDGET
+        # conexões somando todos os workers
+        self.fragment_downloads = fragment_concurrency(
+            MAX_CONCURRENT_DOWNLOADS, SOCKET_BUDGET, MAX_FRAGMENT_DOWNLOADS
+        )
+        
+        # Falhas transitórias e de throttling são repetidas com backoff
+        # exponencial; as permanentes e locais (disco cheio) não
+        self.retry_policy = RetryPolicy(MAX_RETRIES, RETRY_DELAY, RETRY_MAX_DELAY)
+        
+        # Conversões de áudio rodam em um pool próprio, do tamanho do número
+        # de núcleos, e não ocupam os workers de download
+        self.postprocess = PostProcessingPool(POSTPROCESS_WORKERS)
+        
+        # Durable record of every job; interrupted ones resume from their
+        # .part files instead of starting over
+        self.journal = journal or JobJournal(JOURNAL_PATH)
+        
+        # Finished downloads by video ID and format, so re-running a batch
+        # list skips what is already on disk without any network access
+        self.archive = archive or DownloadArchive()
+        if resume:
+            self.resume_incomplete_jobs()
 
     def set_download_dir(self, path: Path):
         """Define o diretório de download."""
@@ -128,56 +218,105 @@ class MediaDownloader:
             ]
         )
 
-    def get_media_info(self, url: str) -> Dict:
-        """Obtém informações sobre o vídeo/playlist."""
+    def _acquire_rate_limit(self, url: str, cost: float) -> None:
+        """Aguarda tokens do rate limit do host da URL."""
+        bucket = self.rate_limiter.for_url(url)
+        if not bucket.try_acquire(cost):
+            self.logger.warning("Rate limit reached, waiting for token...")
+            if not bucket.acquire(timeout=DOWNLOAD_TIMEOUT, cost=cost):
+                raise DownloadError("Rate limit exceeded. Please try again later.")
+
+    def get_media_info(self, url: str, refresh: bool = False) -> Dict:
+        """Obtém informações sobre o vídeo/playlist.
+
+        Results are cached; a cache hit does not consume a rate limit token.
+        Pass ``refresh=True`` to bypass the cache.
+        """
         try:
             validate_url(url)
             
-            # Try to acquire a rate limit token
-            if not self.rate_limiter.try_acquire():
-                self.logger.warning("Rate limit reached, waiting for token...")
-                if not self.rate_limiter.acquire(timeout=DOWNLOAD_TIMEOUT):
-                    raise DownloadError("Rate limit exceeded. Please try again later.")
+            if not refresh:
+                info = self.info_cache.get(url)
+                if info is not None:
+                    return info
             
-            cmd = [
-                self.yt_dlp_path,
-                "--dump-json",
-                "--flat-playlist",
-                url
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            info = json.loads(result.stdout)
+            self._acquire_rate_limit(url, RATE_LIMIT_COST_INFO)
+            
+            try:
+                info = self.engine.extract_info(url, flat=True)
+            except EngineError as e:
+                self.rate_control.record_failure(url, e)
+                raise
+            self.rate_control.record_success(url)
+            self.info_cache.set(url, info)
             return info
-        except subprocess.CalledProcessError as e:
+        except EngineError as e:
             raise DownloadError(f"Erro ao obter informações: {str(e)}")
-        except json.JSONDecodeError as e:
-            raise DownloadError(f"Erro ao decodificar informações: {str(e)}")
 
-    def download_media(self, url: str, output_path: Path, format_info: Dict, callback: Optional[Callable] = None) -> None:
-        """Download media from YouTube URL with specified format options."""
+    def download_media(self, url: str, output_path: Path, format_info: Dict, callback: Optional[Callable] = None,
+                       priority: int = 0, owner: str = "default", timeout: Optional[float] = None,
+                       task_id: Optional[str] = None, retries: Optional[int] = None,
+                       rate_limit: Optional[int] = None) -> str:
+        """Download media from YouTube URL with specified format options.
+
+        The download is queued on the scheduler. ``priority`` orders the queue
+        (lower first), ``owner`` keeps ordering fair between callers and
+        ``timeout`` bounds how long to wait for queue space. ``task_id`` is
+        only passed when resuming a journaled job. ``retries`` is the number
+        of extra attempts after a transient failure (MAX_RETRIES by
+        default). ``rate_limit`` caps the task in bytes per second; all
+        tasks also share BANDWIDTH_LIMIT.
+
+        Returns:
+            str: Task ID, usable with ``get_task_status`` and ``cancel_download``
+        """
         try:
-            # Try to acquire a rate limit token
-            if not self.rate_limiter.try_acquire():
-                self.logger.warning("Rate limit reached, waiting for token...")
-                if not self.rate_limiter.acquire(timeout=DOWNLOAD_TIMEOUT):
-                    raise DownloadError("Rate limit exceeded. Please try again later.")
+            archived = self._find_archived(url, format_info)
+            if archived is not None:
+                self.logger.info(f"Already downloaded, skipping: {archived['path']}")
+                task = DownloadTask(
+                    url=url,
+                    output_path=Path(archived['path']).parent,
+                    format_options=format_info,
+                    callback=callback,
+                    task_id=task_id or str(uuid.uuid4()),
+                    status="completed",
+                    progress=100.0
+                )
+                self.active_tasks[task.task_id] = task
+                return task.task_id
             
-            validate_url(url)
+            self._check_download_size(url)
+            
+            if not validate_url(url):
+                raise DownloadError(f"Invalid YouTube URL: {url}")
             output_path = Path(output_path)
+            if retries is None:
+                retries = MAX_RETRIES
             
             # Create task object and add to active tasks
             task = DownloadTask(
                 url=url,
                 output_path=output_path,
                 format_options=format_info,
-                callback=callback
+                callback=callback,
+                task_id=task_id or str(uuid.uuid4()),
+                priority=priority,
+                owner=owner,
+                retry_policy=replace(self.retry_policy, max_retries=retries),
+                rate_limit=rate_limit
             )
             
-            task_id = str(uuid.uuid4())
-            self.active_tasks[task_id] = task
+            self.active_tasks[task.task_id] = task
+            self.journal.record(
+                task.task_id, 'submitted',
+                url=url, output_path=str(output_path), format_info=format_info, retries=retries,
+                rate_limit=rate_limit
+            )
             
-            # Start the download process
-            self._start_download(task)
+            # Queue the download process
+            self._start_download(task, timeout)
+            return task.task_id
             
         except Exception as e:
             self.logger.error(f"Download error: {str(e)}")
@@ -185,115 +324,322 @@ class MediaDownloader:
                 callback({"status": "error", "error": str(e)})
             raise DownloadError(str(e))
 
-    def _start_download(self, task: DownloadTask) -> None:
-        """Start the download process for a given task."""
-        # Create a new thread for the download process
-        thread = threading.Thread(target=self._download_thread, args=(task,))
-        thread.start()
+    def _check_download_size(self, url: str) -> None:
+        """Recusa downloads maiores que MAX_DOWNLOAD_SIZE.
+
+        Uses metadata already in the info cache, so the check costs no
+        request; yt-dlp checks ``max_filesize`` itself for the others.
+        """
+        info = self.info_cache.get(url)
+        if not info or is_playlist(info):
+            return
+        size = estimate_filesize(info)
+        if size and size > MAX_DOWNLOAD_SIZE * 1024 * 1024:
+            raise DownloadError(
+                f"Arquivo de {size // (1024 * 1024)} MB excede o limite de {MAX_DOWNLOAD_SIZE} MB"
+            )
+
+    @staticmethod
+    def _archive_key(format_info: Dict) -> tuple:
+        """Formato e qualidade usados como chave no arquivo de downloads."""
+        format_name = str(format_info.get("format_name", ""))
+        format_type, _, quality = format_name.partition("_")
+        return format_type, quality
+
+    def _find_archived(self, url: str, format_info: Dict) -> Optional[Dict]:
+        """Procura a URL no arquivo de downloads, sem acesso à rede."""
+        video_id = extract_video_id(url)
+        if video_id is None:
+            return None
+        return self.archive.lookup(video_id, *self._archive_key(format_info))
+
+    def download_playlist(self, url: str, output_path: Path, format_info: Dict,
+                          callback: Optional[Callable] = None, priority: int = 0) -> List[str]:
+        """Baixa cada item de uma playlist como uma tarefa separada.
+
+        The playlist is resolved with flat extraction and filtered with
+        PLAYLIST_SETTINGS (max_items, reverse_order, skip_existing). Entries
+        are spread over the scheduler workers instead of being downloaded one
+        after another by a single yt-dlp call, and each entry is retried up
+        to MAX_RETRIES times. An entry that cannot be queued (too large, for
+        one) is recorded as a failed task and the others are still queued.
+
+        Returns:
+            list: Task IDs of the entries, in download order
+        """
+        info = self.get_media_info(url)
+        if not is_playlist(info):
+            return [self.download_media(url, output_path, format_info, callback, priority=priority)]
+
+        entries = expand_playlist(
+            info,
+            max_items=PLAYLIST_SETTINGS["max_items"],
+            reverse_order=PLAYLIST_SETTINGS["reverse_order"],
+            skip_existing=PLAYLIST_SETTINGS["skip_existing"],
+            output_dir=str(output_path)
+        )
+        self.logger.info(f"Playlist {url}: {len(entries)} entries queued")
+        # The playlist is the owner, so other callers keep getting workers
+        owner = info.get('id') or url
+        task_ids = []
+        for entry in entries:
+            try:
+                task_ids.append(self.download_media(entry.url, output_path, format_info, callback,
+                                                    priority=priority, owner=owner, retries=MAX_RETRIES))
+            except DownloadError as e:
+                task = DownloadTask(
+                    url=entry.url,
+                    output_path=Path(output_path),
+                    format_options=format_info,
+                    callback=callback,
+                    task_id=str(uuid.uuid4()),
+                    priority=priority,
+                    owner=owner,
+                    status="failed",
+                    error=str(e)
+                )
+                self.active_tasks[task.task_id] = task
+                task_ids.append(task.task_id)
+        return task_ids
+
+    def resume_incomplete_jobs(self) -> List[str]:
+        """Reenvia as tarefas interrompidas registradas no journal."""
+        resumed = []
+        for job in self.journal.incomplete():
+            if job['job_id'] in self.active_tasks or 'format_info' not in job:
+                continue
+            try:
+                resumed.append(self.download_media(
+                    job['url'], Path(job['output_path']), job['format_info'],
+                    task_id=job['job_id'], retries=job.get('retries', 0),
+                    rate_limit=job.get('rate_limit')
+                ))
+                self.logger.info(f"Resuming interrupted download: {job['url']}")
+            except DownloadError as e:
+                self.journal.record(job['job_id'], 'failed', error=str(e))
+        return resumed
+
+    def _start_download(self, task: DownloadTask, timeout: Optional[float] = None) -> None:
+        """Queue the download process for a given task."""
+        task.status = "queued"
+        try:
+            self.scheduler.submit(
+                self._download_thread,
+                task,
+                priority=task.priority,
+                owner=task.owner,
+                task_id=task.task_id,
+                timeout=timeout
+            )
+        except queue.Full:
+            task.status = "failed"
+            task.error = "Download queue is full"
+            raise DownloadError(task.error)
+
+    def get_task_status(self, task_id: str) -> Dict:
+        """Retorna o estado de uma tarefa."""
+        task = self.active_tasks[task_id]
+        return {
+            "url": task.url,
+            "status": task.status,
+            "progress": task.progress,
+            "error": task.error,
+            "retries": task.retries
+        }
+
+    def _build_download_options(self, task: DownloadTask) -> Dict:
+        """Build yt-dlp options for a task, independent of the engine."""
+        options = {
+            'no_warnings': True,
+            # The video ID in the name lets the archive find and rebuild it
+            'outtmpl': str(task.output_path / "%(title)s [%(id)s].%(ext)s"),
+            'max_filesize': MAX_DOWNLOAD_SIZE * 1024 * 1024,
+            # "fragments" in format_info overrides the tuned value
+            'concurrent_fragment_downloads': task.format_options.get("fragments") or self.fragment_downloads
+        }
+
+        # Add format options based on type
+        if task.format_options.get("format_type") == "video":
+            format_name = task.format_options.get("format_name", "")
+            if format_name.startswith("mp4"):
+                options['format'] = "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best"
+                options['merge_output_format'] = "mp4"
+            elif format_name.startswith("webm"):
+                options['format'] = "bestvideo[ext=webm]+bestaudio[ext=webm]/best[ext=webm]/best"
+                options['merge_output_format'] = "webm"
+            else:  # mkv or default
+                options['format'] = "bestvideo+bestaudio/best"
+                options['merge_output_format'] = "mkv"
+
+            # Quality filter overrides the container format selection
+            quality = format_name.split("_")[-1]
+            if quality == "medium":
+                options['format'] = "bestvideo[height<=720]+bestaudio/best[height<=720]"
+            elif quality == "low":
+                options['format'] = "bestvideo[height<=480]+bestaudio/best[height<=480]"
+
+        else:
+            # Audio format
+            format_name = task.format_options.get("format_name", "mp3_high")
+            if isinstance(format_name, str):
+                format_parts = format_name.split("_")
+                audio_format = format_parts[0]
+                quality = format_parts[1] if len(format_parts) > 1 else "high"
+            else:
+                # Default to mp3 high quality if format_name is not a string
+                audio_format = "mp3"
+                quality = "high"
+
+            options['format'] = "bestaudio/best"
+            options['postprocessors'] = [{
+                'key': 'FFmpegExtractAudio',
+                'preferredcodec': audio_format,
+                'preferredquality': "0" if quality == "high" else "5" if quality == "medium" else "7"
+            }]
+
+        return options
 
     def _download_thread(self, task: DownloadTask) -> None:
         """Download thread function."""
+        if task.cancel_event.is_set():
+            self._finish_cancelled(task)
+            return
+        task.status = "running"
+
+        def on_progress(event: ProgressEvent) -> None:
+            if event.percent is not None:
+                task.progress = event.percent
+            if event.filename:
+                self.journal.add_file(task.task_id, event.filename)
+                task.output_file = event.filename
+            self.progress_bus.publish(event._replace(task_id=task.task_id))
+
+        self.journal.record(task.task_id, 'started')
         try:
-            # Build command
-            cmd = [
-                self.yt_dlp_path,
-                "--no-warnings",
-                "--newline",
-            ]
-            
-            # Add format options based on type
-            if task.format_options.get("format_type") == "video":
-                # Video format
-                if task.format_options.get("format_name", "").startswith("mp4"):
-                    cmd.extend([
-                        "-f", "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
-                        "--merge-output-format", "mp4"
-                    ])
-                elif task.format_options.get("format_name", "").startswith("webm"):
-                    cmd.extend([
-                        "-f", "bestvideo[ext=webm]+bestaudio[ext=webm]/best[ext=webm]/best",
-                        "--merge-output-format", "webm"
-                    ])
-                else:  # mkv or default
-                    cmd.extend([
-                        "-f", "bestvideo+bestaudio/best",
-                        "--merge-output-format", "mkv"
-                    ])
-                
-                # Add quality filter
-                quality = task.format_options.get("format_name", "").split("_")[-1]
-                if quality == "medium":
-                    cmd.extend(["-f", "bestvideo[height<=720]+bestaudio/best[height<=720]"])
-                elif quality == "low":
-                    cmd.extend(["-f", "bestvideo[height<=480]+bestaudio/best[height<=480]"])
-            
+            # Waiting for a token here rather than in download_media keeps
+            # callers (and playlists of hundreds of entries) from blocking
+            self._acquire_rate_limit(task.url, RATE_LIMIT_COST_DOWNLOAD)
+            # Baixa um stream que já está no codec pedido quando existe, para
+            # copiar o áudio em vez de recodificar
+            options, plan = apply_audio_plan(self._build_download_options(task),
+                                             self.info_cache.get(task.url))
+            if plan is None or plan.action == TRANSCODE:
+                # FFmpegExtractAudio sai das opções do yt-dlp e roda depois,
+                # no pool de pós-processamento
+                options, deferred = split_postprocessors(options)
             else:
-                # Audio format
-                format_name = task.format_options.get("format_name", "mp3_high")
-                if isinstance(format_name, str):
-                    format_parts = format_name.split("_")
-                    audio_format = format_parts[0]
-                    quality = format_parts[1] if len(format_parts) > 1 else "high"
-                else:
-                    # Default to mp3 high quality if format_name is not a string
-                    audio_format = "mp3"
-                    quality = "high"
-                
-                cmd.extend([
-                    "-x",  # Extract audio
-                    "--audio-format", audio_format,
-                    "-f", "bestaudio/best"  # Add format selection for audio
-                ])
-                
-                # Set audio quality
-                audio_quality = "0" if quality == "high" else "5" if quality == "medium" else "7"
-                cmd.extend(["--audio-quality", audio_quality])
-            
-            # Set output template
-            output_template = str(task.output_path / "%(title)s.%(ext)s")
-            cmd.extend(["-o", output_template])
-            
-            # Add URL
-            cmd.append(task.url)
-            
-            # Run download
-            self.logger.debug(f"Running command: {' '.join(cmd)}")
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1,
-                universal_newlines=True
-            )
-            
-            # Monitor progress
-            while True:
-                line = process.stdout.readline()
-                if not line and process.poll() is not None:
-                    break
-                
-                if "[download]" in line and "%" in line:
-                    try:
-                        progress = float(line.split("%")[0].split()[-1])
-                        if task.callback:
-                            task.callback(progress)
-                    except (ValueError, IndexError):
-                        pass
-            
-            # Check for errors
-            if process.returncode != 0:
-                error = process.stderr.read()
-                raise Exception(f"Download failed: {error}")
+                deferred = []
+            self._download_with_retries(task, options, on_progress)
+
+            raw_file = self._downloaded_file(task) if deferred else None
+            if raw_file:
+                task.status = "processing"
+                task.output_file = raw_file
+                self.postprocess.submit(
+                    task.task_id, raw_file, deferred,
+                    lambda path, error: self._finish_postprocess(task, error),
+                    priority=task.priority, owner=task.owner
+                )
+                return
+            self._complete_task(task)
             
-            self.logger.info("Download completed successfully")
+        except EngineCancelled:
+            self._finish_cancelled(task)
             
         except Exception as e:
+            task.status = "failed"
+            task.error = str(e)
+            task.error_category = classify_error(e)
+            self.journal.record(task.task_id, 'failed', error=str(e), category=task.error_category)
             self.logger.error(f"Download error: {str(e)}")
             if task.callback:
                 task.callback({"status": "error", "error": str(e)})
             raise DownloadError(str(e))
 
+    def _downloaded_file(self, task: DownloadTask) -> Optional[str]:
+        """Arquivo baixado por uma tarefa, antes do pós-processamento."""
+        path = task.output_file
+        if path and path.endswith(".part"):
+            path = path[:-len(".part")]
+        if path and os.path.exists(path):
+            return path
+        video_id = extract_video_id(task.url)
+        return find_media(str(task.output_path), video_id) if video_id else None
+
+    def _complete_task(self, task: DownloadTask) -> None:
+        """Marca uma tarefa como concluída e a registra no arquivo."""
+        task.status = "completed"
+        self.journal.record(task.task_id, 'completed')
+        self._archive_task(task)
+        self.logger.info("Download completed successfully")
+
+    def _finish_postprocess(self, task: DownloadTask, error: Optional[Exception]) -> None:
+        """Conclui uma tarefa quando o pool de pós-processamento termina."""
+        if error is None:
+            self._complete_task(task)
+            return
+        task.status = "failed"
+        task.error = f"Post-processing failed: {str(error)}"
+        self.journal.record(task.task_id, 'failed', error=task.error)
+        self.logger.error(task.error)
+        if task.callback:
+            task.callback({"status": "error", "error": task.error})
+
+    def pipeline_stats(self) -> Dict[str, Dict]:
+        """Fila, workers e contadores dos estágios de download e pós-processamento."""
+        return {'download': self.scheduler.stats(), 'postprocess': self.postprocess.stats()}
+
+    def _archive_task(self, task: DownloadTask) -> None:
+        """Registra o arquivo final de uma tarefa concluída."""
+        video_id = extract_video_id(task.url)
+        path = find_media(str(task.output_path), video_id) if video_id else None
+        if path:
+            self.archive.add(video_id, *self._archive_key(task.format_options), path)
+
+    def _download_with_retries(self, task: DownloadTask, options: Dict,
+                               on_progress: Callable[[ProgressEvent], None]) -> None:
+        """Run the engine, retrying transient failures as the task's retry policy allows.
+
+        ``.part`` files are kept between attempts, so yt-dlp continues where
+        the failed one stopped.
+        """
+        policy = task.retry_policy or self.retry_policy
+        attempt = 0
+        while True:
+            try:
+                # The share follows rebalancing as other tasks start and finish
+                with self.bandwidth.register(task.task_id, task.rate_limit) as share:
+                    self.engine.download(task.url, options, on_progress, task.cancel_event,
+                                         bandwidth=share)
+                self.rate_control.record_success(task.url)
+                return
+            except EngineCancelled:
+                raise
+            except EngineError as e:
+                throttled = self.rate_control.record_failure(task.url, e)
+                category = classify_error(e)
+                if not policy.should_retry(category, attempt):
+                    raise
+                delay = policy.backoff(attempt)
+                attempt += 1
+                task.retries = attempt
+                self.logger.warning(f"Retrying {task.url} in {delay:.1f}s "
+                                    f"({attempt}/{policy.max_retries}, {category}): {str(e)}")
+                self.journal.record(task.task_id, 'retrying', attempt=attempt, category=category)
+                # Waiting on the event lets a cancel interrupt the delay
+                if task.cancel_event.wait(delay):
+                    raise EngineCancelled(f"Download cancelled: {task.url}")
+                if throttled:
+                    # Retry at the lowered rate
+                    self._acquire_rate_limit(task.url, RATE_LIMIT_COST_DOWNLOAD)
+
+    def _dispatch_progress(self, events: List[ProgressEvent]) -> None:
+        """Entrega um lote de eventos de progresso aos callbacks das tarefas."""
+        for event in events:
+            task = self.active_tasks.get(event.task_id)
+            if task and task.callback and event.percent is not None:
+                task.callback(event.percent)
+
     def preview_media(self, url: str, format_options: Dict) -> Optional[Path]:
         """Gera uma prévia da mídia."""
         try:
@@ -305,34 +651,79 @@ class MediaDownloader:
             preview_name = f"preview_{int(time.time())}"
             preview_path = preview_dir / f"{preview_name}.{format_options['format']}"
 
-            # Prepara comando yt-dlp com limite de duração
-            cmd = [
-                self.yt_dlp_path,
-                "--format", format_options["format"],
-                "--output", str(preview_path),
-                "--postprocessor-args", f"-t {PREVIEW_DURATION}",
-                url
-            ]
-
+            # Opções yt-dlp com limite de duração
+            options = {
+                'format': format_options["format"],
+                'outtmpl': str(preview_path),
+                'postprocessor_args': {'default': ["-t", str(PREVIEW_DURATION)]}
+            }
             if "quality" in format_options:
-                cmd.extend(["--audio-quality", format_options["quality"]])
+                # Equivalente a --audio-quality na linha de comando
+                options['postprocessors'] = [{
+                    'key': 'FFmpegExtractAudio',
+                    'preferredcodec': format_options["format"],
+                    'preferredquality': str(format_options["quality"])
+                }]
 
-            # Executa comando
-            process = subprocess.Popen(cmd)
-            process.wait()
-
-            if process.returncode == 0:
-                return preview_path
-            return None
+            self.engine.download(url, options)
+            return preview_path
 
         except Exception as e:
             logging.error(f"Erro ao gerar prévia: {str(e)}")
             return None
 
-    def cancel_download(self, url: str) -> None:
-        """Cancela um download em andamento."""
-        # Not implemented
+    def cancel_download(self, task_id: str, keep_partial: bool = False) -> bool:
+        """Cancela um download em andamento.
+
+        A queued task leaves the queue; a running one has its yt-dlp process
+        group terminated (or its in-process hook raise), freeing the worker
+        slot immediately. A task waiting for post-processing leaves that queue.
+
+        Args:
+            task_id: Task ID returned by ``download_media`` (or the task URL)
+            keep_partial: Keep ``.part`` files so a new download of the same
+                URL continues where this one stopped
+
+        Returns:
+            bool: True if a task was cancelled
+        """
+        task = self.active_tasks.get(task_id)
+        if task is None:
+            task = next((t for t in self.active_tasks.values()
+                         if t.url == task_id and t.status in ("queued", "running")), None)
+        if task is not None and task.status == "processing":
+            # Só conversões que ainda não começaram
+            if not self.postprocess.cancel(task.task_id):
+                return False
+            task.keep_partial = keep_partial
+            if not keep_partial:
+                remove_partial_files([task.output_file])
+            self._finish_cancelled(task)
+            return True
+        if task is None or task.status not in ("queued", "running"):
+            return False
+
+        task.keep_partial = keep_partial
+        task.cancel_event.set()
+        if self.scheduler.cancel(task.task_id):
+            self._finish_cancelled(task)
+        return True
+
+    def _finish_cancelled(self, task: DownloadTask) -> None:
+        """Registra o cancelamento e remove arquivos parciais."""
+        task.status = "cancelled"
+        if not task.keep_partial:
+            job = self.journal.get(task.task_id) or {}
+            remove_partial_files(job.get('files', []))
+        self.journal.record(task.task_id, 'cancelled', kept_partial=task.keep_partial)
+        self.progress_bus.publish(ProgressEvent(task.task_id, "cancelled", timestamp=time.time()))
+        self.logger.info(f"Download cancelled: {task.url}")
 
     def cleanup(self) -> None:
         """Limpa recursos do downloader."""
-        # Not implemented
+        self.scheduler.shutdown(wait=False, cancel_pending=True)
+        self.postprocess.shutdown(wait=False)
+        self.engine.close()
+        self.info_cache.close()
+        self.archive.close()
+        self.progress_bus.close()
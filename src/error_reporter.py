@@ -3,7 +3,6 @@ import traceback
 import logging
 import json
 import os
-import requests
 from datetime import datetime
 from pathlib import Path
 
@@ -128,6 +127,9 @@ class GitHubIssueReporter:
                 'labels': ['bug', 'automated']
             }
             
+            # Só carregado quando uma issue é criada de fato
+            import requests
+            
             response = requests.post(url, headers=headers, json=data)
             response.raise_for_status()
             
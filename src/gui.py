@@ -1,9 +1,10 @@
 """YouTube Downloader GUI application."""
 import os
+import queue
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import customtkinter as ctk
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 import logging
 from datetime import datetime
 
@@ -16,9 +17,14 @@ from src.config.settings import (
     AUDIO_QUALITIES,
     ERROR_MESSAGES,
     PADDING,
-    LOGS_DIR
+    LOGS_DIR,
+    GUI_UPDATE_INTERVAL_MS,
+    STATUS_MAX_LINES,
+    LOGS_UPDATE_INTERVAL_MS,
+    LOGS_MAX_LINES
 )
-from src.utils.utils import read_logs
+from src.utils.log_reader import LogTailer
+from src.utils.progress import ProgressEvent
 
 class SlidingPanel(ctk.CTkFrame):
     """A sliding panel that can be shown/hidden."""
@@ -61,15 +67,23 @@ class DownloaderGUI(ctk.CTk):
     
     def __init__(self):
         super().__init__()
+        # Worker threads never touch widgets: they post to this queue, which
+        # the Tk main loop drains every GUI_UPDATE_INTERVAL_MS.
+        self._ui_queue: "queue.SimpleQueue[tuple]" = queue.SimpleQueue()
+        self.download_bars: Dict[str, ctk.CTkProgressBar] = {}
+        
         self._setup_logging()
         self._initialize_gui()
         self._create_menu()
         self._create_main_layout()
         
         self.downloader = MediaDownloader()
+        self.downloader.subscribe_progress(self._on_progress_events)
         self.active_downloads: Dict[str, Dict] = {}
         self.progress_bar = ctk.CTkProgressBar(master=self, width=300)
         self.progress_bar.pack(pady=10)
+        
+        self.after(GUI_UPDATE_INTERVAL_MS, self._drain_ui_queue)
 
     def _setup_logging(self) -> None:
         """Configure logging for the application."""
@@ -358,6 +372,14 @@ class DownloaderGUI(ctk.CTk):
         self.status_text.pack(fill="both", expand=True, padx=PADDING['medium'], 
                             pady=PADDING['medium'])
         self.status_text.configure(state="disabled")
+        
+        # Per-download progress bars
+        self.downloads_frame = ctk.CTkFrame(
+            right_frame,
+            fg_color="transparent"
+        )
+        self.downloads_frame.pack(fill="x", padx=PADDING['medium'], 
+                                pady=(0, PADDING['medium']))
 
     def _create_logs_panel(self) -> None:
         """Create the sliding logs panel."""
@@ -375,26 +397,18 @@ class DownloaderGUI(ctk.CTk):
         )
         self.logs_text.pack(expand=True, fill="both", padx=10, pady=10)
         
-        # Update logs initially
-        self._update_logs()
-        
-        # Schedule periodic log updates
-        self.after(5000, self._update_logs)
+        # Logs are only polled while the panel is visible
+        self.log_tailer = LogTailer(LOGS_DIR)
+        self._logs_after_id: Optional[str] = None
 
     def _toggle_logs_panel(self) -> None:
         """Toggle the logs panel visibility."""
         self.logs_panel.toggle()
         if self.logs_panel.shown:
-            self._refresh_logs()
-
-    def _refresh_logs(self) -> None:
-        """Refresh the logs display."""
-        logs_content = read_logs()
-        self.logs_text.configure(state="normal")
-        self.logs_text.delete("1.0", "end")
-        self.logs_text.insert("1.0", logs_content)
-        self.logs_text.configure(state="disabled")
-        self.logs_text.see("end")
+            self._update_logs()
+        elif self._logs_after_id is not None:
+            self.after_cancel(self._logs_after_id)
+            self._logs_after_id = None
 
     def _update_format_options(self, *args) -> None:
         """Update format options based on selected media type."""
@@ -479,16 +493,18 @@ class DownloaderGUI(ctk.CTk):
                 convert_audio=(self.type_var.get() == "audio")
             )
             
-            download_id = self.downloader.download(
-                url, 
-                options,
-                self._update_progress
-            )
+            download_id = self.downloader.download(url, options)
             
             self.active_downloads[download_id] = {
                 'url': url,
                 'start_time': datetime.now()
             }
+            self.download_bars[download_id] = ctk.CTkProgressBar(
+                self.downloads_frame,
+                progress_color=self.colors['button']
+            )
+            self.download_bars[download_id].set(0)
+            self.download_bars[download_id].pack(fill="x", pady=2)
             
             self._update_status(f"Download started: {url}")
             self.download_button.configure(state="disabled")
@@ -499,17 +515,69 @@ class DownloaderGUI(ctk.CTk):
             self.logger.error(f"Unexpected error: {str(e)}")
             self._show_error(ERROR_MESSAGES['download_failed'])
 
-    def _update_progress(self, progress: float) -> None:
+    def _on_progress_events(self, events: List[ProgressEvent]) -> None:
+        """Receive progress batches from the downloader (any thread)."""
+        self._ui_queue.put(("progress", events))
+
+    def _update_progress(self, download_id: str, event: ProgressEvent) -> None:
         """Update download progress display."""
-        self._update_status(f"Download progress: {progress:.1f}%")
-        if progress >= 100:
-            self.download_button.configure(state="normal")
-            self._update_status("Download completed!")
+        bar = self.download_bars.get(download_id)
+        if event.status in ('completed', 'failed', 'cancelled'):
+            if bar is not None:
+                bar.destroy()
+                del self.download_bars[download_id]
+            if event.status == 'completed':
+                self._update_status("Download completed!")
+            elif event.status == 'cancelled':
+                self._update_status("Download cancelled.")
+            else:
+                error = self.downloader.get_download_status(download_id).get('error')
+                self._update_status(f"Download failed: {error}")
+            if not self.download_bars:
+                self.download_button.configure(state="normal")
+        elif bar is not None and event.percent is not None:
+            bar.set(event.percent / 100)
 
     def _update_status(self, message: str) -> None:
-        """Update status display with new message."""
+        """Queue a status message; safe to call from any thread."""
+        self._ui_queue.put(("status", f"{datetime.now().strftime('%H:%M:%S')} - {message}\n"))
+
+    def _drain_ui_queue(self) -> None:
+        """Apply every pending GUI update in one pass on the main thread."""
+        lines: List[str] = []
+        latest: Dict[str, ProgressEvent] = {}
+        finals: List[ProgressEvent] = []
+        try:
+            while True:
+                kind, payload = self._ui_queue.get_nowait()
+                if kind == "progress":
+                    for event in payload:
+                        if event.status in ('completed', 'failed', 'cancelled'):
+                            finals.append(event)
+                        else:
+                            latest[event.task_id] = event
+                elif kind == "status":
+                    lines.append(payload)
+        except queue.Empty:
+            pass
+        
+        for download_id, event in latest.items():
+            self._update_progress(download_id, event)
+        for event in finals:
+            self._update_progress(event.task_id, event)
+        
+        if lines:
+            self._append_status("".join(lines))
+        
+        self.after(GUI_UPDATE_INTERVAL_MS, self._drain_ui_queue)
+
+    def _append_status(self, text: str) -> None:
+        """Insert text into the status box, keeping the last STATUS_MAX_LINES lines."""
         self.status_text.configure(state="normal")
-        self.status_text.insert("end", f"{datetime.now().strftime('%H:%M:%S')} - {message}\n")
+        self.status_text.insert("end", text)
+        line_count = int(self.status_text.index("end-1c").split(".")[0])
+        if line_count > STATUS_MAX_LINES:
+            self.status_text.delete("1.0", f"{line_count - STATUS_MAX_LINES + 1}.0")
         self.status_text.see("end")
         self.status_text.configure(state="disabled")
 
@@ -520,14 +588,21 @@ class DownloaderGUI(ctk.CTk):
         messagebox.showerror("Error", message)
 
     def _update_logs(self):
-        """Update logs display."""
-        logs_content = read_logs()
-        self.logs_text.configure(state="normal")
-        self.logs_text.delete("1.0", "end")
-        self.logs_text.insert("1.0", logs_content)
-        self.logs_text.configure(state="disabled")
-        self.logs_text.see("end")
-        self.after(5000, self._update_logs)
+        """Append new log lines; reschedules itself while the panel is shown."""
+        self._logs_after_id = None
+        if not self.logs_panel.shown:
+            return
+        
+        new_lines = self.log_tailer.poll()
+        if new_lines:
+            self.logs_text.configure(state="normal")
+            self.logs_text.insert("end", "".join(new_lines))
+            line_count = int(self.logs_text.index("end-1c").split(".")[0])
+            if line_count > LOGS_MAX_LINES:
+                self.logs_text.delete("1.0", f"{line_count - LOGS_MAX_LINES + 1}.0")
+            self.logs_text.configure(state="disabled")
+            self.logs_text.see("end")
+        self._logs_after_id = self.after(LOGS_UPDATE_INTERVAL_MS, self._update_logs)
 
     def update_progress(self, current: int, total: int):
         """Update the progress bar based on current and total values."""
@@ -538,10 +613,10 @@ class DownloaderGUI(ctk.CTk):
             self.progress_bar.set(0)
 
     def cancel_download(self):
-        """Cancel the ongoing download."""
-        if self.downloader._current_download:
-            download_id = self.downloader._current_download.id  # Obter o ID do download atual
-            self.downloader.cancel(download_id)  # Passar o ID para o método de cancelamento
+        """Cancel the ongoing downloads."""
+        if self.download_bars:
+            for download_id in list(self.download_bars):
+                self.downloader.cancel_download(download_id)
             logging.info("Download canceled by user.")
         else:
             logging.warning("No current download to cancel.")
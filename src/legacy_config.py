@@ -7,23 +7,41 @@ LOG_DIR = BASE_DIR / "logs"  # Diretório para logs
 TEMP_DOWNLOADS_DIR = BASE_DIR / "temp_downloads"  # Diretório temporário para downloads
 DOWNLOADS_DIR = BASE_DIR / "downloads"  # Diretório para downloads finais
 FAVORITES_DIR = BASE_DIR / "favorites"
+# Journal próprio: o da GUI retoma os jobs que encontra no seu
+JOURNAL_PATH = str(Path.home() / ".my-yt-down" / "legacy-journal.jsonl")
 
 # Configurações de download
 MAX_CONCURRENT_DOWNLOADS = 2
+MAX_QUEUED_DOWNLOADS = 500  # Tarefas aguardando antes de bloquear novos envios
 DOWNLOAD_TIMEOUT = 30  # segundos
 MAX_DOWNLOAD_SIZE = 2048  # MB
 CHUNK_SIZE = 8192  # bytes
+BANDWIDTH_LIMIT = None  # bytes/s divididos entre os downloads ativos, None = sem limite
+SOCKET_BUDGET = 16  # Conexões divididas entre os fragmentos de todos os downloads
+MAX_FRAGMENT_DOWNLOADS = 8  # Fragmentos DASH/HLS baixados ao mesmo tempo por download
+POSTPROCESS_WORKERS = None  # Conversões ffmpeg em paralelo, None = número de núcleos
 PREVIEW_DURATION = 30  # segundos
+PROGRESS_RATE_HZ = 10  # Atualizações de progresso entregues por segundo
+DOWNLOAD_ENGINE = "inprocess"  # "inprocess" (yt_dlp.YoutubeDL) ou "subprocess" (executável yt-dlp)
 
 # Configurações de rate limit
 RATE_LIMIT_REQUESTS = 30  # Número máximo de requisições
 RATE_LIMIT_PERIOD = 60   # Período em segundos
 RATE_LIMIT_BURST = 10    # Tamanho máximo do burst
 RATE_LIMIT_COOLDOWN = 5  # Tempo de espera entre tentativas (segundos)
+RATE_LIMIT_COST_INFO = 0.5  # Tokens gastos por consulta de metadados
+RATE_LIMIT_COST_DOWNLOAD = 1  # Tokens gastos por download
+RATE_CONTROL = {
+    "min_rate": 1,  # Requisições por período, no mínimo
+    "decrease_factor": 0.5,  # Multiplica a taxa ao receber 429 / throttling
+    "increase_step": 1,  # Requisições por período recuperadas a cada sucesso
+    "hold_seconds": 10  # Erros dentro desse intervalo não reduzem de novo
+}
 
 # Configurações de retry
 MAX_RETRIES = 3
 RETRY_DELAY = 5  # segundos
+RETRY_MAX_DELAY = 60  # segundos, limite do backoff exponencial
 
 # Validação
 MIN_DISK_SPACE = 1024 * 1024 * 1024  # 1 GB em bytes
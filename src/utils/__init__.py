@@ -3,22 +3,26 @@ from src.utils.utils import (
     validate_url,
     extract_video_id,
     check_disk_space,
+    estimate_filesize,
     ensure_dir,
     get_safe_filename,
     get_available_filename,
     format_size,
     format_time,
-    read_logs
+    read_logs,
+    remove_partial_files
 )
 
 __all__ = [
     'validate_url',
     'extract_video_id',
     'check_disk_space',
+    'estimate_filesize',
     'ensure_dir',
     'get_safe_filename',
     'get_available_filename',
     'format_size',
     'format_time',
-    'read_logs'
+    'read_logs',
+    'remove_partial_files'
 ]
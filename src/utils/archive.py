@@ -0,0 +1,212 @@
+"""Index of finished downloads, used to skip media that is already on disk.
+
+Entries are keyed by video ID, format and quality, so a re-run of a batch
+list is answered from a local SQLite file without touching the network.
+An index can be rebuilt from existing download directories::
+
+    python -m src.utils.archive rebuild ~/Downloads/YouTube
+"""
+import argparse
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from src.config.settings import ARCHIVE_CHECKSUMS, ARCHIVE_PATH
+
+# yt-dlp's default output template ends names with " [<id>].<ext>"
+_ID_IN_NAME = re.compile(r'\[([0-9A-Za-z_-]{6,})\](?:\.\w+)?$')
+
+# Files that belong to an unfinished download
+PARTIAL_SUFFIXES = ('.part', '.ytdl', '.temp')
+
+def parse_video_id(filename: str) -> Optional[str]:
+    """Get the video ID from a ``Title [id].ext`` file name (extension optional)."""
+    match = _ID_IN_NAME.search(os.path.basename(filename))
+    return match.group(1) if match else None
+
+def file_checksum(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Compute the SHA-256 of a file in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def scan_media(directory: str) -> Iterator[Tuple[str, str, int]]:
+    """Find finished media files named after their video ID.
+
+    Args:
+        directory: Directory searched recursively with ``os.scandir``
+
+    Yields:
+        tuple: (video_id, path, size)
+    """
+    stack = [directory]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file() and not entry.name.endswith(PARTIAL_SUFFIXES):
+                        video_id = parse_video_id(entry.name)
+                        if video_id:
+                            yield video_id, entry.path, entry.stat().st_size
+        except OSError:
+            continue
+
+def find_media(directory: str, video_id: str) -> Optional[str]:
+    """Find the finished file of a video in a directory (not recursive)."""
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if (entry.is_file() and not entry.name.endswith(PARTIAL_SUFFIXES)
+                        and parse_video_id(entry.name) == video_id):
+                    return entry.path
+    except OSError:
+        pass
+    return None
+
+class DownloadArchive:
+    """SQLite index of downloaded media.
+
+    Each entry maps (video ID, format, quality) to the output path, size and
+    checksum of the file. A lookup only returns entries whose file still
+    exists with the recorded size. Entries rebuilt from disk have an empty
+    quality and match any quality of their format.
+
+    Attributes:
+        checksums (bool): Compute a SHA-256 when adding entries
+    """
+
+    def __init__(self, db_path: str = ARCHIVE_PATH, checksums: bool = ARCHIVE_CHECKSUMS):
+        self.checksums = checksums
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger(__name__)
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS archive ("
+            "video_id TEXT, format TEXT, quality TEXT, path TEXT, size INTEGER, "
+            "checksum TEXT, added_at REAL, PRIMARY KEY (video_id, format, quality))"
+        )
+        self._db.commit()
+
+    def lookup(self, video_id: str, format: str, quality: str = "") -> Optional[Dict]:
+        """Find a finished download.
+
+        Args:
+            video_id: Video ID
+            format: Output format (``mp4``, ``mp3``...)
+            quality: Requested quality
+
+        Returns:
+            dict: path, size and checksum, or None if not downloaded
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT quality, path, size, checksum FROM archive "
+                "WHERE video_id = ? AND format = ? AND quality IN (?, '') "
+                "ORDER BY quality DESC",
+                (video_id, format.lower(), quality)
+            ).fetchall()
+        for row_quality, path, size, checksum in rows:
+            try:
+                if os.path.getsize(path) == size:
+                    return {'path': path, 'size': size, 'checksum': checksum}
+            except OSError:
+                pass
+            # The file was moved or deleted since it was indexed
+            self.remove(video_id, format, row_quality)
+        return None
+
+    def add(self, video_id: str, format: str, quality: str, path: str) -> None:
+        """Index a finished download.
+
+        Args:
+            video_id: Video ID
+            format: Output format
+            quality: Quality it was downloaded at, empty if unknown
+            path: Final output file
+        """
+        try:
+            size = os.path.getsize(path)
+            checksum = file_checksum(path) if self.checksums else None
+        except OSError as e:
+            self._logger.warning(f"Cannot index {path}: {e}")
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO archive VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (video_id, format.lower(), quality, path, size, checksum, time.time())
+            )
+            self._db.commit()
+
+    def remove(self, video_id: str, format: str, quality: str) -> None:
+        """Drop an entry."""
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM archive WHERE video_id = ? AND format = ? AND quality = ?",
+                (video_id, format.lower(), quality)
+            )
+            self._db.commit()
+
+    def rebuild(self, directories: Iterable[str], checksums: bool = False) -> int:
+        """Index every ``Title [id].ext`` file found in ``directories``.
+
+        The format is taken from the file extension and the quality is left
+        empty. Existing entries are kept.
+
+        Args:
+            directories: Download directories to scan recursively
+            checksums: Also hash every file (slow for large libraries)
+
+        Returns:
+            int: Number of files indexed
+        """
+        rows = []
+        for directory in directories:
+            for video_id, path, size in scan_media(directory):
+                fmt = os.path.splitext(path)[1][1:].lower()
+                checksum = file_checksum(path) if checksums else None
+                rows.append((video_id, fmt, "", path, size, checksum, time.time()))
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO archive VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._db.commit()
+        return len(rows)
+
+    def count(self) -> int:
+        """Number of indexed downloads."""
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM archive").fetchone()[0]
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._db.close()
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Maintain the download archive")
+    parser.add_argument("--db", default=ARCHIVE_PATH, help="Archive database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild = commands.add_parser("rebuild", help="Index existing download directories")
+    rebuild.add_argument("directories", nargs="+")
+    rebuild.add_argument("--checksum", action="store_true", help="Hash every file")
+    args = parser.parse_args(argv)
+
+    archive = DownloadArchive(args.db)
+    start = time.perf_counter()
+    count = archive.rebuild(args.directories, checksums=args.checksum)
+    print(f"Indexed {count} files in {time.perf_counter() - start:.2f}s ({archive.count()} entries)")
+    archive.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""Fair sharing of a download bandwidth budget between running jobs."""
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+RateListener = Callable[[Optional[float]], None]
+
+class BandwidthShare:
+    """Bandwidth handed to one job; follows rebalancing while it runs.
+
+    Use as a context manager, or call ``release`` when the transfer ends.
+
+    Attributes:
+        job_id (str): Job the share belongs to
+        cap (float): Per-job limit in bytes per second, None for no cap
+        rate (float): Current limit in bytes per second, None for unlimited
+    """
+
+    def __init__(self, allocator: 'BandwidthAllocator', job_id: str, cap: Optional[float]):
+        self.job_id = job_id
+        self.cap = cap
+        self.rate: Optional[float] = cap
+        self._allocator = allocator
+        self._listeners: List[RateListener] = []
+
+    def subscribe(self, listener: RateListener) -> Callable[[], None]:
+        """Call ``listener(rate)`` whenever the share changes.
+
+        Returns:
+            callable: Function removing the listener again
+        """
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener) if listener in self._listeners else None
+
+    def _notify(self) -> None:
+        for listener in list(self._listeners):
+            listener(self.rate)
+
+    def release(self) -> None:
+        """Give the bandwidth back to the other jobs."""
+        self._allocator.unregister(self.job_id)
+
+    def __enter__(self) -> 'BandwidthShare':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+class BandwidthAllocator:
+    """Splits a global rate budget between active jobs (max-min fairness).
+
+    Jobs whose own cap is below an equal share keep their cap, and what
+    they leave unused is split evenly between the others. The shares are
+    recomputed whenever a job starts or finishes or the budget changes,
+    and the running jobs are told their new rate.
+
+    Attributes:
+        total_rate (float): Budget in bytes per second, None for unlimited
+    """
+
+    def __init__(self, total_rate: Optional[float] = None):
+        self.total_rate = total_rate
+        self._shares: Dict[str, BandwidthShare] = {}
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger(__name__)
+
+    def register(self, job_id: str, cap: Optional[float] = None) -> BandwidthShare:
+        """Start sharing the budget with ``job_id``.
+
+        Args:
+            job_id: Job identifier
+            cap: Per-job limit in bytes per second
+
+        Returns:
+            BandwidthShare: The job's share, already balanced
+        """
+        share = BandwidthShare(self, job_id, cap or None)
+        with self._lock:
+            self._shares[job_id] = share
+            changed = self._rebalance()
+        self._notify(changed, skip=share)
+        return share
+
+    def unregister(self, job_id: str) -> None:
+        """Stop sharing with ``job_id``; its bandwidth goes to the others."""
+        with self._lock:
+            if self._shares.pop(job_id, None) is None:
+                return
+            changed = self._rebalance()
+        self._notify(changed)
+
+    def set_total_rate(self, total_rate: Optional[float]) -> None:
+        """Change the budget and rebalance the running jobs."""
+        with self._lock:
+            self.total_rate = total_rate
+            changed = self._rebalance()
+        self._notify(changed)
+
+    def shares(self) -> Dict[str, Optional[float]]:
+        """Get the current rate of every active job."""
+        with self._lock:
+            return {job_id: share.rate for job_id, share in self._shares.items()}
+
+    def _rebalance(self) -> List[BandwidthShare]:
+        """Recompute every share (lock held); returns the ones that changed."""
+        changed = []
+        if self.total_rate is None:
+            rates = {share: share.cap for share in self._shares.values()}
+        else:
+            # Water-filling: smallest caps first, each job gets at most an
+            # equal part of what the jobs before it left over
+            rates = {}
+            remaining = float(self.total_rate)
+            ordered = sorted(self._shares.values(),
+                             key=lambda share: share.cap if share.cap else float('inf'))
+            for i, share in enumerate(ordered):
+                fair = remaining / (len(ordered) - i)
+                rate = min(share.cap, fair) if share.cap else fair
+                rates[share] = rate
+                remaining -= rate
+        for share, rate in rates.items():
+            if rate != share.rate:
+                share.rate = rate
+                changed.append(share)
+        return changed
+
+    def _notify(self, changed: List[BandwidthShare], skip: Optional[BandwidthShare] = None) -> None:
+        for share in changed:
+            if share is not skip:
+                try:
+                    share._notify()
+                except Exception as e:
+                    self._logger.error(f"Failed to apply new rate to {share.job_id}: {e}")
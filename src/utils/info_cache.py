@@ -0,0 +1,232 @@
+"""Two-tier cache for extracted media metadata."""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from src.config.settings import (
+    INFO_CACHE_MAX_BYTES,
+    INFO_CACHE_MAX_DISK_BYTES,
+    INFO_CACHE_MAX_ENTRIES,
+    INFO_CACHE_PATH,
+    INFO_CACHE_PLAYLIST_TTL,
+    INFO_CACHE_TTL
+)
+from src.utils.utils import extract_video_id
+
+# Query parameters that do not change what a URL points to
+_IGNORED_PARAMS = {'feature', 'si', 'pp', 'ab_channel', 'utm_source', 'utm_medium', 'utm_campaign'}
+
+def cache_key(url: str) -> str:
+    """Build a cache key for a URL.
+
+    Video URLs map to ``video:<id>`` so that different spellings of the same
+    video share one entry. Other URLs, including a video in a playlist
+    (``watch?v=...&list=...``, whose info is the playlist's), are
+    canonicalised (lowercase host without ``www.``/``m.``, sorted query,
+    no fragment or tracking params).
+
+    Args:
+        url: Media or playlist URL
+
+    Returns:
+        str: Cache key
+    """
+    parsed = urlparse(url if '://' in url else f"https://{url}")
+    video_id = extract_video_id(url)
+    if video_id and 'list' not in dict(parse_qsl(parsed.query)):
+        return f"video:{video_id}"
+
+    host = (parsed.hostname or '').lower()
+    for prefix in ('www.', 'm.'):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    query = sorted((k, v) for k, v in parse_qsl(parsed.query) if k not in _IGNORED_PARAMS)
+    return urlunparse(('https', host, parsed.path.rstrip('/'), '', urlencode(query), ''))
+
+def ttl_for(info: Dict) -> float:
+    """Pick a TTL for an info dictionary.
+
+    Live streams are not cached and playlists expire sooner than videos,
+    since entries get added to them.
+    """
+    if info.get('is_live'):
+        return 0
+    if info.get('_type') == 'playlist':
+        return INFO_CACHE_PLAYLIST_TTL
+    return INFO_CACHE_TTL
+
+class InfoCache:
+    """Metadata cache with an in-memory LRU tier and an optional SQLite tier.
+
+    Entries expire after a per-entry TTL. The memory tier is bounded by entry
+    count and by the size of the serialised info; the disk tier by total
+    size, evicting least recently used entries first.
+
+    Attributes:
+        max_entries (int): Maximum number of entries kept in memory
+        max_bytes (int): Maximum serialised size kept in memory
+        max_disk_bytes (int): Maximum serialised size kept on disk
+    """
+
+    def __init__(self, db_path: Optional[str] = INFO_CACHE_PATH,
+                 max_entries: int = INFO_CACHE_MAX_ENTRIES,
+                 max_bytes: int = INFO_CACHE_MAX_BYTES,
+                 max_disk_bytes: int = INFO_CACHE_MAX_DISK_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger(__name__)
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+
+        if db_path:
+            try:
+                os.makedirs(os.path.dirname(db_path), exist_ok=True)
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS info_cache ("
+                    "key TEXT PRIMARY KEY, expires_at REAL, size INTEGER, "
+                    "accessed_at REAL, data TEXT)"
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                self._logger.error(f"Failed to open info cache {db_path}: {e}")
+                self._db = None
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Get cached info for a URL, or None on a miss."""
+        key = cache_key(url)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, size, data = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(data)
+                self._drop(key)
+
+            data = self._disk_get(key, now)
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return json.loads(data)
+
+    def set(self, url: str, info: Dict, ttl: Optional[float] = None) -> None:
+        """Store info for a URL.
+
+        Args:
+            url: URL the info was extracted from
+            info: Info dictionary (must be JSON serialisable)
+            ttl: Lifetime in seconds, derived from the info when omitted
+        """
+        ttl = ttl_for(info) if ttl is None else ttl
+        if ttl <= 0:
+            return
+        key = cache_key(url)
+        data = json.dumps(info)
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._memory_put(key, expires_at, data)
+            self._disk_put(key, expires_at, data)
+
+    def invalidate(self, url: str) -> None:
+        """Remove a URL from both tiers."""
+        key = cache_key(url)
+        with self._lock:
+            self._drop(key)
+            if self._db is not None:
+                self._db.execute("DELETE FROM info_cache WHERE key = ?", (key,))
+                self._db.commit()
+
+    def clear(self) -> None:
+        """Remove every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM info_cache")
+                self._db.commit()
+
+    def close(self) -> None:
+        """Close the disk tier."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _drop(self, key: str) -> None:
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= entry[1]
+
+    def _memory_put(self, key: str, expires_at: float, data: str) -> None:
+        size = len(data)
+        if size > self.max_bytes:
+            return
+        self._drop(key)
+        self._memory[key] = (expires_at, size, data)
+        self._memory_bytes += size
+        while len(self._memory) > self.max_entries or self._memory_bytes > self.max_bytes:
+            _, (_, evicted_size, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size
+
+    def _disk_get(self, key: str, now: float) -> Optional[str]:
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                "SELECT expires_at, data FROM info_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            expires_at, data = row
+            if expires_at <= now:
+                self._db.execute("DELETE FROM info_cache WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE info_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._db.commit()
+        except sqlite3.Error as e:
+            self._logger.error(f"Info cache read failed: {e}")
+            return None
+        self._memory_put(key, expires_at, data)
+        return data
+
+    def _disk_put(self, key: str, expires_at: float, data: str) -> None:
+        if self._db is None:
+            return
+        try:
+            now = time.time()
+            self._db.execute(
+                "INSERT OR REPLACE INTO info_cache VALUES (?, ?, ?, ?, ?)",
+                (key, expires_at, len(data), now, data)
+            )
+            self._db.execute("DELETE FROM info_cache WHERE expires_at <= ?", (now,))
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM info_cache").fetchone()[0]
+            if total > self.max_disk_bytes:
+                rows = self._db.execute(
+                    "SELECT key, size FROM info_cache ORDER BY accessed_at"
+                ).fetchall()
+                stale = []
+                for old_key, size in rows:
+                    if total <= self.max_disk_bytes:
+                        break
+                    stale.append((old_key,))
+                    total -= size
+                self._db.executemany("DELETE FROM info_cache WHERE key = ?", stale)
+            self._db.commit()
+        except sqlite3.Error as e:
+            self._logger.error(f"Info cache write failed: {e}")
@@ -0,0 +1,137 @@
+"""Append-only journal of download jobs, used to resume after a crash."""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from src.config.settings import JOURNAL_COMPACT_BYTES, JOURNAL_PATH
+
+# Events that end a job; everything else, 'interrupted' by a shutdown
+# included, means the job may be resumed
+FINAL_EVENTS = frozenset({'completed', 'failed', 'cancelled'})
+
+# Events written with fsync, so they survive a power loss
+_DURABLE_EVENTS = frozenset({'submitted', 'completed', 'failed', 'cancelled', 'interrupted'})
+
+class JobJournal:
+    """Durable record of download jobs as JSON lines.
+
+    Every state change of a job is appended as one line::
+
+        {"job_id": "...", "event": "submitted", "ts": 1700000000.0, "url": "...", ...}
+
+    Replaying the file merges the lines of each job, so the latest event
+    and every field ever recorded (URL, options, partial files) are known
+    after a restart. Jobs whose latest event is not final are incomplete.
+
+    Attributes:
+        path (str): Journal file location
+    """
+
+    def __init__(self, path: str = JOURNAL_PATH, compact_bytes: int = JOURNAL_COMPACT_BYTES):
+        self.path = path
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger(__name__)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._jobs = self._replay()
+        if os.path.exists(path) and os.path.getsize(path) > compact_bytes:
+            self.compact()
+
+    def _replay(self) -> Dict[str, Dict]:
+        jobs: Dict[str, Dict] = {}
+        good_end = 0
+        try:
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        if not line.endswith(b"\n"):
+                            # A torn last line after a crash; cut it off, or
+                            # the next record would be appended onto it
+                            self._truncate(good_end)
+                            break
+                        continue
+                    good_end = f.tell()
+                    job = jobs.setdefault(entry['job_id'], {'files': []})
+                    files = entry.pop('files', [])
+                    job.update(entry)
+                    job['files'] = job['files'] + [f for f in files if f not in job['files']]
+        except FileNotFoundError:
+            pass
+        return jobs
+
+    def _truncate(self, size: int) -> None:
+        self._logger.warning(f"Discarding torn last line of the job journal at byte {size}")
+        try:
+            with open(self.path, 'r+b') as f:
+                f.truncate(size)
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            self._logger.error(f"Failed to repair job journal: {e}")
+
+    def record(self, job_id: str, event: str, **fields) -> None:
+        """Append an event for a job.
+
+        Args:
+            job_id: Job identifier
+            event: Event name (submitted, started, progress, completed, failed,
+                cancelled, interrupted)
+            **fields: Extra JSON-serialisable data (url, options, files, error...)
+        """
+        entry = {'job_id': job_id, 'event': event, 'ts': time.time()}
+        entry.update(fields)
+        line = json.dumps(entry, default=str) + "\n"
+
+        with self._lock:
+            job = self._jobs.setdefault(job_id, {'files': []})
+            files = entry.get('files', [])
+            job.update({k: v for k, v in entry.items() if k != 'files'})
+            job['files'] = job['files'] + [f for f in files if f not in job['files']]
+            try:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+                    if event in _DURABLE_EVENTS:
+                        f.flush()
+                        os.fsync(f.fileno())
+            except OSError as e:
+                self._logger.error(f"Failed to write job journal: {e}")
+
+    def add_file(self, job_id: str, filename: str) -> None:
+        """Record a (partial) file written by a job, once per file."""
+        with self._lock:
+            known = filename in self._jobs.get(job_id, {}).get('files', [])
+        if not known:
+            self.record(job_id, 'progress', files=[filename])
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Get the merged record of a job."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def incomplete(self) -> List[Dict]:
+        """List jobs that were interrupted before reaching a final event."""
+        with self._lock:
+            return [dict(job) for job in self._jobs.values() if job.get('event') not in FINAL_EVENTS]
+
+    def compact(self) -> None:
+        """Rewrite the journal keeping only incomplete jobs."""
+        with self._lock:
+            self._jobs = {
+                job_id: job for job_id, job in self._jobs.items()
+                if job.get('event') not in FINAL_EVENTS
+            }
+            tmp_path = self.path + ".tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    for job in self._jobs.values():
+                        f.write(json.dumps(job, default=str) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                self._logger.error(f"Failed to compact job journal: {e}")
@@ -0,0 +1,186 @@
+"""Incremental reading of the application log files."""
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from src.config.settings import LOGS_DIR
+
+BLOCK_SIZE = 64 * 1024
+
+def tail_lines(path: str, max_lines: int, block_size: int = BLOCK_SIZE) -> List[str]:
+    """Read the last lines of a file without reading the whole file.
+
+    The file is read backwards in blocks until enough newlines have been
+    seen, so memory use is proportional to the lines returned, not to the
+    file size.
+
+    Args:
+        path: File to read
+        max_lines: Number of lines to return
+        block_size: Size of each backwards read
+
+    Returns:
+        list: Up to ``max_lines`` lines, oldest first, with line endings
+    """
+    if max_lines <= 0:
+        return []
+
+    blocks = []
+    newlines = 0
+    with open(path, 'rb') as f:
+        position = f.seek(0, os.SEEK_END)
+        # One newline more than requested guarantees the first line is whole
+        while position > 0 and newlines <= max_lines:
+            size = min(block_size, position)
+            position -= size
+            f.seek(position)
+            block = f.read(size)
+            newlines += block.count(b'\n')
+            blocks.append(block)
+
+    lines = b''.join(reversed(blocks)).splitlines(keepends=True)
+    return [line.decode('utf-8', errors='replace') for line in lines[-max_lines:]]
+
+def read_last_lines(paths: Iterable[str], max_lines: Optional[int] = None) -> List[str]:
+    """Collect the last lines across several files in time order.
+
+    Args:
+        paths: Files ordered oldest first
+        max_lines: Number of lines to return; None reads everything
+
+    Returns:
+        list: Lines from all files, oldest first
+    """
+    paths = list(paths)
+    if max_lines is None:
+        lines = []
+        for path in paths:
+            with open(path, 'r', errors='replace') as f:
+                lines.extend(f.readlines())
+        return lines
+
+    chunks = []
+    remaining = max_lines
+    for path in reversed(paths):
+        if remaining <= 0:
+            break
+        chunk = tail_lines(path, remaining)
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return [line for chunk in reversed(chunks) for line in chunk]
+
+class _FileState:
+    """Read position of one log file."""
+
+    __slots__ = ('inode', 'offset', 'partial')
+
+    def __init__(self, inode: int, offset: int):
+        self.inode = inode
+        self.offset = offset
+        self.partial = b''
+
+class LogTailer:
+    """Follows the ``*.log`` files of a directory like ``tail -F``.
+
+    Each call to ``poll`` returns only the lines appended since the previous
+    call. Files are tracked by inode and offset: a new inode (rotation) or a
+    file shorter than the stored offset (truncation) restarts reading from
+    the beginning of that file. No poll reads more than ``initial_bytes``
+    of a file: one that grew further is followed from its tail, dropping
+    the partial first line. Incomplete trailing lines are held back until
+    their newline arrives.
+
+    Attributes:
+        logs_dir (str): Directory containing the log files
+        initial_bytes (int): Most of a file one poll reads, so the tail the first poll shows
+    """
+
+    def __init__(self, logs_dir: str = LOGS_DIR, pattern: str = "*.log",
+                 initial_bytes: int = 64 * 1024):
+        self.logs_dir = logs_dir
+        self.pattern = pattern
+        self.initial_bytes = initial_bytes
+        self._files: Dict[str, _FileState] = {}
+        self._logger = logging.getLogger(__name__)
+
+    def _log_files(self) -> List[Path]:
+        """List log files, oldest modification first."""
+        entries = []
+        try:
+            for path in Path(self.logs_dir).glob(self.pattern):
+                try:
+                    entries.append((path.stat().st_mtime, path))
+                except OSError:
+                    continue
+        except OSError:
+            return []
+        return [path for _, path in sorted(entries)]
+
+    def poll(self) -> List[str]:
+        """Read lines appended since the last poll.
+
+        Returns:
+            list: New complete lines, including their line endings
+        """
+        lines: List[str] = []
+        seen = set()
+
+        for path in self._log_files():
+            key = str(path)
+            seen.add(key)
+            try:
+                lines.extend(self._read_new(key))
+            except OSError as e:
+                self._logger.debug(f"Failed to read {key}: {e}")
+                self._files.pop(key, None)
+
+        for key in list(self._files):
+            if key not in seen:
+                del self._files[key]
+
+        return lines
+
+    def _read_new(self, key: str) -> List[str]:
+        with open(key, 'rb') as f:
+            st = os.fstat(f.fileno())
+            state = self._files.get(key)
+
+            if state is None:
+                # Files created after the first poll are read from the
+                # beginning, within the limit below
+                state = self._files[key] = _FileState(st.st_ino, 0)
+            elif state.inode != st.st_ino or st.st_size < state.offset:
+                state.inode = st.st_ino
+                state.offset = 0
+                state.partial = b''
+
+            # At start, after the panel was hidden or when the file was
+            # replaced, only the last initial_bytes are read. Start one
+            # byte early so a line beginning exactly at the cut is kept
+            # when skipping the partial first line.
+            skip_partial = st.st_size - state.offset > self.initial_bytes
+            if skip_partial:
+                state.offset = st.st_size - self.initial_bytes - 1
+                state.partial = b''
+
+            if st.st_size == state.offset:
+                return []
+
+            f.seek(state.offset)
+            data = f.read(st.st_size - state.offset)
+
+        state.offset += len(data)
+        data = state.partial + data
+        if skip_partial:
+            newline = data.find(b'\n')
+            data = data[newline + 1:] if newline >= 0 else b''
+
+        complete, sep, state.partial = data.rpartition(b'\n')
+        if not sep:
+            return []
+        return (complete + sep).decode('utf-8', errors='replace').splitlines(keepends=True)
+
+    def reset(self) -> None:
+        """Forget all positions; the next poll behaves like the first one."""
+        self._files.clear()
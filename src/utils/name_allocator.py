@@ -0,0 +1,136 @@
+"""Collision-free file name allocation for output directories."""
+import logging
+import os
+import re
+import threading
+from typing import Dict, Optional, Set, Tuple
+
+# "name_12.ext" -> ("name", "12", ".ext")
+_SUFFIXED = re.compile(r'^(?P<stem>.*)_(?P<n>\d+)(?P<ext>\.[^.]*)?$')
+
+class _DirectoryState:
+    """Names known to exist in one directory."""
+
+    __slots__ = ('names', 'max_suffix')
+
+    def __init__(self):
+        self.names: Set[str] = set()
+        self.max_suffix: Dict[Tuple[str, str], int] = {}
+
+    def add(self, filename: str) -> None:
+        self.names.add(filename)
+        match = _SUFFIXED.match(filename)
+        if match:
+            key = (match.group('stem'), match.group('ext') or '')
+            n = int(match.group('n'))
+            if n > self.max_suffix.get(key, 0):
+                self.max_suffix[key] = n
+
+class NameAllocator:
+    """Hands out unique file names, ``name.ext``, ``name_1.ext``, ...
+
+    With ``reserve=True`` the name is claimed by creating an empty file
+    with ``O_EXCL``, so concurrent workers (and other processes) can never
+    get the same name. For these, each directory is listed once with
+    ``os.scandir``; after that the allocator remembers every name it has
+    seen or handed out and the highest numeric suffix per name, so an
+    allocation costs O(1) however many ``name_N`` files already exist.
+
+    Without ``reserve`` nothing is remembered: the name is only checked
+    against what is on disk at the time of the call.
+    """
+
+    def __init__(self):
+        self._dirs: Dict[str, _DirectoryState] = {}
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def _list(directory: str) -> _DirectoryState:
+        state = _DirectoryState()
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    state.add(entry.name)
+        except FileNotFoundError:
+            pass
+        return state
+
+    def _state(self, directory: str) -> _DirectoryState:
+        state = self._dirs.get(directory)
+        if state is None:
+            state = self._dirs[directory] = self._list(directory)
+        return state
+
+    def allocate(self, directory: str, filename: str, reserve: bool = False) -> str:
+        """Get a file name that is not used in ``directory``.
+
+        Args:
+            directory: Target directory
+            filename: Desired file name
+            reserve: Create the file (empty) so nobody else can take the name,
+                and remember it as taken
+
+        Returns:
+            str: ``filename`` or ``name_N.ext`` with the next free N
+        """
+        directory = os.path.abspath(directory)
+        name, ext = os.path.splitext(filename)
+        if not reserve:
+            return self._free_on_disk(directory, filename, name, ext)
+        with self._lock:
+            state = self._state(directory)
+            candidate = filename
+            while True:
+                if candidate in state.names:
+                    n = state.max_suffix.get((name, ext), 0) + 1
+                    candidate = f"{name}_{n}{ext}"
+                    # A name taken by an earlier request counts as well
+                    state.max_suffix[(name, ext)] = n
+                    if candidate in state.names:
+                        continue
+                if self._claim(os.path.join(directory, candidate)):
+                    state.add(candidate)
+                    return candidate
+                # Created by someone else since the directory was listed
+                state.add(candidate)
+
+    def _free_on_disk(self, directory: str, filename: str, name: str, ext: str) -> str:
+        """First name after the highest suffix on disk, without claiming it."""
+        if not os.path.lexists(os.path.join(directory, filename)):
+            return filename
+        state = self._list(directory)
+        n = state.max_suffix.get((name, ext), 0) + 1
+        candidate = f"{name}_{n}{ext}"
+        while candidate in state.names or os.path.lexists(os.path.join(directory, candidate)):
+            n += 1
+            candidate = f"{name}_{n}{ext}"
+        return candidate
+
+    @staticmethod
+    def _claim(path: str) -> bool:
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+            return True
+        except FileExistsError:
+            return False
+
+    def release(self, directory: str, filename: str) -> None:
+        """Give back a reserved name whose download did not happen.
+
+        The empty placeholder file is removed; files with content are kept.
+        """
+        path = os.path.join(os.path.abspath(directory), filename)
+        try:
+            if os.path.getsize(path) == 0:
+                os.remove(path)
+        except OSError as e:
+            self._logger.debug(f"Failed to release {path}: {e}")
+
+    def invalidate(self, directory: Optional[str] = None) -> None:
+        """Forget cached listings, of one directory or of all."""
+        with self._lock:
+            if directory is None:
+                self._dirs.clear()
+            else:
+                self._dirs.pop(os.path.abspath(directory), None)
@@ -0,0 +1,179 @@
+"""Progress events and a coalescing event bus."""
+import logging
+import re
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+# Statuses that are always delivered, never coalesced away
+TERMINAL_STATUSES = frozenset({'finished', 'completed', 'error', 'failed', 'cancelled'})
+
+_UNITS = {'': 1, 'B': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+_PROGRESS_LINE = re.compile(
+    r'\[download\]\s+(?P<percent>\d+(?:\.\d+)?)%'
+    r'(?:\s+of\s+~?\s*(?P<total>\d+(?:\.\d+)?)(?P<total_unit>[KMGT]?)i?B)?'
+    r'(?:\s+at\s+(?P<speed>\d+(?:\.\d+)?)(?P<speed_unit>[KMGT]?)i?B/s)?'
+    r'(?:\s+ETA\s+(?P<eta>[\d:]+))?'
+)
+
+class ProgressEvent(NamedTuple):
+    """Compact progress record for one task."""
+    task_id: str
+    status: str
+    percent: Optional[float] = None
+    downloaded_bytes: Optional[int] = None
+    total_bytes: Optional[int] = None
+    speed: Optional[float] = None
+    eta: Optional[int] = None
+    filename: Optional[str] = None
+    timestamp: float = 0.0
+
+def _parse_eta(eta: str) -> int:
+    seconds = 0
+    for part in eta.split(':'):
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+def parse_progress_line(line: str, task_id: str = "") -> Optional[ProgressEvent]:
+    """Parse a yt-dlp ``[download]`` progress line.
+
+    Args:
+        line: Output line printed by yt-dlp with ``--newline``
+        task_id: Task the line belongs to
+
+    Returns:
+        ProgressEvent: Parsed event, or None if the line is not a progress line
+    """
+    match = _PROGRESS_LINE.search(line)
+    if not match:
+        return None
+
+    percent = float(match.group('percent'))
+    total = downloaded = speed = eta = None
+    if match.group('total'):
+        total = int(float(match.group('total')) * _UNITS[match.group('total_unit')])
+        downloaded = int(total * percent / 100)
+    if match.group('speed'):
+        speed = float(match.group('speed')) * _UNITS[match.group('speed_unit')]
+    if match.group('eta'):
+        eta = _parse_eta(match.group('eta'))
+
+    return ProgressEvent(
+        task_id=task_id,
+        status='finished' if percent >= 100 and eta is None else 'downloading',
+        percent=percent,
+        downloaded_bytes=downloaded,
+        total_bytes=total,
+        speed=speed,
+        eta=eta,
+        timestamp=time.time()
+    )
+
+def event_from_hook(d: dict, task_id: str = "") -> ProgressEvent:
+    """Convert a yt-dlp progress hook dictionary into a ProgressEvent."""
+    total = d.get('total_bytes') or d.get('total_bytes_estimate')
+    downloaded = d.get('downloaded_bytes')
+    percent = None
+    if d.get('status') == 'finished':
+        percent = 100.0
+    elif total and downloaded is not None:
+        percent = downloaded * 100.0 / total
+
+    return ProgressEvent(
+        task_id=task_id,
+        status=d.get('status', 'downloading'),
+        percent=percent,
+        downloaded_bytes=downloaded,
+        total_bytes=int(total) if total else None,
+        speed=d.get('speed'),
+        eta=d.get('eta'),
+        filename=d.get('tmpfilename') or d.get('filename'),
+        timestamp=time.time()
+    )
+
+class ProgressBus:
+    """Coalesces progress events and delivers them to subscribers in batches.
+
+    Publishing only records the event. A background thread flushes
+    ``rate_hz`` times per second, passing the list of events gathered since
+    the last flush to every subscriber. Consecutive progress events of one
+    task collapse into the latest one; terminal events (finished, error,
+    cancelled) are always delivered.
+
+    Attributes:
+        rate_hz (float): Flushes per second
+    """
+
+    def __init__(self, rate_hz: float = 10.0):
+        self.rate_hz = rate_hz
+        self._pending: Dict[str, List[ProgressEvent]] = {}
+        self._subscribers: List[Callable[[List[ProgressEvent]], None]] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self._logger = logging.getLogger(__name__)
+
+    def subscribe(self, callback: Callable[[List[ProgressEvent]], None]) -> Callable[[], None]:
+        """Register a subscriber for event batches.
+
+        Returns:
+            Callable: Function that removes the subscription
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+            self._start()
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def publish(self, event: ProgressEvent) -> None:
+        """Record an event for the next flush."""
+        with self._lock:
+            events = self._pending.setdefault(event.task_id, [])
+            if events and events[-1].status not in TERMINAL_STATUSES and event.status not in TERMINAL_STATUSES:
+                events[-1] = event
+            else:
+                events.append(event)
+
+    def flush(self) -> List[ProgressEvent]:
+        """Deliver pending events now.
+
+        Returns:
+            list: The batch that was delivered
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            subscribers = list(self._subscribers)
+        batch = [event for events in pending.values() for event in events]
+        if batch:
+            for callback in subscribers:
+                try:
+                    callback(batch)
+                except Exception as e:
+                    self._logger.error(f"Progress subscriber failed: {e}")
+        return batch
+
+    def _start(self) -> None:
+        if self._thread is None and not self._closed:
+            self._thread = threading.Thread(target=self._run, name="progress-bus", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        interval = 1.0 / self.rate_hz
+        while not self._wakeup.wait(interval):
+            self.flush()
+        self.flush()
+
+    def close(self) -> None:
+        """Flush remaining events and stop the background thread."""
+        self._closed = True
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        else:
+            self.flush()
@@ -0,0 +1,141 @@
+"""Adaptive request rates: back off when a site throttles us, recover after."""
+import logging
+import re
+import threading
+import time
+from typing import Dict, Optional, Union
+
+from src.utils.rate_limiter import HostRateLimiter
+
+# Messages yt-dlp (in-process or on stderr) prints when a site throttles us
+THROTTLE_SIGNATURES = re.compile(
+    r"HTTP Error 429|429 Too Many Requests|Too Many Requests"
+    r"|Sign in to confirm you.{1,3}re not a bot|sign[- ]in required"
+    r"|rate[- ]limit",
+    re.IGNORECASE
+)
+
+def is_throttling_error(error: Union[BaseException, str, None]) -> bool:
+    """Tell whether an error means the site is throttling us.
+
+    Looks for HTTP status 429 on the error and on the exceptions it wraps
+    (yt-dlp keeps the original one in ``exc_info``, engines chain it as
+    ``__cause__``), then for the known messages in their text, so stderr
+    of the yt-dlp executable works as well.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, str):
+            return bool(THROTTLE_SIGNATURES.search(error))
+        if getattr(error, 'status', None) == 429 or getattr(error, 'code', None) == 429:
+            return True
+        if THROTTLE_SIGNATURES.search(str(error)):
+            return True
+        exc_info = getattr(error, 'exc_info', None)
+        wrapped = exc_info[1] if isinstance(exc_info, tuple) and len(exc_info) > 1 else None
+        error = wrapped or error.__cause__ or error.__context__
+    return False
+
+class _HostState:
+    """Counters of one host."""
+
+    __slots__ = ('successes', 'throttled', 'decreases', 'last_decrease')
+
+    def __init__(self):
+        self.successes = 0
+        self.throttled = 0
+        self.decreases = 0
+        self.last_decrease = float('-inf')
+
+class AdaptiveRateController:
+    """AIMD control of the per-host rates of a ``HostRateLimiter``.
+
+    A throttling error (see ``is_throttling_error``) multiplies the rate
+    of its host by ``decrease_factor`` and empties its bucket; every
+    successful request adds ``increase_step`` back, up to ``max_rate``.
+    Errors arriving within ``hold_seconds`` of a decrease are counted but
+    do not cut again, since concurrent requests usually fail together.
+
+    Attributes:
+        limiter (HostRateLimiter): Limiter whose buckets are adjusted
+        min_rate (float): Lowest rate, in requests per period
+        max_rate (float): Highest rate, defaults to the limiter's rate
+    """
+
+    def __init__(self, limiter: HostRateLimiter, min_rate: float = 1,
+                 max_rate: Optional[float] = None, decrease_factor: float = 0.5,
+                 increase_step: float = 1, hold_seconds: float = 10):
+        if not 0 < decrease_factor < 1:
+            raise ValueError(f"decrease_factor must be in (0, 1), got {decrease_factor}")
+        self.limiter = limiter
+        self.max_rate = float(max_rate if max_rate is not None else limiter.rate)
+        self.min_rate = min(float(min_rate), self.max_rate)
+        self.decrease_factor = decrease_factor
+        self.increase_step = increase_step
+        self.hold_seconds = hold_seconds
+        self._hosts: Dict[str, _HostState] = {}
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger(__name__)
+
+    def _state(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState()
+        return state
+
+    def record_success(self, url: str) -> None:
+        """Report a request to ``url`` that went through."""
+        bucket = self.limiter.for_url(url)
+        with self._lock:
+            self._state(self.limiter.host_of(url)).successes += 1
+            if bucket.rate < self.max_rate:
+                bucket.set_rate(min(self.max_rate, bucket.rate + self.increase_step))
+
+    def record_failure(self, url: str, error: Union[BaseException, str]) -> bool:
+        """Report a failed request to ``url``.
+
+        Returns:
+            bool: True if the error was throttling, so the caller can wait
+            before retrying
+        """
+        if not is_throttling_error(error):
+            return False
+        host = self.limiter.host_of(url)
+        bucket = self.limiter.for_url(url)
+        with self._lock:
+            state = self._state(host)
+            state.throttled += 1
+            now = time.monotonic()
+            if now - state.last_decrease < self.hold_seconds:
+                return True
+            state.last_decrease = now
+            state.decreases += 1
+            rate = max(self.min_rate, bucket.rate * self.decrease_factor)
+            bucket.set_rate(rate)
+            bucket.drain()
+        self._logger.warning(f"{host} is throttling requests, rate lowered to "
+                             f"{rate:g} per {bucket.period:g}s")
+        return True
+
+    def current_rate(self, url: str) -> float:
+        """Requests per period currently allowed to the host of ``url``."""
+        return self.limiter.for_url(url).rate
+
+    def metrics(self) -> Dict[str, Dict]:
+        """Current rate and counters of every host seen so far.
+
+        Returns:
+            dict: ``{host: {'rate', 'period', 'successes', 'throttled', 'decreases'}}``
+        """
+        with self._lock:
+            return {
+                host: {
+                    'rate': self.limiter.for_url(host).rate,
+                    'period': self.limiter.period,
+                    'successes': state.successes,
+                    'throttled': state.throttled,
+                    'decreases': state.decreases
+                }
+                for host, state in self._hosts.items()
+            }
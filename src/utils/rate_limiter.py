@@ -1,88 +1,280 @@
 """Rate limiter implementation using token bucket algorithm."""
 
+import collections
 import threading
 import time
-from typing import Optional
-from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Deque, Dict, Optional
+from urllib.parse import urlparse
+
+if TYPE_CHECKING:
+    # Imported where coroutines wait; threads-only users never load asyncio
+    import asyncio
+
+class _Waiter:
+    """A caller queued for tokens; woken through its own condition or event."""
+
+    __slots__ = ('cost', 'cond', 'loop', 'event')
+
+    def __init__(self, cost: float, cond: Optional[threading.Condition] = None,
+                 loop: Optional['asyncio.AbstractEventLoop'] = None,
+                 event: Optional['asyncio.Event'] = None):
+        self.cost = cost
+        self.cond = cond
+        self.loop = loop
+        self.event = event
+
+    def wake(self) -> None:
+        if self.cond is not None:
+            self.cond.notify()
+        else:
+            self.loop.call_soon_threadsafe(self.event.set)
 
 class RateLimiter:
     """Token bucket rate limiter implementation.
-    
+
     This class implements a thread-safe rate limiter using the token bucket algorithm.
     It helps prevent hitting API rate limits by controlling the rate of requests.
-    
+
+    Waiting callers are served first come, first served, from threads and
+    coroutines alike. Only the oldest waiter watches the bucket: it sleeps
+    exactly until enough tokens for its cost have accumulated, then wakes
+    the next one. Requests can have a weight (``cost``), so cheap calls
+    such as metadata lookups can use fractions of a token.
+
     Attributes:
         rate (int): Number of tokens to add per period
         period (int): Period in seconds
         burst (int): Maximum number of tokens that can be accumulated
-        cooldown (int): Time to wait between retries when rate limited
+        cooldown (int): Kept for compatibility; waits are computed exactly
     """
-    
+
     def __init__(self, rate: int, period: int, burst: int, cooldown: int = 5):
         self.rate = float(rate)
         self.period = float(period)
         self.burst = float(burst)
         self.cooldown = cooldown
-        self.tokens = burst
-        self.last_update = time.time()
+        self.tokens = float(burst)
+        self.last_update = time.monotonic()
         self.lock = threading.Lock()
-        self._last_retry_time: Optional[datetime] = None
-    
+        self._waiters: Deque[_Waiter] = collections.deque()
+
     def _add_tokens(self) -> None:
         """Add new tokens based on time passed."""
-        now = time.time()
+        now = time.monotonic()
         time_passed = now - self.last_update
         new_tokens = time_passed * (self.rate / self.period)
         self.tokens = min(self.burst, self.tokens + new_tokens)
         self.last_update = now
-    
-    def _should_retry(self) -> bool:
-        """Check if enough time has passed since last retry."""
-        if self._last_retry_time is None:
+
+    def _time_until(self, cost: float) -> float:
+        """Seconds until ``cost`` tokens are available (lock held)."""
+        return max(0.0, (cost - self.tokens) * self.period / self.rate)
+
+    def _check_cost(self, cost: float) -> None:
+        if cost <= 0 or cost > self.burst:
+            raise ValueError(f"cost must be in (0, {self.burst}], got {cost}")
+
+    def _take_now(self, cost: float) -> bool:
+        """Take tokens if nobody is queued and enough are available (lock held)."""
+        if self._waiters:
+            return False
+        self._add_tokens()
+        if self.tokens >= cost:
+            self.tokens -= cost
             return True
-        
-        time_since_last = datetime.now() - self._last_retry_time
-        return time_since_last.total_seconds() >= self.cooldown
-    
-    def acquire(self, block: bool = True, timeout: Optional[float] = None) -> bool:
+        return False
+
+    def _serve(self, waiter: _Waiter) -> Optional[float]:
+        """Try to serve a queued waiter (lock held).
+
+        Returns:
+            float: 0 when served, seconds to wait when it is at the head of
+            the queue, None when it waits behind others
+        """
+        if self._waiters[0] is not waiter:
+            return None
+        self._add_tokens()
+        if self.tokens >= waiter.cost:
+            self.tokens -= waiter.cost
+            self._waiters.popleft()
+            if self._waiters:
+                self._waiters[0].wake()
+            return 0.0
+        return self._time_until(waiter.cost)
+
+    def _leave(self, waiter: _Waiter) -> None:
+        """Remove a waiter that gave up (lock held)."""
+        try:
+            was_head = self._waiters[0] is waiter
+            self._waiters.remove(waiter)
+        except (IndexError, ValueError):
+            return
+        if was_head and self._waiters:
+            self._waiters[0].wake()
+
+    def acquire(self, block: bool = True, timeout: Optional[float] = None, cost: float = 1.0) -> bool:
         """Acquire a token from the bucket.
-        
+
         Args:
             block (bool): If True, block until a token is available
             timeout (float, optional): Maximum time to wait for a token
-        
+            cost (float): Number of tokens the request uses
+
         Returns:
             bool: True if token was acquired, False otherwise
+
+        Raises:
+            ValueError: If ``cost`` is not positive or exceeds ``burst``
         """
-        start_time = time.time()
-        
-        while True:
-            with self.lock:
-                self._add_tokens()
-                
-                if self.tokens >= 1:
-                    self.tokens -= 1
+        self._check_cost(cost)
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self.lock:
+            if self._take_now(cost):
+                return True
+            if not block:
+                return False
+
+            waiter = _Waiter(cost, cond=threading.Condition(self.lock))
+            self._waiters.append(waiter)
+            try:
+                while True:
+                    wait = self._serve(waiter)
+                    if wait == 0.0:
+                        return True
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            return False
+                        wait = remaining if wait is None else min(wait, remaining)
+                    waiter.cond.wait(wait)
+            finally:
+                self._leave(waiter)
+
+    async def acquire_async(self, cost: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Acquire tokens without blocking the event loop.
+
+        Coroutines share the queue with threads, in arrival order.
+
+        Args:
+            cost (float): Number of tokens the request uses
+            timeout (float, optional): Maximum time to wait
+
+        Returns:
+            bool: True if the tokens were acquired, False on timeout
+        """
+        import asyncio
+
+        self._check_cost(cost)
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+
+        with self.lock:
+            if self._take_now(cost):
+                return True
+            waiter = _Waiter(cost, loop=loop, event=asyncio.Event())
+            self._waiters.append(waiter)
+
+        try:
+            while True:
+                with self.lock:
+                    wait = self._serve(waiter)
+                    waiter.event.clear()
+                if wait == 0.0:
                     return True
-                
-                if not block:
-                    return False
-                
-                if not self._should_retry():
-                    return False
-                
-                if timeout is not None:
-                    if time.time() - start_time >= timeout:
+                if deadline is not None:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
                         return False
-                
-                self._last_retry_time = datetime.now()
-            
-            # Wait before next attempt
-            time.sleep(self.cooldown)
-    
-    def try_acquire(self) -> bool:
+                    wait = remaining if wait is None else min(wait, remaining)
+                try:
+                    await asyncio.wait_for(waiter.event.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self.lock:
+                self._leave(waiter)
+
+    def try_acquire(self, cost: float = 1.0) -> bool:
         """Try to acquire a token without blocking.
-        
+
         Returns:
             bool: True if token was acquired, False otherwise
         """
-        return self.acquire(block=False)
+        return self.acquire(block=False, cost=cost)
+
+    def set_rate(self, rate: float, period: Optional[float] = None) -> None:
+        """Change the refill rate; waiting callers adapt immediately.
+
+        Args:
+            rate: Tokens added per period
+            period: New period in seconds, unchanged when omitted
+        """
+        with self.lock:
+            # Tokens earned so far are counted at the old rate
+            self._add_tokens()
+            self.rate = float(rate)
+            if period is not None:
+                self.period = float(period)
+            if self._waiters:
+                self._waiters[0].wake()
+
+    def drain(self) -> None:
+        """Drop accumulated tokens, so the next request waits a full interval."""
+        with self.lock:
+            self._add_tokens()
+            self.tokens = 0.0
+
+class HostRateLimiter:
+    """One token bucket per host, created on first use.
+
+    Requests to different sites do not slow each other down, while each
+    site still sees at most the configured rate.
+
+    Attributes:
+        rate (int): Tokens added per period, for each host
+        period (int): Period in seconds
+        burst (int): Bucket size for each host
+    """
+
+    def __init__(self, rate: int, period: int, burst: int, cooldown: int = 5):
+        self.rate = rate
+        self.period = period
+        self.burst = burst
+        self.cooldown = cooldown
+        self._buckets: Dict[str, RateLimiter] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        """Get the bucket key of a URL (host without ``www.``/``m.``)."""
+        host = (urlparse(url if '://' in url else f"//{url}").hostname or "").lower()
+        for prefix in ("www.", "m."):
+            if host.startswith(prefix):
+                host = host[len(prefix):]
+        return host
+
+    def for_url(self, url: str) -> RateLimiter:
+        """Get the bucket of the host ``url`` points to."""
+        host = self.host_of(url)
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = RateLimiter(
+                    self.rate, self.period, self.burst, self.cooldown
+                )
+            return bucket
+
+    def acquire(self, url: str, block: bool = True, timeout: Optional[float] = None,
+                cost: float = 1.0) -> bool:
+        """Acquire tokens from the bucket of ``url``'s host."""
+        return self.for_url(url).acquire(block=block, timeout=timeout, cost=cost)
+
+    async def acquire_async(self, url: str, cost: float = 1.0,
+                            timeout: Optional[float] = None) -> bool:
+        """Acquire tokens from the bucket of ``url``'s host without blocking the loop."""
+        return await self.for_url(url).acquire_async(cost=cost, timeout=timeout)
+
+    def try_acquire(self, url: str, cost: float = 1.0) -> bool:
+        """Try to acquire tokens for ``url`` without blocking."""
+        return self.for_url(url).try_acquire(cost=cost)
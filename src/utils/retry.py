@@ -0,0 +1,121 @@
+"""Retry policy for failed jobs: error classification and backoff."""
+import errno
+import random
+import re
+from dataclasses import dataclass, field
+from typing import Iterator, Tuple, Union
+
+from src.utils.rate_control import is_throttling_error
+
+# Error categories
+TRANSIENT = 'transient'  # network trouble, server errors: retry
+THROTTLED = 'throttled'  # the site is rate limiting us: retry, slower
+PERMANENT = 'permanent'  # the media cannot be fetched: give up
+LOCAL = 'local'  # disk full, no permission: give up, keep partial data
+
+_LOCAL_ERRNOS = frozenset({errno.ENOSPC, errno.EDQUOT, errno.EROFS, errno.EACCES,
+                           errno.EPERM, errno.ENAMETOOLONG})
+
+LOCAL_SIGNATURES = re.compile(
+    r"No space left on device|Disk quota exceeded|Read-only file system"
+    r"|Permission denied|File name too long",
+    re.IGNORECASE
+)
+
+# Messages of yt-dlp and of the downloaders for media that will not
+# become available by trying again
+PERMANENT_SIGNATURES = re.compile(
+    r"Video unavailable|This video is (?:unavailable|not available|private)|Private video"
+    r"|This video has been removed|account associated with this video has been terminated"
+    r"|members[- ]only|Join this channel|confirm your age|not available in your country"
+    r"|Unsupported URL|is not a valid URL|Requested format is not available"
+    r"|HTTP Error (?:400|401|404|410)\b|larger than max-filesize|over the limit of"
+    r"|Premieres in|This live event will begin|looks truncated|Incomplete YouTube ID",
+    re.IGNORECASE
+)
+
+def _error_chain(error: BaseException) -> Iterator[BaseException]:
+    """Yield an error and the ones it wraps (``exc_info``, cause, context)."""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        exc_info = getattr(error, 'exc_info', None)
+        wrapped = exc_info[1] if isinstance(exc_info, tuple) and len(exc_info) > 1 else None
+        error = wrapped or error.__cause__ or error.__context__
+
+def _http_status(error: BaseException):
+    status = getattr(error, 'status', None) or getattr(error, 'code', None)
+    return status if isinstance(status, int) and 100 <= status < 600 else None
+
+def _is_expected_extractor_error(error: BaseException) -> bool:
+    """Whether yt-dlp flagged an error as expected, or cannot handle the URL at all."""
+    try:
+        from yt_dlp.utils import ExtractorError, UnsupportedError
+    except ImportError:
+        return False
+    return isinstance(error, UnsupportedError) or \
+        (isinstance(error, ExtractorError) and getattr(error, 'expected', False))
+
+def classify_error(error: Union[BaseException, str]) -> str:
+    """Sort a failure into TRANSIENT, THROTTLED, PERMANENT or LOCAL.
+
+    Exceptions are checked along with the ones they wrap, for OS error
+    numbers and HTTP status codes first, then for known messages, so the
+    stderr text of the yt-dlp executable works as well. Extractor errors
+    yt-dlp marks as expected (removed or private media, bad IDs) and
+    unsupported URLs are permanent. Anything not recognised counts as
+    transient.
+
+    Args:
+        error: Exception or error message
+
+    Returns:
+        str: The category
+    """
+    chain = [error] if isinstance(error, str) else list(_error_chain(error))
+    texts = [item if isinstance(item, str) else str(item) for item in chain]
+    if any(isinstance(item, OSError) and item.errno in _LOCAL_ERRNOS for item in chain) \
+            or any(LOCAL_SIGNATURES.search(text) for text in texts):
+        return LOCAL
+    if is_throttling_error(error):
+        return THROTTLED
+    statuses = [status for status in map(_http_status, chain) if status]
+    # 403 is left to retry: media URLs that expired answer with it
+    if any(400 <= status < 500 and status not in (403, 408) for status in statuses) \
+            or any(_is_expected_extractor_error(item) for item in chain if not isinstance(item, str)) \
+            or any(PERMANENT_SIGNATURES.search(text) for text in texts):
+        return PERMANENT
+    return TRANSIENT
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """When and after how long a failed job is tried again.
+
+    Delays grow exponentially and use full jitter (a random wait between
+    zero and the backoff), so jobs that failed together do not retry
+    together. Partial data is never removed between attempts; yt-dlp
+    continues from the ``.part`` files.
+
+    Attributes:
+        max_retries (int): Extra attempts after the first one
+        base_delay (float): Backoff of the first retry, in seconds
+        max_delay (float): Upper bound of the backoff, in seconds
+        multiplier (float): Growth of the backoff per retry
+        retry_on (tuple): Categories that are retried
+    """
+    max_retries: int = 3
+    base_delay: float = 2.0
+    max_delay: float = 60.0
+    multiplier: float = 2.0
+    retry_on: Tuple[str, ...] = (TRANSIENT, THROTTLED)
+    rng: random.Random = field(default_factory=random.Random, compare=False, repr=False)
+
+    def should_retry(self, category: str, attempt: int) -> bool:
+        """Tell whether to retry after failed attempt number ``attempt`` (0 based)."""
+        return category in self.retry_on and attempt < self.max_retries
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before retrying failed attempt number ``attempt`` (0 based)."""
+        cap = min(self.max_delay, self.base_delay * self.multiplier ** attempt)
+        return self.rng.uniform(0, cap)
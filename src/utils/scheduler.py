@@ -0,0 +1,265 @@
+"""Bounded download scheduler with priorities and per-caller fairness."""
+
+import heapq
+import itertools
+import logging
+import queue
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+class TaskCancelled(Exception):
+    """Raised when waiting on a task that was cancelled before it ran."""
+    pass
+
+@dataclass
+class ScheduledTask:
+    """A unit of work tracked by the scheduler."""
+    task_id: str
+    fn: Callable
+    args: tuple = ()
+    kwargs: Dict = field(default_factory=dict)
+    priority: int = 0
+    owner: str = "default"
+    status: str = "queued"
+    result: Any = None
+    error: Optional[BaseException] = None
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+class DownloadScheduler:
+    """Runs tasks on a fixed set of persistent worker threads.
+
+    Tasks are ordered by ``priority`` (lower runs first). Within the same
+    priority, tasks from different owners are interleaved round-robin so a
+    caller that submits hundreds of URLs does not starve everybody else.
+    When ``max_queue_size`` tasks are already waiting, ``submit`` blocks
+    (or raises ``queue.Full``) until a worker picks something up.
+
+    Attributes:
+        max_workers (int): Number of tasks allowed to run at the same time
+        max_queue_size (int): Maximum number of waiting tasks, 0 for unbounded
+    """
+
+    def __init__(self, max_workers: int, max_queue_size: int = 0, name: str = "download"):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.name = name
+        self._logger = logging.getLogger(__name__)
+
+        self._cond = threading.Condition()
+        self._heap: List[tuple] = []
+        self._tasks: Dict[str, ScheduledTask] = {}
+        self._owner_rounds: Dict[str, int] = {}
+        self._current_round = 0
+        self._counter = itertools.count()
+        self._queued = 0
+        self._running = 0
+        self._workers: List[threading.Thread] = []
+        self._shutdown = False
+
+    def submit(self, fn: Callable, *args, priority: int = 0, owner: str = "default",
+               task_id: Optional[str] = None, block: bool = True,
+               timeout: Optional[float] = None, **kwargs) -> str:
+        """Queue ``fn(*args, **kwargs)`` for execution.
+
+        Args:
+            fn: Callable to run on a worker thread
+            priority: Lower values run first
+            owner: Caller identifier used for fair ordering
+            task_id: Optional identifier, generated when omitted
+            block: Wait for queue space instead of failing immediately
+            timeout: Maximum time to wait for queue space
+
+        Returns:
+            str: Task ID
+
+        Raises:
+            queue.Full: If the queue is full and no space became available
+            RuntimeError: If the scheduler was shut down
+        """
+        task_id = task_id or str(uuid.uuid4())
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._cond:
+            while self.max_queue_size and self._queued >= self.max_queue_size:
+                if self._shutdown:
+                    break
+                if not block:
+                    raise queue.Full
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise queue.Full
+                self._cond.wait(remaining)
+
+            if self._shutdown:
+                raise RuntimeError(f"Scheduler '{self.name}' is shut down")
+
+            task = ScheduledTask(
+                task_id=task_id,
+                fn=fn,
+                args=args,
+                kwargs=kwargs,
+                priority=priority,
+                owner=owner
+            )
+            # An owner that has been idle does not get to jump ahead of the
+            # round currently being served.
+            owner_round = max(self._owner_rounds.get(owner, -1) + 1, self._current_round)
+            self._owner_rounds[owner] = owner_round
+
+            self._tasks[task_id] = task
+            heapq.heappush(self._heap, (priority, owner_round, next(self._counter), task_id))
+            self._queued += 1
+            self._ensure_workers()
+            self._cond.notify_all()
+
+        return task_id
+
+    def _ensure_workers(self) -> None:
+        """Start worker threads lazily, up to ``max_workers``."""
+        if len(self._workers) >= self.max_workers or len(self._workers) >= self._queued + self._running:
+            return
+        worker = threading.Thread(
+            target=self._worker_loop,
+            name=f"{self.name}-worker-{len(self._workers)}",
+            daemon=True
+        )
+        self._workers.append(worker)
+        worker.start()
+
+    def _next_task(self) -> Optional[ScheduledTask]:
+        """Pop the next runnable task, blocking until one is available."""
+        with self._cond:
+            while True:
+                while self._heap:
+                    _, owner_round, _, task_id = heapq.heappop(self._heap)
+                    task = self._tasks.get(task_id)
+                    if task is None or task.status != "queued":
+                        continue
+                    self._current_round = owner_round
+                    self._queued -= 1
+                    self._running += 1
+                    task.status = "running"
+                    task.started_at = time.time()
+                    self._cond.notify_all()
+                    return task
+                if self._shutdown:
+                    return None
+                self._cond.wait()
+
+    def _worker_loop(self) -> None:
+        """Worker thread body."""
+        while True:
+            task = self._next_task()
+            if task is None:
+                return
+            try:
+                task.result = task.fn(*task.args, **task.kwargs)
+                status = "completed"
+            except BaseException as e:  # noqa: B902 - reported through the task
+                task.error = e
+                status = "failed"
+                self._logger.debug(f"Task {task.task_id} failed: {e}")
+            with self._cond:
+                if task.status == "running":
+                    task.status = status
+                task.finished_at = time.time()
+                self._running -= 1
+                self._cond.notify_all()
+            task.done.set()
+
+    def cancel(self, task_id: str) -> bool:
+        """Cancel a task that has not started yet.
+
+        Returns:
+            bool: True if the task was removed from the queue
+        """
+        with self._cond:
+            task = self._tasks.get(task_id)
+            if task is None or task.status != "queued":
+                return False
+            task.status = "cancelled"
+            task.finished_at = time.time()
+            self._queued -= 1
+            self._cond.notify_all()
+        task.done.set()
+        return True
+
+    def wait(self, task_id: str, timeout: Optional[float] = None) -> Any:
+        """Wait for a task and return its result.
+
+        Raises:
+            KeyError: If the task is unknown
+            TimeoutError: If the task did not finish in time
+            TaskCancelled: If the task was cancelled before running
+        """
+        task = self._tasks[task_id]
+        if not task.done.wait(timeout):
+            raise TimeoutError(f"Task {task_id} did not finish in {timeout}s")
+        if task.status == "cancelled":
+            raise TaskCancelled(task_id)
+        if task.error is not None:
+            raise task.error
+        return task.result
+
+    def get_status(self, task_id: str) -> Dict:
+        """Get the status of a task."""
+        task = self._tasks[task_id]
+        return {
+            'status': task.status,
+            'priority': task.priority,
+            'owner': task.owner,
+            'error': str(task.error) if task.error else None,
+            'submitted_at': task.submitted_at,
+            'started_at': task.started_at,
+            'finished_at': task.finished_at
+        }
+
+    def forget(self, task_id: str) -> None:
+        """Drop bookkeeping for a finished task."""
+        with self._cond:
+            task = self._tasks.get(task_id)
+            if task is not None and task.done.is_set():
+                del self._tasks[task_id]
+
+    def stats(self) -> Dict[str, int]:
+        """Get queue depth and worker usage."""
+        with self._cond:
+            return {
+                'queued': self._queued,
+                'running': self._running,
+                'workers': len(self._workers),
+                'max_workers': self.max_workers
+            }
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False) -> None:
+        """Stop accepting tasks and let the workers exit.
+
+        Args:
+            wait: Block until the workers have finished
+            cancel_pending: Cancel tasks that have not started yet
+        """
+        with self._cond:
+            self._shutdown = True
+            if cancel_pending:
+                for task in self._tasks.values():
+                    if task.status == "queued":
+                        task.status = "cancelled"
+                        task.finished_at = time.time()
+                        task.done.set()
+                self._heap.clear()
+                self._queued = 0
+            self._cond.notify_all()
+            workers = list(self._workers)
+
+        if wait:
+            for worker in workers:
+                if worker is not threading.current_thread():
+                    worker.join()
@@ -1,13 +1,19 @@
 """Utility functions for the YouTube Downloader application."""
 import os
 import re
+import glob
 import shutil
 import logging
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Optional
 from urllib.parse import urlparse, parse_qs
 
 from src.config.settings import VALID_URL_REGEX, MIN_DISK_SPACE
+from src.utils.log_reader import read_last_lines
+from src.utils.name_allocator import NameAllocator
+
+# Shared so that every caller sees the names handed out to the others
+_name_allocator = NameAllocator()
 
 def validate_url(url: str) -> bool:
     """Validate if the URL is a valid YouTube URL.
@@ -57,6 +63,25 @@ def check_disk_space(path: str, required_space: int = MIN_DISK_SPACE) -> bool:
         logging.error(f"Failed to check disk space: {e}")
         return False
 
+def estimate_filesize(info: dict) -> Optional[int]:
+    """Estimate the download size from yt-dlp metadata.
+    
+    Args:
+        info: Info dictionary of a single video
+        
+    Returns:
+        int: Size in bytes (exact or approximate), None if unknown
+    """
+    size = info.get('filesize') or info.get('filesize_approx')
+    if size:
+        return int(size)
+    # Separate video and audio streams that are merged afterwards
+    formats = info.get('requested_formats') or []
+    sizes = [f.get('filesize') or f.get('filesize_approx') for f in formats]
+    if sizes and all(sizes):
+        return int(sum(sizes))
+    return None
+
 def ensure_dir(path: str) -> bool:
     """Ensure directory exists, create if it doesn't.
     
@@ -94,25 +119,50 @@ def get_safe_filename(filename: str) -> str:
         
     return safe_name
 
-def get_available_filename(directory: str, filename: str) -> str:
+def get_available_filename(directory: str, filename: str, reserve: bool = False) -> str:
     """Get an available filename by adding a number if file exists.
     
+    Numbering continues after the highest existing ``name_N``. Without
+    ``reserve`` only the disk is checked, so two calls without creating
+    the file return the same name. Reserved names are also tracked by a
+    shared NameAllocator, which lists each directory once and then
+    allocates in O(1).
+    
     Args:
         directory: Target directory
         filename: Desired filename
+        reserve: Atomically create the (empty) file so that concurrent
+            callers cannot get the same name
         
     Returns:
         str: Available filename
     """
-    name, ext = os.path.splitext(filename)
-    counter = 1
-    new_filename = filename
+    return _name_allocator.allocate(directory, filename, reserve=reserve)
+
+def remove_partial_files(paths: Iterable[str]) -> int:
+    """Delete partial download files left by yt-dlp.
     
-    while os.path.exists(os.path.join(directory, new_filename)):
-        new_filename = f"{name}_{counter}{ext}"
-        counter += 1
+    For each path this removes the file itself, its ``.ytdl`` resume state
+    and any ``-Frag`` fragment files of segmented downloads.
+    
+    Args:
+        paths: Partial file paths (usually ending in ``.part``)
         
-    return new_filename
+    Returns:
+        int: Number of files removed
+    """
+    removed = 0
+    for path in paths:
+        candidates = [path, f"{path}.ytdl"] + glob.glob(f"{glob.escape(path)}-Frag*")
+        for candidate in candidates:
+            try:
+                os.remove(candidate)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logging.error(f"Failed to remove partial file {candidate}: {e}")
+    return removed
 
 def format_size(size_bytes: int) -> str:
     """Format file size from bytes to human readable format.
@@ -153,37 +203,24 @@ def read_logs(max_lines: Optional[int] = None) -> str:
         max_lines: Maximum number of lines to read (from newest). If None, read all lines.
     
     Returns:
-        str: The contents of the log files.
+        str: The contents of the log files, oldest first.
     """
     try:
         logs_dir = os.path.expanduser("~/.my-yt-down/logs")
         if not os.path.exists(logs_dir):
             return "No logs found."
             
-        # Get list of log files sorted by modification time (newest first)
+        # Get list of log files sorted by modification time (oldest first)
         log_files = sorted(
             Path(logs_dir).glob("*.log"),
-            key=lambda x: x.stat().st_mtime,
-            reverse=True
+            key=lambda x: x.stat().st_mtime
         )
         
         if not log_files:
             return "No logs found."
             
-        # Read the contents of all log files
-        all_logs = []
-        for log_file in log_files:
-            with open(log_file, 'r') as f:
-                logs = f.readlines()
-                if max_lines:
-                    logs = logs[-max_lines:]
-                all_logs.extend(logs)
-        
-        # If max_lines specified, only return the last max_lines
-        if max_lines:
-            all_logs = all_logs[-max_lines:]
-            
-        return "".join(all_logs)
+        # Only the requested tail of each file is read from disk
+        return "".join(read_last_lines(log_files, max_lines))
         
     except Exception as e:
         logging.error(f"Failed to read logs: {e}")
@@ -0,0 +1,67 @@
+"""Fakes shared by the tests that drive a ``MediaDownloader``."""
+import os
+
+from src.core.downloader import MediaDownloader
+from src.core.ydl_pool import YoutubeDLPool
+from src.utils.archive import DownloadArchive
+from src.utils.info_cache import InfoCache
+from src.utils.journal import JobJournal
+
+class FakeYoutubeDL:
+    """Stands in for ``yt_dlp.YoutubeDL``.
+
+    ``download`` passes the URL to ``on_download(ydl, url)`` and returns its
+    result (0 for None); ``extract_info`` returns ``info``.
+    """
+
+    def __init__(self, options, on_download=None, info=None):
+        self.params = dict(options)
+        self.on_download = on_download
+        self.info = info
+
+    def extract_info(self, url, download=True):
+        return self.info if self.info is not None else {'id': url.rsplit('=', 1)[-1]}
+
+    def sanitize_info(self, info):
+        return info
+
+    def download(self, urls):
+        if self.on_download is None:
+            return 0
+        return self.on_download(self, urls[0]) or 0
+
+    def report_progress(self, d):
+        for hook in self.params['progress_hooks']:
+            hook(d)
+
+    def report_postprocessor(self, d):
+        for hook in self.params['postprocessor_hooks']:
+            hook(d)
+
+    def close(self):
+        pass
+
+def fake_factory(on_download=None, info=None, instances=None):
+    """YoutubeDLPool factory of ``FakeYoutubeDL``; new ones are appended to ``instances``."""
+    def factory(options):
+        ydl = FakeYoutubeDL(options, on_download, info)
+        if instances is not None:
+            instances.append(ydl)
+        return ydl
+    return factory
+
+def make_downloader(temp_dir, factory=None, **kwargs) -> MediaDownloader:
+    """A downloader that journals to ``temp_dir`` and keeps its cache and archive in memory.
+
+    yt-dlp instances come from ``factory`` (``fake_factory()`` by default);
+    ``kwargs`` go to ``MediaDownloader`` and override the defaults above.
+    """
+    if 'info_cache' not in kwargs:
+        kwargs['info_cache'] = InfoCache(db_path=None)
+    if 'journal' not in kwargs:
+        kwargs['journal'] = JobJournal(os.path.join(temp_dir, "journal.jsonl"))
+    if 'archive' not in kwargs:
+        kwargs['archive'] = DownloadArchive(":memory:")
+    if 'ydl_pool' not in kwargs:
+        kwargs['ydl_pool'] = YoutubeDLPool(factory=factory or fake_factory())
+    return MediaDownloader(resume=False, **kwargs)
@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from src.core.downloader import DownloadOptions
+from src.utils.archive import DownloadArchive, find_media, main, parse_video_id
+from tests.helpers import fake_factory, make_downloader
+
+class TestDownloadArchive(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.archive = DownloadArchive(os.path.join(self.temp_dir, "archive.sqlite3"))
+
+    def tearDown(self):
+        self.archive.close()
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, name, data=b"media"):
+        path = os.path.join(self.temp_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_parse_video_id(self):
+        self.assertEqual(parse_video_id("Mr. Title [dQw4w9WgXcQ].mp4"), "dQw4w9WgXcQ")
+        self.assertIsNone(parse_video_id("Title.mp4"))
+
+    def test_add_and_lookup(self):
+        path = self.write("Video [abcdefghijk].mp4")
+        self.archive.add("abcdefghijk", "MP4", "720p", path)
+
+        entry = self.archive.lookup("abcdefghijk", "mp4", "720p")
+        self.assertEqual(entry['path'], path)
+        self.assertEqual(entry['size'], 5)
+        self.assertEqual(len(entry['checksum']), 64)
+        self.assertIsNone(self.archive.lookup("abcdefghijk", "mp4", "1080p"))
+        self.assertIsNone(self.archive.lookup("abcdefghijk", "mp3", "720p"))
+
+    def test_stale_entries_are_dropped(self):
+        path = self.write("Video [abcdefghijk].mp4")
+        self.archive.add("abcdefghijk", "mp4", "720p", path)
+        os.remove(path)
+
+        self.assertIsNone(self.archive.lookup("abcdefghijk", "mp4", "720p"))
+        self.assertEqual(self.archive.count(), 0)
+
+    def test_rebuild(self):
+        self.write("a/One [aaaaaaaaaaa].mp4")
+        self.write("a/b/Two [bbbbbbbbbbb].mp3")
+        self.write("a/Three [ccccccccccc].mp4.part")
+        self.write("a/Untagged.mp4")
+
+        self.assertEqual(self.archive.rebuild([self.temp_dir]), 2)
+        # Rebuilt entries match any quality of their format
+        self.assertIsNotNone(self.archive.lookup("aaaaaaaaaaa", "mp4", "1080p"))
+        self.assertIsNotNone(self.archive.lookup("bbbbbbbbbbb", "mp3", "320kbps"))
+        self.assertIsNone(self.archive.lookup("ccccccccccc", "mp4"))
+        self.assertEqual(find_media(os.path.join(self.temp_dir, "a"), "aaaaaaaaaaa"),
+                         os.path.join(self.temp_dir, "a", "One [aaaaaaaaaaa].mp4"))
+
+    def test_rebuild_command(self):
+        self.write("One [aaaaaaaaaaa].webm")
+        db = os.path.join(self.temp_dir, "cli.sqlite3")
+        self.assertEqual(main(["--db", db, "rebuild", self.temp_dir]), 0)
+        archive = DownloadArchive(db)
+        self.assertEqual(archive.count(), 1)
+        archive.close()
+
+class TestDownloaderSkipsArchived(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.instances = []
+        self.archive = DownloadArchive(":memory:", checksums=False)
+        self.downloader = make_downloader(self.temp_dir, fake_factory(instances=self.instances),
+                                          archive=self.archive)
+
+    def tearDown(self):
+        self.downloader.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_batch_rerun_skips_without_network(self):
+        options = DownloadOptions(format="mp4", quality="720p", output_dir=self.temp_dir)
+        ids = [f"{i:011d}" for i in range(5000)]
+        for video_id in ids:
+            path = os.path.join(self.temp_dir, f"Video [{video_id}].mp4")
+            open(path, 'w').close()
+            self.archive.add(video_id, "mp4", "720p", path)
+
+        start = time.monotonic()
+        results = [
+            self.downloader.download(f"https://www.youtube.com/watch?v={video_id}", options)
+            for video_id in ids
+        ]
+        self.assertLess(time.monotonic() - start, 10)
+
+        # No yt-dlp instance was ever needed
+        self.assertEqual(self.instances, [])
+        self.assertTrue(all(
+            self.downloader.get_download_status(download_id)['status'] == 'completed'
+            for download_id in results
+        ))
+
+if __name__ == '__main__':
+    unittest.main()
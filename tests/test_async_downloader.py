@@ -0,0 +1,208 @@
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from src.core.async_downloader import AsyncMediaDownloader
+from src.core.downloader import DownloadCancelled, DownloadError, DownloadOptions
+from src.utils.archive import DownloadArchive
+from src.utils.info_cache import InfoCache
+from src.utils.journal import JobJournal
+from src.utils.rate_control import AdaptiveRateController
+from src.utils.rate_limiter import HostRateLimiter
+from src.utils.retry import RetryPolicy
+
+# Stand-ins for yt-dlp: they ignore the arguments appended by the engine
+PROGRESS_SCRIPT = (
+    "print('[download] Destination: video.mp4')\n"
+    "print('[download]  50.0% of 10.00MiB at 1.00MiB/s ETA 00:05', flush=True)\n"
+    "print('[download] 100% of 10.00MiB in 00:00:10 at 1.00MiB/s')\n"
+)
+SLEEP_SCRIPT = "import time; time.sleep(60)"
+FAIL_SCRIPT = "import sys; sys.stderr.write('ERROR: unavailable'); sys.exit(1)"
+GONE_SCRIPT = "import sys; sys.stderr.write('ERROR: Video unavailable'); sys.exit(1)"
+
+class TestAsyncMediaDownloader(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.info_cache = InfoCache(db_path=os.path.join(self.tmpdir.name, "info.db"))
+        self.journal = JobJournal(os.path.join(self.tmpdir.name, "journal.jsonl"))
+        self.limiter = HostRateLimiter(rate=1000, period=1, burst=1000)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def make_downloader(self, script=None, **kwargs):
+        if script is not None:
+            kwargs.update(engine="subprocess", command=[sys.executable, "-c", script])
+        kwargs.setdefault('retry_policy', RetryPolicy(max_retries=2, base_delay=0))
+        return AsyncMediaDownloader(info_cache=self.info_cache, journal=self.journal,
+                                    archive=DownloadArchive(":memory:"),
+                                    rate_control=AdaptiveRateController(self.limiter), **kwargs)
+
+    async def test_subprocess_download_reports_progress(self):
+        downloader = self.make_downloader(PROGRESS_SCRIPT)
+        received = []
+
+        async def consume():
+            async for event in downloader.events():
+                received.append(event)
+                if event.status == 'completed':
+                    return
+
+        consumer = asyncio.create_task(consume())
+        await asyncio.sleep(0)
+        download_id = await downloader.download("https://youtu.be/a", {'format': 'best'})
+        await asyncio.wait_for(consumer, 5)
+        await downloader.close()
+
+        self.assertEqual(downloader.get_download_status(download_id)['status'], 'completed')
+        self.assertTrue(all(event.task_id == download_id for event in received))
+        self.assertEqual(received[-1].status, 'completed')
+
+    async def test_subprocess_failure(self):
+        downloader = self.make_downloader(FAIL_SCRIPT)
+        with self.assertRaises(DownloadError) as ctx:
+            await downloader.download("https://youtu.be/a", {}, download_id="job")
+        await downloader.close()
+        self.assertIn("unavailable", str(ctx.exception))
+        status = downloader.get_download_status("job")
+        self.assertEqual((status['status'], status['retries']), ('failed', 2))
+        self.assertEqual(self.journal.get("job")['event'], 'failed')
+
+    async def test_permanent_failure_is_not_retried(self):
+        downloader = self.make_downloader(GONE_SCRIPT)
+        with self.assertRaises(DownloadError):
+            await downloader.download("https://youtu.be/a", {}, download_id="job")
+        await downloader.close()
+        self.assertEqual(downloader.get_download_status("job")['retries'], 0)
+        self.assertEqual(self.journal.get("job")['category'], 'permanent')
+
+    async def test_downloads_wait_for_the_rate_limit(self):
+        waits = []
+        acquire = self.limiter.acquire_async
+
+        async def acquire_async(url, cost=1.0, timeout=None):
+            waits.append((url, cost))
+            return await acquire(url, cost, timeout)
+
+        self.limiter.acquire_async = acquire_async
+        ydl = MagicMock()
+        ydl.extract_info.return_value = {'id': 'dQw4w9WgXcQ'}
+        ydl.sanitize_info.side_effect = lambda info: info
+        ydl.download.return_value = 0
+        downloader = self.make_downloader(factory=lambda options: ydl)
+        url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+        await downloader.get_media_info(url)
+        await downloader.download(url, {'format': 'best'})
+        await downloader.close()
+        self.assertEqual(waits, [(url, 0.5), (url, 1)])
+
+    async def test_archived_media_is_not_downloaded_again(self):
+        def factory(options):
+            def download(urls):
+                open(os.path.join(self.tmpdir.name, "Video [dQw4w9WgXcQ].mp4"), 'wb').close()
+                return 0
+            ydl = MagicMock()
+            ydl.download.side_effect = download
+            return ydl
+
+        downloader = self.make_downloader(factory=factory)
+        options = DownloadOptions(format="MP4", quality="720p", output_dir=self.tmpdir.name)
+        url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+        first = await downloader.download(url, options)
+        second = await downloader.download(url, options)
+        await downloader.close()
+
+        path = os.path.join(self.tmpdir.name, "Video [dQw4w9WgXcQ].mp4")
+        self.assertEqual(downloader.get_download_status(first)['path'], path)
+        self.assertEqual(downloader.get_download_status(second)['path'], path)
+        self.assertEqual(self.journal.get(first)['event'], 'completed')
+        self.assertIsNone(self.journal.get(second))
+
+    async def test_cancel_kills_subprocess(self):
+        downloader = self.make_downloader(SLEEP_SCRIPT)
+        job = asyncio.create_task(downloader.download("https://youtu.be/a", {}, download_id="job"))
+        await asyncio.sleep(0.3)
+
+        start = time.monotonic()
+        self.assertTrue(downloader.cancel("job"))
+        with self.assertRaises(DownloadCancelled):
+            await job
+        await downloader.close()
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(downloader.get_download_status("job")['status'], 'cancelled')
+        self.assertEqual(self.journal.get("job")['event'], 'cancelled')
+
+    async def test_close_interrupts_running_jobs(self):
+        downloader = self.make_downloader(SLEEP_SCRIPT)
+        options = DownloadOptions(format="MP4", quality="720p", output_dir=self.tmpdir.name)
+        job = asyncio.create_task(downloader.download("https://youtu.be/a", options, download_id="job"))
+        await asyncio.sleep(0.3)
+        await downloader.close()
+        with self.assertRaises(DownloadCancelled):
+            await job
+        self.assertEqual([j['job_id'] for j in self.journal.incomplete()], ["job"])
+        self.assertEqual(self.journal.get("job")['event'], 'interrupted')
+
+        resumed = self.make_downloader(PROGRESS_SCRIPT)
+        self.assertEqual(await resumed.resume_incomplete_jobs(), ["job"])
+        await resumed.close()
+        self.assertEqual(resumed.get_download_status("job")['status'], 'completed')
+        self.assertEqual(self.journal.incomplete(), [])
+
+    async def test_queued_jobs_do_not_use_threads(self):
+        running = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def factory(options):
+            def download(urls):
+                nonlocal running, peak
+                with lock:
+                    running += 1
+                    peak = max(peak, running)
+                time.sleep(0.01)
+                with lock:
+                    running -= 1
+                return 0
+            ydl = MagicMock()
+            ydl.download.side_effect = download
+            return ydl
+
+        downloader = self.make_downloader(factory=factory, max_concurrent=4, keep_finished=100)
+        threads_before = threading.active_count()
+        jobs = [downloader.download(f"https://youtu.be/{i}", {'format': 'best'}) for i in range(200)]
+        results = await asyncio.gather(*jobs)
+        threads_after = threading.active_count()
+        await downloader.close()
+
+        self.assertEqual(len(set(results)), 200)
+        self.assertLessEqual(peak, 4)
+        # Only the last keep_finished jobs are still reported
+        self.assertEqual(len(downloader._jobs), 100)
+        self.assertEqual(downloader.get_download_status(results[0]), {'status': 'not_found'})
+        self.assertEqual(downloader.get_download_status(results[-1])['status'], 'completed')
+        # Executor threads only: max_concurrent plus two spare threads
+        self.assertLessEqual(threads_after - threads_before, 6)
+
+    async def test_get_media_info_uses_cache(self):
+        ydl = MagicMock()
+        ydl.extract_info.return_value = {'id': 'dQw4w9WgXcQ', 'title': 'Video'}
+        ydl.sanitize_info.side_effect = lambda info: info
+        downloader = self.make_downloader(factory=lambda options: ydl)
+
+        url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+        first = await downloader.get_media_info(url)
+        second = await downloader.get_media_info(url)
+        await downloader.close()
+
+        self.assertEqual(first, second)
+        self.assertEqual(ydl.extract_info.call_count, 1)
+
+if __name__ == '__main__':
+    unittest.main()
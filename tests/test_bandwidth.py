@@ -0,0 +1,154 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.core.downloader import DownloadError, DownloadOptions
+from src.core.engines import InProcessEngine, SubprocessEngine
+from src.core.ydl_pool import pool_key
+from src.utils.bandwidth import BandwidthAllocator
+from src.utils.info_cache import InfoCache
+from tests.helpers import FakeYoutubeDL, make_downloader
+
+class TestBandwidthAllocator(unittest.TestCase):
+    def test_max_min_fair_shares(self):
+        allocator = BandwidthAllocator(100)
+        allocator.register("a", cap=10)
+        allocator.register("b")
+        allocator.register("c", cap=80)
+        self.assertEqual(allocator.shares(), {"a": 10, "b": 45, "c": 45})
+
+    def test_rebalances_running_jobs(self):
+        allocator = BandwidthAllocator(100)
+        first = allocator.register("a")
+        seen = []
+        first.subscribe(seen.append)
+        self.assertEqual(first.rate, 100)
+
+        with allocator.register("b") as second:
+            self.assertEqual(second.rate, 50)
+        allocator.set_total_rate(None)
+        self.assertEqual(seen, [50, 100, None])
+
+    def test_unlimited_budget_keeps_caps(self):
+        allocator = BandwidthAllocator()
+        self.assertEqual(allocator.register("a", cap=300).rate, 300)
+        self.assertIsNone(allocator.register("b").rate)
+
+class TestRateLimitOptions(unittest.TestCase):
+    def test_ratelimit_does_not_split_pool(self):
+        self.assertEqual(pool_key({'format': 'best', 'ratelimit': 1000}), pool_key({'format': 'best'}))
+
+    def test_subprocess_arguments(self):
+        cmd = SubprocessEngine("yt-dlp").build_command(
+            "https://youtu.be/a", {'ratelimit': 50000.0, 'max_filesize': 1024}
+        )
+        self.assertEqual(cmd[-5:], ["--limit-rate", "50000", "--max-filesize", "1024", "https://youtu.be/a"])
+
+class VideoHandler(BaseHTTPRequestHandler):
+    BODY = b"\x00" * 300 * 1024
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(len(self.BODY)))
+        self.end_headers()
+        if self.command == 'GET':
+            self.wfile.write(self.BODY)
+
+    do_HEAD = do_GET
+
+    def log_message(self, *args):
+        pass
+
+class TestInProcessThrottling(unittest.TestCase):
+    def test_share_limits_real_download(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), VideoHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        temp_dir = tempfile.mkdtemp()
+        engine = InProcessEngine()
+        try:
+            with BandwidthAllocator(200 * 1024).register("job") as share:
+                start = time.monotonic()
+                engine.download(f"http://127.0.0.1:{server.server_port}/video.mp4",
+                                {'outtmpl': os.path.join(temp_dir, '%(id)s.%(ext)s')},
+                                bandwidth=share)
+                elapsed = time.monotonic() - start
+            # 300 KiB at 200 KiB/s
+            self.assertGreater(elapsed, 1.2)
+        finally:
+            engine.close()
+            server.shutdown()
+            server.server_close()
+            shutil.rmtree(temp_dir)
+
+class BlockingYoutubeDL(FakeYoutubeDL):
+    """Downloads block until released."""
+
+    def __init__(self, options):
+        super().__init__(options)
+        self.release = threading.Event()
+        self.running = threading.Event()
+
+    def download(self, urls):
+        self.running.set()
+        self.release.wait(5)
+        return 0
+
+class TestDownloaderBandwidth(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.instances = []
+
+        def factory(options):
+            ydl = BlockingYoutubeDL(options)
+            self.instances.append(ydl)
+            return ydl
+
+        self.info_cache = InfoCache(db_path=None)
+        self.downloader = make_downloader(self.temp_dir, factory, info_cache=self.info_cache)
+        self.downloader.bandwidth.set_total_rate(1000)
+
+    def tearDown(self):
+        for ydl in self.instances:
+            ydl.release.set()
+        self.downloader.close()
+        shutil.rmtree(self.temp_dir)
+
+    def start(self, url, **kwargs):
+        options = DownloadOptions(format="MP4", quality="720p", output_dir=self.temp_dir, **kwargs)
+        count = len(self.instances)
+        self.downloader.download(url, options)
+        deadline = time.monotonic() + 5
+        while len(self.instances) == count or not self.instances[-1].running.is_set():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        return self.instances[-1]
+
+    def test_running_downloads_are_rebalanced(self):
+        first = self.start("https://www.youtube.com/watch?v=aaaaaaaaaaa")
+        self.assertEqual(first.params['ratelimit'], 1000)
+
+        second = self.start("https://www.youtube.com/watch?v=bbbbbbbbbbb", rate_limit=200)
+        self.assertEqual(second.params['ratelimit'], 200)
+        self.assertEqual(first.params['ratelimit'], 800)
+
+        second.release.set()
+        deadline = time.monotonic() + 5
+        while first.params['ratelimit'] != 1000:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def test_oversized_download_refused_up_front(self):
+        url = "https://www.youtube.com/watch?v=ccccccccccc"
+        self.info_cache.set(url, {'id': 'ccccccccccc', 'filesize_approx': 10 * 1024 ** 4})
+        options = DownloadOptions(format="MP4", quality="720p", output_dir=self.temp_dir)
+        with self.assertRaises(DownloadError):
+            self.downloader.download(url, options)
+        self.assertEqual(self.instances, [])
+
+if __name__ == '__main__':
+    unittest.main()
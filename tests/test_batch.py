@@ -0,0 +1,161 @@
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.core.batch import BatchRunner, job_options, main, parse_jobs
+from src.core.downloader import DownloadOptions
+from tests.helpers import fake_factory, make_downloader
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULTS = DownloadOptions(format="MP4", quality="720p", output_dir="/tmp/out")
+
+class TestParseJobs(unittest.TestCase):
+    def test_urls_and_json_items(self):
+        lines = [
+            "https://www.youtube.com/watch?v=aaaaaaaaaaa\n",
+            "\n",
+            "# comment\n",
+            '{"url": "https://www.youtube.com/watch?v=bbbbbbbbbbb", "format": "MP3", "quality": "192kbps"}\n',
+            '{"url": "https://youtu.be/ccccccccccc", "format": "aac"}\n'
+        ]
+        jobs = list(parse_jobs(lines, DEFAULTS))
+        self.assertEqual([(number, error) for number, _, _, error in jobs], [(1, None), (4, None), (5, None)])
+        self.assertEqual(jobs[0][2], DEFAULTS)
+        self.assertEqual((jobs[1][2].format, jobs[1][2].quality, jobs[1][2].convert_audio), ("mp3", "192kbps", True))
+        # A video quality is not carried over to an audio item
+        self.assertEqual(jobs[2][2].quality, "Best")
+
+    def test_invalid_lines_are_reported(self):
+        lines = ['{"url": 1}', '{"url": "https://youtu.be/a", "color": "red"}', '{broken', 'youtube']
+        errors = [error for _, _, _, error in parse_jobs(lines, DEFAULTS)]
+        self.assertEqual(len(errors), 4)
+        self.assertTrue(all(errors))
+        self.assertIn("color", errors[1])
+
+    def test_video_item_under_audio_defaults(self):
+        audio = job_options(DEFAULTS, format="mp3")
+        options = job_options(audio, format="MP4")
+        self.assertEqual((options.quality, options.convert_audio), ("720p", False))
+
+class TestBatchRunner(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+
+        def download(ydl, url):
+            with self.lock:
+                self.running += 1
+                self.peak = max(self.peak, self.running)
+            try:
+                if url.endswith("missing1234"):
+                    raise RuntimeError("ERROR: [youtube] missing1234: Video unavailable")
+                for done in (512, 1024):
+                    ydl.report_progress({'status': 'downloading', 'downloaded_bytes': done, 'total_bytes': 1024})
+                    time.sleep(0.05)
+            finally:
+                with self.lock:
+                    self.running -= 1
+
+        self.downloader = make_downloader(self.temp_dir, fake_factory(download), max_concurrent=4)
+
+    def tearDown(self):
+        self.downloader.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_results_and_summary(self):
+        lines = [f"https://www.youtube.com/watch?v=video{i:06d}" for i in range(8)]
+        lines += ["https://www.youtube.com/watch?v=missing1234", "not a url"]
+        out = io.StringIO()
+        summary = BatchRunner(self.downloader, out=out).run(lines, DownloadOptions(
+            format="MP4", quality="720p", output_dir=self.temp_dir
+        ))
+
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        results = [r for r in records if r['event'] == 'result']
+        self.assertEqual(len(results), 9)
+        self.assertEqual(sorted(r['status'] for r in results), ['completed'] * 8 + ['failed'])
+        failed = next(r for r in results if r['status'] == 'failed')
+        self.assertEqual((failed['line'], failed['retries']), (9, 0))
+        self.assertEqual([r['line'] for r in records if r['event'] == 'rejected'], [10])
+        self.assertTrue(any(r['event'] == 'progress' for r in records))
+        self.assertEqual(records[-1]['event'], 'summary')
+        self.assertEqual((summary['jobs'], summary['completed'], summary['failed'], summary['rejected']),
+                         (10, 8, 1, 1))
+        self.assertEqual(summary['bytes'], 8 * 1024)
+        self.assertGreater(self.peak, 1)
+        self.assertLessEqual(self.peak, 4)
+
+    def test_close_cancels_pending_jobs(self):
+        options = DownloadOptions(format="MP4", quality="720p", output_dir=self.temp_dir)
+        ids = [self.downloader.download(f"https://www.youtube.com/watch?v=video{i:06d}", options)
+               for i in range(12)]
+        self.downloader.close(cancel_pending=True)
+        statuses = [self.downloader.get_download_status(i)['status'] for i in ids]
+        self.assertIn('cancelled', statuses)
+        self.assertLessEqual(statuses.count('completed'), 4)
+        self.assertEqual(set(statuses) - {'cancelled', 'completed'}, set())
+        # Stopped by the shutdown, not by the user: the next run resumes them
+        incomplete = {job['job_id']: job['event'] for job in self.downloader._journal.incomplete()}
+        self.assertEqual(incomplete, {i: 'interrupted' for i, s in zip(ids, statuses) if s == 'cancelled'})
+
+    def test_main_exit_code(self):
+        path = os.path.join(self.temp_dir, "urls.txt")
+        with open(path, 'w') as f:
+            f.write("https://www.youtube.com/watch?v=video000001\n")
+        self.assertEqual(main([path, "--no-progress", "-o", self.temp_dir], downloader=self.downloader), 0)
+
+class NotFoundHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(404)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+class TestCommandLine(unittest.TestCase):
+    def test_headless_run_writes_only_jsonl(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), NotFoundHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        home = tempfile.mkdtemp()
+        try:
+            items = f'http://127.0.0.1:{server.server_port}/gone.mp4\n{{"url": "x", "size": 1}}\n'
+            result = subprocess.run(
+                [sys.executable, os.path.join(ROOT_DIR, "cli.py"), "-o", home],
+                input=items, capture_output=True, text=True, timeout=120,
+                env=dict(os.environ, HOME=home)
+            )
+            records = [json.loads(line) for line in result.stdout.splitlines()]
+            self.assertEqual(result.returncode, 1, result.stderr)
+            self.assertEqual(sorted(r['event'] for r in records[:-1] if r['event'] != 'progress'),
+                             ['queued', 'rejected', 'result'])
+            self.assertEqual(records[-1]['event'], 'summary')
+            self.assertEqual((records[-1]['failed'], records[-1]['rejected']), (1, 1))
+            # The GUI resumes what is in its journal, so batches keep their own
+            state_dir = os.path.join(home, ".my-yt-down")
+            self.assertTrue(os.path.exists(os.path.join(state_dir, "batch-journal.jsonl")))
+            self.assertFalse(os.path.exists(os.path.join(state_dir, "journal.jsonl")))
+
+            check = subprocess.run(
+                [sys.executable, "-c", "import sys; sys.argv = ['cli']; import cli; "
+                                       "print(any('tkinter' in m for m in sys.modules))"],
+                cwd=ROOT_DIR, capture_output=True, text=True, timeout=60
+            )
+            self.assertEqual(check.stdout.strip(), "False", check.stderr)
+        finally:
+            server.shutdown()
+            server.server_close()
+            shutil.rmtree(home)
+
+if __name__ == '__main__':
+    unittest.main()
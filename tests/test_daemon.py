@@ -0,0 +1,192 @@
+import http.client
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from dataclasses import asdict
+
+from src.core.daemon import DownloadDaemon
+from src.core.downloader import DownloadOptions
+from tests.helpers import fake_factory, make_downloader
+
+class TestDownloadDaemon(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+        def download(ydl, url):
+            if 'slow' in url:
+                # Runs until cancelled, which makes a hook raise
+                deadline = time.monotonic() + 10
+                while time.monotonic() < deadline:
+                    ydl.report_progress({'status': 'downloading', 'downloaded_bytes': 1, 'total_bytes': 1024})
+                    time.sleep(0.02)
+                return
+            for done in (512, 1024):
+                ydl.report_progress({'status': 'downloading', 'downloaded_bytes': done, 'total_bytes': 1024})
+                time.sleep(0.05)
+
+        self.instances = []
+        self.downloader = make_downloader(self.temp_dir, fake_factory(download, instances=self.instances))
+        defaults = DownloadOptions(format="MP4", quality="720p", output_dir=self.temp_dir)
+        self.daemon = DownloadDaemon(self.downloader, defaults, host="127.0.0.1", port=0).start()
+        self.host, self.port = self.daemon.address
+
+    def tearDown(self):
+        self.daemon.shutdown()
+        self.downloader.close()
+        shutil.rmtree(self.temp_dir)
+
+    def request(self, method, path, body=None, headers=None):
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=10)
+        try:
+            data = json.dumps(body) if isinstance(body, dict) else body
+            if headers is None:
+                headers = {"Content-Type": "application/json"} if body is not None else {}
+            connection.request(method, path, body=data, headers=headers)
+            response = connection.getresponse()
+            return response.status, json.loads(response.read())
+        finally:
+            connection.close()
+
+    def wait_for(self, job_id, status):
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            job = self.request("GET", f"/jobs/{job_id}")[1]
+            if job['status'] == status:
+                return job
+            time.sleep(0.02)
+        self.fail(f"{job_id} never reached {status}: {job}")
+
+    def test_submit_status_and_list(self):
+        status, job = self.request("POST", "/jobs", {"url": "https://www.youtube.com/watch?v=video000001",
+                                                     "format": "MP4"})
+        self.assertEqual(status, 202)
+        self.assertEqual(job['status'], 'downloading')
+        self.wait_for(job['id'], 'completed')
+
+        _, slow = self.request("POST", "/jobs", {"url": "https://www.youtube.com/watch?v=slow0000001"})
+        _, listing = self.request("GET", "/jobs")
+        self.assertEqual([j['url'][-11:] for j in listing['jobs']], ["video000001", "slow0000001"])
+        _, completed = self.request("GET", "/jobs?status=completed")
+        self.assertEqual([j['id'] for j in completed['jobs']], [job['id']])
+        self.request("DELETE", f"/jobs/{slow['id']}")
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.request("POST", "/jobs", {"url": "ftp://example.com/a"})[0], 400)
+        self.assertEqual(self.request("POST", "/jobs", {"url": "https://youtu.be/a", "color": 1})[0], 400)
+        self.assertEqual(self.request("POST", "/jobs", {"url": "https://youtu.be/a", "playlist": "yes"})[0], 400)
+        self.assertEqual(self.request("POST", "/jobs", "{broken")[0], 400)
+        self.assertEqual(self.request("POST", "/jobs", "x" * (64 * 1024 + 1))[0], 413)
+        self.assertEqual(self.request("GET", "/jobs/unknown")[0], 404)
+        self.assertEqual(self.request("DELETE", "/jobs/unknown")[0], 404)
+        self.assertEqual(self.request("GET", "/nothing")[0], 404)
+        self.assertEqual(self.request("DELETE", "/jobs")[0], 405)
+
+    def test_foreign_requests(self):
+        job = {"url": "https://www.youtube.com/watch?v=video000001"}
+        self.assertEqual(self.request("POST", "/jobs", job, {"Content-Type": "text/plain"})[0], 415)
+        self.assertEqual(self.request("POST", "/jobs", job, {})[0], 415)
+        self.assertEqual(self.request("POST", "/jobs", job, {"Content-Type": "application/json",
+                                                             "Origin": "http://example.com"})[0], 403)
+        self.assertEqual(self.request("GET", "/jobs", headers={"Origin": "null"})[0], 403)
+        self.assertEqual(self.request("GET", "/jobs", headers={"Host": f"example.com:{self.port}"})[0], 403)
+        self.assertEqual(self.request("GET", "/jobs", headers={"Host": f"localhost:{self.port}"})[0], 200)
+        self.assertEqual(self.request("GET", "/jobs")[1], {'jobs': []})
+
+    def test_output_dir_stays_in_the_default_directory(self):
+        for output_dir in ("../outside", "/etc", "sub/../../outside"):
+            status, error = self.request("POST", "/jobs", {"url": "https://www.youtube.com/watch?v=video000001",
+                                                           "output_dir": output_dir})
+            self.assertEqual(status, 400, output_dir)
+            self.assertIn("outside", error['error'])
+        _, job = self.request("POST", "/jobs", {"url": "https://www.youtube.com/watch?v=video000001",
+                                                "output_dir": "sub"})
+        self.wait_for(job['id'], 'completed')
+        outtmpl = json.dumps([ydl.params.get('outtmpl') for ydl in self.instances])
+        self.assertIn(os.path.join(os.path.realpath(self.temp_dir), "sub"), outtmpl)
+
+    def test_finished_jobs_are_forgotten(self):
+        daemon = DownloadDaemon(self.downloader, self.daemon.defaults, host="127.0.0.1", port=0, max_finished=2)
+        try:
+            ids = []
+            for i in range(4):
+                ids.append(daemon.submit({"url": f"https://www.youtube.com/watch?v=video00000{i}"})['id'])
+                deadline = time.monotonic() + 5
+                while daemon.job(ids[-1])['status'] != 'completed' and time.monotonic() < deadline:
+                    time.sleep(0.02)
+            # The worker of the last job may still be returning
+            deadline = time.monotonic() + 5
+            while len(daemon.jobs()) > 3 and time.monotonic() < deadline:
+                daemon._evict_finished()
+                time.sleep(0.02)
+            self.assertEqual([job['id'] for job in daemon.jobs()], ids[1:])
+            with self.assertRaises(KeyError):
+                self.downloader.get_download_status(ids[0])
+            self.assertNotIn(ids[0], self.downloader._scheduler._tasks)
+        finally:
+            daemon.shutdown()
+
+    def test_cancel(self):
+        _, job = self.request("POST", "/jobs", {"url": "https://www.youtube.com/watch?v=slow0000001"})
+        status, _ = self.request("DELETE", f"/jobs/{job['id']}?keep_partial=1")
+        self.assertEqual(status, 202)
+        self.wait_for(job['id'], 'cancelled')
+
+    def test_resumed_jobs_are_listed(self):
+        options = DownloadOptions(format="MP4", quality="720p", output_dir=self.temp_dir)
+        self.downloader._journal.record("interrupted", 'submitted', options=asdict(options),
+                                        url="https://www.youtube.com/watch?v=slow0000001")
+        self.assertEqual(self.daemon.resume(), ["interrupted"])
+        _, listing = self.request("GET", "/jobs")
+        self.assertEqual([(j['id'], j['url'][-11:]) for j in listing['jobs']], [("interrupted", "slow0000001")])
+        self.assertEqual(self.request("DELETE", "/jobs/interrupted")[0], 202)
+        self.wait_for("interrupted", 'cancelled')
+
+    def test_event_stream(self):
+        _, earlier = self.request("POST", "/jobs", {"url": "https://www.youtube.com/watch?v=slow0000001"})
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=10)
+        connection.request("GET", "/events")
+        response = connection.getresponse()
+        self.assertEqual(response.getheader("Content-Type"), "text/event-stream")
+
+        events = []
+
+        def read():
+            event = None
+            for line in response:
+                line = line.decode().rstrip("\n")
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: "):
+                    events.append((event, json.loads(line[len("data: "):])))
+
+        reader = threading.Thread(target=read, daemon=True)
+        reader.start()
+        _, job = self.request("POST", "/jobs", {"url": "https://www.youtube.com/watch?v=video000001"})
+        self.wait_for(job['id'], 'completed')
+        self.request("DELETE", f"/jobs/{earlier['id']}")
+        self.wait_for(earlier['id'], 'cancelled')
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and ('progress', 'cancelled') not in \
+                {(e, d.get('status')) for e, d in events if d['id'] == earlier['id']}:
+            time.sleep(0.02)
+
+        # Shutting down ends the stream
+        self.daemon.shutdown()
+        reader.join(5)
+        self.assertFalse(reader.is_alive())
+        connection.close()
+
+        self.assertEqual(events[0][0], 'status')
+        self.assertEqual(events[0][1]['id'], earlier['id'])
+        statuses = [d['status'] for e, d in events if e == 'progress' and d['id'] == job['id']]
+        self.assertIn('downloading', statuses)
+        self.assertEqual(statuses[-1], 'completed')
+        self.assertIn(('progress', 'cancelled'),
+                      [(e, d['status']) for e, d in events if d['id'] == earlier['id']])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,50 +1,108 @@
+import os
 import unittest
 import tempfile
 import shutil
+import threading
+import time
 from pathlib import Path
 from unittest.mock import patch, MagicMock
-from src.downloader import MediaDownloader, DownloadError, DownloadTask
+from src.core.engines import DownloadEngine, EngineCancelled
+from src.downloader import MediaDownloader, DownloadError
+from src.utils.archive import DownloadArchive
+from src.utils.info_cache import InfoCache
+from src.utils.journal import JobJournal
+from src.utils.progress import ProgressEvent
+
+PLAYLIST = {
+    '_type': 'playlist',
+    'id': 'PL1',
+    'entries': [{'_type': 'url', 'ie_key': 'Youtube', 'id': f'video00000{i}', 'url': f'video00000{i}'}
+                for i in range(1, 4)]
+}
+
+class FakeEngine(DownloadEngine):
+    """Writes the file yt-dlp would write; with ``block`` it waits for a cancel."""
+
+    name = "fake"
+
+    def __init__(self, info=None, block=False):
+        self.info = info or PLAYLIST
+        self.block = block
+        self.calls = []
+        self.running = threading.Event()
+
+    def extract_info(self, url, flat=False):
+        return self.info
+
+    def download(self, url, options, progress_callback=None, cancel_event=None, bandwidth=None):
+        self.calls.append((url, options))
+        self.running.set()
+        if self.block:
+            cancel_event.wait(5)
+            raise EngineCancelled(f"Download cancelled: {url}")
+        video_id = url.rsplit('=', 1)[-1]
+        path = options['outtmpl'].replace('%(title)s', 'Video').replace('%(id)s', video_id) \
+            .replace('%(ext)s', options.get('merge_output_format', 'webm'))
+        if progress_callback:
+            for percent in (50.0, 100.0):
+                progress_callback(ProgressEvent("", "downloading", percent=percent, filename=path))
+        with open(path, 'wb') as f:
+            f.write(b"media")
 
 class TestMediaDownloader(unittest.TestCase):
     def setUp(self):
         self.temp_dir = tempfile.mkdtemp()
-        self.downloader = MediaDownloader()
+        self.engine = FakeEngine()
+        self.downloader = self.make_downloader(self.engine)
 
     def tearDown(self):
-        shutil.rmtree(self.temp_dir)
         self.downloader.cleanup()
+        shutil.rmtree(self.temp_dir)
+
+    def make_downloader(self, engine):
+        # O downloader registra logs em LOG_DIR, dentro do código-fonte
+        with patch('src.downloader.LOG_DIR', self.temp_dir):
+            return MediaDownloader(
+                download_dir=self.temp_dir,
+                engine=engine,
+                info_cache=InfoCache(db_path=None),
+                journal=JobJournal(os.path.join(self.temp_dir, "journal.jsonl")),
+                archive=DownloadArchive(":memory:")
+            )
+
+    def wait_for(self, task_id, statuses):
+        deadline = time.monotonic() + 10
+        while self.downloader.get_task_status(task_id)['status'] not in statuses:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.02)
+        return self.downloader.get_task_status(task_id)
 
-    @patch('subprocess.run')
-    def test_get_media_info(self, mock_run):
+    def test_get_media_info(self):
         # Simula resposta do yt-dlp
-        mock_run.return_value.stdout = '{"title": "Test Video", "duration": 100}'
-        mock_run.return_value.returncode = 0
+        self.engine.info = {"title": "Test Video", "duration": 100}
 
-        info = self.downloader.get_media_info("https://www.youtube.com/watch?v=test")
+        info = self.downloader.get_media_info("https://www.youtube.com/watch?v=video000001")
         self.assertEqual(info["title"], "Test Video")
         self.assertEqual(info["duration"], 100)
 
-    @patch('subprocess.Popen')
-    def test_download_media(self, mock_popen):
-        # Simula processo de download
-        mock_process = MagicMock()
-        mock_process.poll.return_value = None
-        mock_process.returncode = 0
-        mock_popen.return_value = mock_process
-
+    def test_download_media(self):
         # Simula callback
         callback = MagicMock()
 
         # Tenta download
-        self.downloader.download_media(
-            "https://www.youtube.com/watch?v=test",
+        task_id = self.downloader.download_media(
+            "https://www.youtube.com/watch?v=video000001",
             Path(self.temp_dir),
-            {"format": "mp3", "quality": "320K"},
+            {"format_type": "video", "format_name": "mp4_high"},
             callback
         )
 
-        # Verifica se o download foi iniciado
-        self.assertTrue(mock_popen.called)
+        status = self.wait_for(task_id, ('completed', 'failed'))
+        self.assertEqual((status['status'], status['progress'], status['retries']), ('completed', 100.0, 0))
+        _, options = self.engine.calls[0]
+        self.assertEqual(options['merge_output_format'], 'mp4')
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir, "Video [video000001].mp4")))
+        self.assertIsNotNone(self.downloader.archive.lookup("video000001", "mp4", "high"))
 
     def test_invalid_url(self):
         with self.assertRaises(DownloadError):
@@ -53,43 +111,61 @@ class TestMediaDownloader(unittest.TestCase):
                 Path(self.temp_dir),
                 {"format": "mp3", "quality": "320K"}
             )
+        self.assertEqual(self.engine.calls, [])
+
+    def test_cancel_download(self):
+        # Simula um download que só termina quando é cancelado
+        engine = FakeEngine(block=True)
+        self.downloader.cleanup()
+        self.downloader = self.make_downloader(engine)
 
-    @patch('subprocess.Popen')
-    def test_cancel_download(self, mock_popen):
-        # Simula processo de download
-        mock_process = MagicMock()
-        mock_process.poll.return_value = None
-        mock_popen.return_value = mock_process
-
-        # Inicia download
-        task = DownloadTask(
-            url="https://www.youtube.com/watch?v=test",
-            output_path=Path(self.temp_dir) / "test.mp3",
-            format_info={"format": "mp3", "quality": "320K"}
+        task_id = self.downloader.download_media(
+            "https://www.youtube.com/watch?v=video000001",
+            Path(self.temp_dir),
+            {"format_type": "video", "format_name": "mp4_high"}
         )
-        
-        download_id = id(task)
-        self.downloader.download_queue.put(task)
-        
+        self.assertTrue(engine.running.wait(5))
+
         # Cancela download
-        self.downloader.cancel_download(download_id)
-        
-        # Verifica se o processo foi terminado
-        self.assertTrue(mock_process.terminate.called)
+        self.assertTrue(self.downloader.cancel_download(task_id))
+        self.assertEqual(self.wait_for(task_id, ('cancelled',))['status'], 'cancelled')
 
     def test_preview_media(self):
-        with patch('subprocess.Popen') as mock_popen:
-            mock_process = MagicMock()
-            mock_process.poll.return_value = 0
-            mock_popen.return_value = mock_process
+        preview_path = self.downloader.preview_media(
+            "https://www.youtube.com/watch?v=video000001",
+            {"format": "mp3", "quality": "320K"}
+        )
 
-            preview_path = self.downloader.preview_media(
-                "https://www.youtube.com/watch?v=test",
-                {"format": "mp3", "quality": "320K"}
-            )
+        self.assertEqual(len(self.engine.calls), 1)
+        self.assertTrue("preview" in str(preview_path))
+        _, options = self.engine.calls[0]
+        self.assertEqual(options['postprocessors'][0]['preferredquality'], "320K")
+
+    def test_refused_playlist_entry_does_not_stop_the_others(self):
+        # Cached metadata puts the second entry over MAX_DOWNLOAD_SIZE
+        self.downloader.info_cache.set("https://www.youtube.com/watch?v=video000002",
+                                       {'id': 'video000002', 'filesize': 100 * 1024 ** 3})
+        task_ids = self.downloader.download_playlist(
+            "https://www.youtube.com/playlist?list=PL1", Path(self.temp_dir),
+            {"format_type": "video", "format_name": "mp4_high"}
+        )
+        self.assertEqual(len(task_ids), 3)
+        statuses = [self.wait_for(task_id, ('completed', 'failed'))['status'] for task_id in task_ids]
+        self.assertEqual(statuses, ['completed', 'failed', 'completed'])
+        self.assertEqual(len(self.engine.calls), 2)
 
-            self.assertTrue(mock_popen.called)
-            self.assertTrue("preview" in str(preview_path))
+    def test_journaled_jobs_are_not_resumed_by_default(self):
+        journal = JobJournal(os.path.join(self.temp_dir, "shared.jsonl"))
+        journal.record("other", 'submitted', url="https://www.youtube.com/watch?v=video000001",
+                       output_path=self.temp_dir, format_info={"format_name": "mp4_high"})
+        with patch('src.downloader.LOG_DIR', self.temp_dir):
+            downloader = MediaDownloader(download_dir=self.temp_dir, engine=FakeEngine(),
+                                         info_cache=InfoCache(db_path=None), journal=journal,
+                                         archive=DownloadArchive(":memory:"))
+        try:
+            self.assertEqual(downloader.active_tasks, {})
+        finally:
+            downloader.cleanup()
 
 if __name__ == '__main__':
     unittest.main()
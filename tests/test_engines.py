@@ -0,0 +1,161 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+
+from src.core.downloader import DownloadOptions, build_ydl_options
+from src.core.engines import (
+    EngineCancelled, EngineError, InProcessEngine, SubprocessEngine, create_engine,
+    fragment_concurrency
+)
+
+class TestSubprocessEngine(unittest.TestCase):
+    def test_build_command(self):
+        engine = SubprocessEngine("yt-dlp")
+        cmd = engine.build_command("https://youtu.be/dQw4w9WgXcQ", {
+            'no_warnings': True,
+            'format': 'bestaudio/best',
+            'postprocessors': [{
+                'key': 'FFmpegExtractAudio',
+                'preferredcodec': 'mp3',
+                'preferredquality': '0'
+            }],
+            'outtmpl': '/tmp/%(title)s.%(ext)s'
+        })
+        self.assertEqual(cmd, [
+            "yt-dlp", "--no-warnings", "--newline",
+            "-f", "bestaudio/best",
+            "-x", "--audio-format", "mp3", "--audio-quality", "0",
+            "-o", "/tmp/%(title)s.%(ext)s",
+            "https://youtu.be/dQw4w9WgXcQ"
+        ])
+
+    def test_cancel_kills_process(self):
+        # A stand-in for yt-dlp that ignores its arguments and hangs
+        engine = SubprocessEngine([sys.executable, "-c", "import time; time.sleep(60)"])
+        cancel_event = threading.Event()
+        threading.Timer(0.2, cancel_event.set).start()
+
+        start = time.monotonic()
+        with self.assertRaises(EngineCancelled):
+            engine.download("https://youtu.be/a", {}, cancel_event=cancel_event)
+        self.assertLess(time.monotonic() - start, 5)
+
+class TestInProcessEngine(unittest.TestCase):
+    def setUp(self):
+        self.created = []
+
+        def factory(options):
+            ydl = MagicMock()
+            ydl.options = options
+            ydl.download.return_value = 0
+            self.created.append(ydl)
+            return ydl
+
+        self.engine = InProcessEngine(factory=factory)
+
+    def test_reuses_instances_and_swaps_hooks(self):
+        options = {'format': 'best', 'outtmpl': '%(title)s.%(ext)s'}
+        received = []
+
+        def fake_download(urls):
+            hook = self.created[0].options['progress_hooks'][0]
+            hook({'status': 'downloading', 'downloaded_bytes': 50, 'total_bytes': 100})
+            return 0
+
+        self.engine.download("https://youtu.be/a", options, received.append)
+        self.created[0].download.side_effect = fake_download
+        self.engine.download("https://youtu.be/b", options)
+
+        self.assertEqual(len(self.created), 1)
+        # The first job's callback is not called for the second job
+        self.assertEqual(received, [])
+
+        self.engine.download("https://youtu.be/c", options, received.append)
+        self.assertEqual([event.percent for event in received], [50.0])
+
+    def test_failed_instance_is_discarded(self):
+        options = {'format': 'best'}
+        self.engine.download("https://youtu.be/a", options)
+        self.created[0].download.side_effect = RuntimeError("boom")
+
+        with self.assertRaises(EngineError):
+            self.engine.download("https://youtu.be/b", options)
+        self.engine.download("https://youtu.be/c", options)
+
+        self.assertEqual(len(self.created), 2)
+        self.assertTrue(self.created[0].close.called)
+
+    def test_create_engine(self):
+        self.assertIsInstance(create_engine("subprocess"), SubprocessEngine)
+        with self.assertRaises(ValueError):
+            create_engine("unknown")
+
+class HLSHandler(BaseHTTPRequestHandler):
+    """Serves an 8-fragment HLS stream and records concurrent fragment requests."""
+
+    def do_GET(self):
+        server = self.server
+        if self.path.endswith(".m3u8"):
+            body = ("#EXTM3U\n#EXT-X-TARGETDURATION:1\n"
+                    + "".join(f"#EXTINF:1.0,\nseg{i}.ts\n" for i in range(8))
+                    + "#EXT-X-ENDLIST\n").encode()
+        else:
+            with server.lock:
+                server.active += 1
+                server.peak = max(server.peak, server.active)
+            time.sleep(0.1)
+            with server.lock:
+                server.active -= 1
+            body = b"\x47" + b"\x00" * 187
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class TestFragmentConcurrency(unittest.TestCase):
+    def test_tuned_to_socket_budget(self):
+        self.assertEqual(fragment_concurrency(1, budget=16, limit=8), 8)
+        self.assertEqual(fragment_concurrency(3, budget=16, limit=8), 5)
+        self.assertEqual(fragment_concurrency(40, budget=16, limit=8), 1)
+
+    def test_passed_to_both_engines(self):
+        options = build_ydl_options(DownloadOptions(format="mp4", quality="720p"), 4)
+        self.assertEqual(options['concurrent_fragment_downloads'], 4)
+        options = build_ydl_options(DownloadOptions(format="mp4", quality="720p", fragments=2), 4)
+        self.assertEqual(options['concurrent_fragment_downloads'], 2)
+
+        cmd = SubprocessEngine("yt-dlp").build_command("https://youtu.be/a", options)
+        self.assertEqual(cmd[cmd.index("-N") + 1], "2")
+
+    def test_fragments_fetched_in_parallel(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), HLSHandler)
+        server.lock, server.active, server.peak = threading.Lock(), 0, 0
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        temp_dir = tempfile.mkdtemp()
+        engine = InProcessEngine()
+        try:
+            engine.download(f"http://127.0.0.1:{server.server_port}/video.m3u8", {
+                'outtmpl': os.path.join(temp_dir, '%(id)s.%(ext)s'),
+                'concurrent_fragment_downloads': 4,
+                'noprogress': True,
+                'fixup': 'never'
+            })
+            self.assertEqual(os.listdir(temp_dir), ["video.mp4"])
+            self.assertGreater(server.peak, 1)
+        finally:
+            engine.close()
+            server.shutdown()
+            server.server_close()
+            shutil.rmtree(temp_dir)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import shutil
+import tempfile
+import time
+import unittest
+
+from src.core.downloader import DownloadOptions
+from src.core.format_planner import (
+    DOWNLOAD, REMUX, TRANSCODE, AudioPlan, apply_audio_plan, audio_format_selector, plan_audio
+)
+from src.utils.info_cache import InfoCache
+from tests.helpers import fake_factory, make_downloader
+
+# Audio-only streams as YouTube lists them, plus a progressive one
+FORMATS = [
+    {'format_id': '139', 'ext': 'm4a', 'acodec': 'mp4a.40.5', 'vcodec': 'none', 'abr': 48.8},
+    {'format_id': '140', 'ext': 'm4a', 'acodec': 'mp4a.40.2', 'vcodec': 'none', 'abr': 129.5},
+    {'format_id': '249', 'ext': 'webm', 'acodec': 'opus', 'vcodec': 'none', 'abr': 50.1},
+    {'format_id': '251', 'ext': 'webm', 'acodec': 'opus', 'vcodec': 'none', 'abr': 160.3},
+    {'format_id': '18', 'ext': 'mp4', 'acodec': 'mp4a.40.2', 'vcodec': 'avc1.42001E', 'abr': 96}
+]
+
+def extract_audio(codec, quality):
+    return {'format': 'bestaudio', 'postprocessors': [
+        {'key': 'FFmpegExtractAudio', 'preferredcodec': codec, 'preferredquality': quality}
+    ]}
+
+class TestPlanAudio(unittest.TestCase):
+    def test_matching_container_needs_no_ffmpeg(self):
+        self.assertEqual(plan_audio(FORMATS, 'aac', '128'), AudioPlan(DOWNLOAD, '140', 129.5))
+        # VBR levels carry no bitrate; the best AAC stream is used
+        self.assertEqual(plan_audio(FORMATS, 'm4a', '0').format_id, '140')
+
+    def test_same_codec_other_container_is_remuxed(self):
+        self.assertEqual(plan_audio(FORMATS, 'opus', '160kbps'), AudioPlan(REMUX, '251', 160.3))
+
+    def test_transcode_when_nothing_fits(self):
+        # No AAC stream reaches 256 kbps
+        self.assertEqual(plan_audio(FORMATS, 'aac', '256').action, TRANSCODE)
+        self.assertEqual(plan_audio(FORMATS, 'mp3', '192').action, TRANSCODE)
+        self.assertEqual(plan_audio(FORMATS, 'wav', '0').action, TRANSCODE)
+
+class TestApplyAudioPlan(unittest.TestCase):
+    def test_download_drops_the_conversion(self):
+        options, plan = apply_audio_plan(extract_audio('aac', '128'), {'formats': FORMATS})
+        self.assertEqual(plan.action, DOWNLOAD)
+        self.assertEqual(options, {'format': '140'})
+
+    def test_transcode_keeps_options(self):
+        original = extract_audio('mp3', '192')
+        options, plan = apply_audio_plan(original, {'formats': FORMATS})
+        self.assertEqual(plan.action, TRANSCODE)
+        self.assertEqual(options, original)
+
+    def test_selector_without_formats(self):
+        options, plan = apply_audio_plan(extract_audio('aac', '192'))
+        self.assertIsNone(plan)
+        self.assertEqual(options['format'],
+                         "bestaudio[acodec^=mp4a][abr>=?192]/bestaudio[acodec^=aac][abr>=?192]/bestaudio")
+        self.assertIsNone(audio_format_selector('wav'))
+
+    def test_yt_dlp_applies_selector(self):
+        import yt_dlp
+
+        info = {'id': 'x', 'title': 'x', 'extractor': 'test', 'extractor_key': 'Test',
+                'webpage_url': 'https://example.com/x',
+                'formats': [dict(f, url=f"https://example.com/{f['format_id']}") for f in FORMATS]}
+        for codec, expected in (('m4a', '140'), ('opus', '251'), ('aac', '251')):
+            quality = '256' if codec == 'aac' else '0'
+            spec = f"{audio_format_selector(codec, quality)}/bestaudio"
+            with yt_dlp.YoutubeDL({'format': spec, 'quiet': True, 'simulate': True}) as ydl:
+                result = ydl.process_ie_result(dict(info), download=False)
+            self.assertEqual(result['format_id'], expected, codec)
+
+class TestDownloaderPlanning(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.download_options = []
+
+        def download(ydl, url):
+            self.download_options.append(ydl.params)
+
+        self.info_cache = InfoCache(db_path=None)
+        self.downloader = make_downloader(self.temp_dir, fake_factory(download), info_cache=self.info_cache)
+
+    def tearDown(self):
+        self.downloader.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_cached_formats_skip_the_transcode(self):
+        url = "https://www.youtube.com/watch?v=aaaaaaaaaaa"
+        self.info_cache.set(url, {'id': 'aaaaaaaaaaa', 'formats': FORMATS})
+        options = DownloadOptions(format="aac", quality="128kbps", output_dir=self.temp_dir,
+                                  convert_audio=True)
+        download_id = self.downloader.download(url, options)
+
+        deadline = time.monotonic() + 5
+        while self.downloader.get_download_status(download_id)['status'] != 'completed':
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        self.assertEqual(self.download_options[0]['format'], '140')
+        self.assertNotIn('postprocessors', self.download_options[0])
+        self.assertEqual(self.downloader.pipeline_stats()['postprocess']['completed'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import importlib.util
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from typing import Dict
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded only when they are used: yt-dlp on the first download, requests
+# when an issue is filed, psutil for system info, asyncio by the asyncio
+# downloader, multiprocessing by the process mode and the GUI toolkits by the GUI
+DEFERRED = ('yt_dlp', 'requests', 'psutil', 'asyncio', 'ssl', 'tkinter', 'customtkinter', 'multiprocessing')
+
+# Cumulative import time of the core downloader, in ms. About 60 ms today;
+# yt-dlp alone adds some 150 ms
+CORE_IMPORT_BUDGET_MS = 200
+
+def import_profile(code: str, env: Dict = None) -> Dict[str, int]:
+    """Run ``code`` under ``python -X importtime``; module -> cumulative microseconds."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT_DIR,
+                            capture_output=True, text=True, timeout=60, env=env)
+    if result.returncode != 0:
+        raise AssertionError(result.stderr)
+    profile = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit():
+                profile[name.strip()] = int(cumulative)
+    return profile
+
+def deferred_in(profile: Dict[str, int]):
+    return sorted(name for name in profile if name.split('.')[0] in DEFERRED)
+
+class TestImportTime(unittest.TestCase):
+    def test_core_modules_defer_heavy_imports(self):
+        for module in ('src.core.downloader', 'src.core.batch', 'src.core'):
+            self.assertEqual(deferred_in(import_profile(f"import {module}")), [], module)
+
+    def test_core_import_budget(self):
+        best = min(import_profile("import src.core.downloader")['src.core.downloader'] for _ in range(3))
+        self.assertLess(best / 1000, CORE_IMPORT_BUDGET_MS)
+
+    def test_yt_dlp_loaded_by_first_download_only(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            code = (
+                "from src.core.downloader import MediaDownloader\n"
+                "from src.utils.archive import DownloadArchive\n"
+                "from src.utils.info_cache import InfoCache\n"
+                "from src.utils.journal import JobJournal\n"
+                "downloader = MediaDownloader(info_cache=InfoCache(db_path=None), resume=False,\n"
+                f"    journal=JobJournal({os.path.join(temp_dir, 'journal.jsonl')!r}),\n"
+                "    archive=DownloadArchive(':memory:'))\n"
+                "downloader.close()\n"
+            )
+            self.assertEqual(deferred_in(import_profile(code)), [])
+
+    def test_error_reporter_defers_requests_and_psutil(self):
+        with tempfile.TemporaryDirectory() as home:
+            profile = import_profile("import src.error_reporter", env=dict(os.environ, HOME=home))
+        self.assertEqual(deferred_in(profile), [])
+
+    @unittest.skipUnless(importlib.util.find_spec('customtkinter'), "customtkinter is not installed")
+    def test_gui_does_not_load_yt_dlp(self):
+        loaded = deferred_in(import_profile("import src.gui"))
+        self.assertEqual([name for name in loaded if name.split('.')[0] in ('yt_dlp', 'requests', 'psutil')], [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from src.utils.info_cache import InfoCache, cache_key
+
+class TestInfoCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "info.sqlite3")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_cache_key(self):
+        self.assertEqual(
+            cache_key("https://www.youtube.com/watch?v=dQw4w9WgXcQ"),
+            cache_key("https://youtu.be/dQw4w9WgXcQ")
+        )
+        self.assertEqual(
+            cache_key("https://m.youtube.com/playlist?list=PL1&si=abc"),
+            cache_key("https://www.youtube.com/playlist?list=PL1")
+        )
+
+    def test_video_in_playlist_has_its_own_key(self):
+        video = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+        in_playlist = "https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PL1"
+        self.assertNotEqual(cache_key(video), cache_key(in_playlist))
+        self.assertEqual(cache_key(in_playlist), cache_key("https://youtube.com/watch?list=PL1&v=dQw4w9WgXcQ"))
+
+        cache = InfoCache(db_path=None)
+        cache.set(video, {'id': 'dQw4w9WgXcQ', 'title': 'Video'})
+        cache.set(in_playlist, {'_type': 'playlist', 'id': 'PL1', 'entries': []})
+        self.assertEqual(cache.get(video)['title'], 'Video')
+        self.assertEqual(cache.get(in_playlist)['_type'], 'playlist')
+
+    def test_memory_hit_and_ttl(self):
+        cache = InfoCache(db_path=None)
+        url = "https://youtu.be/dQw4w9WgXcQ"
+        cache.set(url, {"title": "Test"}, ttl=60)
+        self.assertEqual(cache.get("https://www.youtube.com/watch?v=dQw4w9WgXcQ"), {"title": "Test"})
+
+        with patch("src.utils.info_cache.time.time", return_value=time.time() + 120):
+            self.assertIsNone(cache.get(url))
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+
+    def test_live_streams_not_cached(self):
+        cache = InfoCache(db_path=None)
+        cache.set("https://youtu.be/dQw4w9WgXcQ", {"is_live": True})
+        self.assertIsNone(cache.get("https://youtu.be/dQw4w9WgXcQ"))
+
+    def test_lru_eviction(self):
+        cache = InfoCache(db_path=None, max_entries=2)
+        cache.set("https://example.com/a", {"id": "a"}, ttl=60)
+        cache.set("https://example.com/b", {"id": "b"}, ttl=60)
+        cache.get("https://example.com/a")
+        cache.set("https://example.com/c", {"id": "c"}, ttl=60)
+
+        self.assertIsNotNone(cache.get("https://example.com/a"))
+        self.assertIsNone(cache.get("https://example.com/b"))
+        self.assertIsNotNone(cache.get("https://example.com/c"))
+
+    def test_disk_tier_persists(self):
+        cache = InfoCache(db_path=self.db_path)
+        cache.set("https://youtu.be/dQw4w9WgXcQ", {"title": "Persisted"}, ttl=60)
+        cache.close()
+
+        reopened = InfoCache(db_path=self.db_path)
+        self.assertEqual(reopened.get("https://youtu.be/dQw4w9WgXcQ"), {"title": "Persisted"})
+        reopened.close()
+
+    def test_disk_size_eviction(self):
+        cache = InfoCache(db_path=self.db_path, max_entries=1, max_disk_bytes=100)
+        cache.set("https://example.com/a", {"data": "x" * 60}, ttl=60)
+        cache.set("https://example.com/b", {"data": "y" * 60}, ttl=60)
+
+        self.assertIsNone(cache.get("https://example.com/a"))
+        self.assertIsNotNone(cache.get("https://example.com/b"))
+        cache.close()
+
+if __name__ == '__main__':
+    unittest.main()
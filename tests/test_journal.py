@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.utils.journal import JobJournal
+
+class TestJobJournal(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "journal.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_replay_after_restart(self):
+        journal = JobJournal(self.path)
+        journal.record("a", "submitted", url="https://youtu.be/a", options={"format": "MP4"})
+        journal.record("a", "started")
+        journal.add_file("a", "/tmp/a.mp4.part")
+        journal.add_file("a", "/tmp/a.mp4.part")
+        journal.record("b", "submitted", url="https://youtu.be/b")
+        journal.record("b", "completed")
+
+        reopened = JobJournal(self.path)
+        incomplete = reopened.incomplete()
+        self.assertEqual([job['job_id'] for job in incomplete], ["a"])
+        self.assertEqual(incomplete[0]['url'], "https://youtu.be/a")
+        self.assertEqual(incomplete[0]['options'], {"format": "MP4"})
+        self.assertEqual(incomplete[0]['files'], ["/tmp/a.mp4.part"])
+        self.assertEqual(reopened.get("b")['event'], "completed")
+
+    def test_torn_line_is_ignored(self):
+        journal = JobJournal(self.path)
+        journal.record("a", "submitted", url="https://youtu.be/a")
+        with open(self.path, 'a') as f:
+            f.write('{"job_id": "b", "ev')
+
+        self.assertEqual([job['job_id'] for job in JobJournal(self.path).incomplete()], ["a"])
+
+    def test_record_after_torn_line(self):
+        journal = JobJournal(self.path)
+        journal.record("a", "submitted", url="https://youtu.be/a")
+        with open(self.path, 'a') as f:
+            f.write('{"job_id": "b", "ev')
+
+        reopened = JobJournal(self.path)
+        reopened.record("a", "completed")
+
+        self.assertEqual(JobJournal(self.path).incomplete(), [])
+        with open(self.path) as f:
+            self.assertTrue(all(line.startswith('{"job_id": "a"') for line in f))
+
+    def test_compaction_keeps_incomplete_jobs(self):
+        journal = JobJournal(self.path)
+        for i in range(50):
+            journal.record(str(i), "submitted", url=f"https://youtu.be/{i}")
+            journal.record(str(i), "completed")
+        journal.record("open", "submitted", url="https://youtu.be/open")
+        journal.add_file("open", "open.part")
+
+        compacted = JobJournal(self.path, compact_bytes=0)
+        with open(self.path) as f:
+            self.assertEqual(len(f.readlines()), 1)
+        self.assertEqual(compacted.incomplete()[0]['files'], ["open.part"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.utils.log_reader import LogTailer, read_last_lines, tail_lines
+
+class TestLogTailer(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.temp_dir, "app.log")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, text, mode='a', path=None):
+        with open(path or self.log_path, mode) as f:
+            f.write(text)
+
+    def test_reads_only_appended_lines(self):
+        self.write("one\ntwo\n")
+        tailer = LogTailer(self.temp_dir)
+        self.assertEqual(tailer.poll(), ["one\n", "two\n"])
+        self.assertEqual(tailer.poll(), [])
+
+        self.write("three\nfour")
+        self.assertEqual(tailer.poll(), ["three\n"])
+        self.write(" continued\n")
+        self.assertEqual(tailer.poll(), ["four continued\n"])
+
+    def test_initial_tail_skips_partial_line(self):
+        self.write("".join(f"line {i}\n" for i in range(100)))
+        tailer = LogTailer(self.temp_dir, initial_bytes=16)
+        self.assertEqual(tailer.poll(), ["line 98\n", "line 99\n"])
+
+    def test_truncation_and_rotation(self):
+        self.write("old line\n")
+        tailer = LogTailer(self.temp_dir)
+        tailer.poll()
+
+        self.write("new\n", mode='w')
+        self.assertEqual(tailer.poll(), ["new\n"])
+
+        os.rename(self.log_path, self.log_path + ".1")
+        self.write("rotated\n")
+        self.assertEqual(tailer.poll(), ["rotated\n"])
+
+    def test_new_files_read_from_start(self):
+        tailer = LogTailer(self.temp_dir, initial_bytes=16)
+        tailer.poll()
+        self.write("first\nsecond\n", path=os.path.join(self.temp_dir, "error.log"))
+        self.assertEqual(tailer.poll(), ["first\n", "second\n"])
+
+    def test_reads_are_bounded(self):
+        self.write("start\n")
+        tailer = LogTailer(self.temp_dir, initial_bytes=16)
+        tailer.poll()
+
+        # Lines written while nobody polled: only the tail is read
+        self.write("".join(f"line {i}\n" for i in range(100)))
+        self.assertEqual(tailer.poll(), ["line 98\n", "line 99\n"])
+
+        os.rename(self.log_path, self.log_path + ".1")
+        self.write("".join(f"new {i}\n" for i in range(100)))
+        self.assertEqual(tailer.poll(), ["new 98\n", "new 99\n"])
+
+class TestTailLines(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def make_log(self, name, lines, trailing_newline=True):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'w') as f:
+            f.write("\n".join(lines) + ("\n" if trailing_newline else ""))
+        return path
+
+    def test_tail_lines_across_blocks(self):
+        lines = [f"line {i}" for i in range(1000)]
+        path = self.make_log("a.log", lines)
+        for block_size in (7, 64, 4096):
+            self.assertEqual(
+                tail_lines(path, 3, block_size=block_size),
+                ["line 997\n", "line 998\n", "line 999\n"]
+            )
+        self.assertEqual(len(tail_lines(path, 5000, block_size=64)), 1000)
+        self.assertEqual(tail_lines(path, 0), [])
+
+    def test_tail_lines_without_trailing_newline(self):
+        path = self.make_log("a.log", ["a", "b", "c"], trailing_newline=False)
+        self.assertEqual(tail_lines(path, 2, block_size=2), ["b\n", "c"])
+
+    def test_read_last_lines_in_time_order(self):
+        old = self.make_log("old.log", ["old 1", "old 2", "old 3"])
+        new = self.make_log("new.log", ["new 1", "new 2"])
+        self.assertEqual(
+            read_last_lines([old, new], 4),
+            ["old 2\n", "old 3\n", "new 1\n", "new 2\n"]
+        )
+        self.assertEqual(len(read_last_lines([old, new])), 5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from src.utils.name_allocator import NameAllocator
+
+class TestNameAllocator(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.allocator = NameAllocator()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def touch(self, name):
+        open(os.path.join(self.temp_dir, name), 'w').close()
+
+    def test_free_name_is_kept(self):
+        self.assertEqual(self.allocator.allocate(self.temp_dir, "song.mp3"), "song.mp3")
+
+    def test_continues_after_highest_suffix(self):
+        for name in ("song.mp3", "song_1.mp3", "song_7.mp3", "other_9.mp3"):
+            self.touch(name)
+        self.assertEqual(self.allocator.allocate(self.temp_dir, "song.mp3", reserve=True), "song_8.mp3")
+        self.assertEqual(self.allocator.allocate(self.temp_dir, "song.mp3", reserve=True), "song_9.mp3")
+        self.assertEqual(self.allocator.allocate(self.temp_dir, "other.mp3"), "other.mp3")
+
+    def test_unreserved_names_are_not_remembered(self):
+        self.touch("song.mp3")
+        self.assertEqual(self.allocator.allocate(self.temp_dir, "song.mp3"), "song_1.mp3")
+        self.assertEqual(self.allocator.allocate(self.temp_dir, "song.mp3"), "song_1.mp3")
+        self.assertEqual(self.allocator.allocate(self.temp_dir, "new.mp3"), "new.mp3")
+        self.assertEqual(self.allocator.allocate(self.temp_dir, "new.mp3"), "new.mp3")
+        # A reserved name that is removed again is only remembered by reservations
+        name = self.allocator.allocate(self.temp_dir, "song.mp3", reserve=True)
+        os.remove(os.path.join(self.temp_dir, name))
+        self.assertEqual(self.allocator.allocate(self.temp_dir, "song.mp3"), "song_1.mp3")
+
+    def test_lists_directory_once(self):
+        for i in range(200):
+            self.touch(f"Official Audio_{i}.mp3")
+        self.touch("Official Audio.mp3")
+
+        with patch('src.utils.name_allocator.os.scandir', wraps=os.scandir) as scandir:
+            names = [self.allocator.allocate(self.temp_dir, "Official Audio.mp3", reserve=True)
+                     for _ in range(100)]
+        self.assertEqual(scandir.call_count, 1)
+        self.assertEqual(names[0], "Official Audio_200.mp3")
+        self.assertEqual(len(set(names)), 100)
+
+    def test_file_created_after_listing(self):
+        self.allocator.allocate(self.temp_dir, "a.mp4", reserve=True)
+        self.touch("b.mp4")
+        self.assertEqual(self.allocator.allocate(self.temp_dir, "b.mp4", reserve=True), "b_1.mp4")
+
+    def test_concurrent_reservations_never_collide(self):
+        # Two allocators stand in for two processes sharing a directory
+        allocators = [NameAllocator(), NameAllocator()]
+        results = []
+        lock = threading.Lock()
+
+        def worker(allocator):
+            for _ in range(50):
+                name = allocator.allocate(self.temp_dir, "clip.mp4", reserve=True)
+                with lock:
+                    results.append(name)
+
+        threads = [threading.Thread(target=worker, args=(allocators[i % 2],)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), 400)
+        self.assertEqual(len(set(results)), 400)
+        self.assertEqual(len(os.listdir(self.temp_dir)), 400)
+
+    def test_release_removes_placeholder(self):
+        name = self.allocator.allocate(self.temp_dir, "a.mp4", reserve=True)
+        self.allocator.release(self.temp_dir, name)
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, name)))
+
+if __name__ == '__main__':
+    unittest.main()
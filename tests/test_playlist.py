@@ -0,0 +1,131 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from src.core.downloader import DownloadOptions
+from src.core.playlist import entry_url, expand_playlist, is_playlist
+from tests.helpers import fake_factory, make_downloader
+
+def playlist_info(count):
+    return {
+        '_type': 'playlist',
+        'id': 'PL1',
+        'entries': [
+            {'_type': 'url', 'ie_key': 'Youtube', 'id': f'vid{i}', 'url': f'vid{i}', 'title': f'Video {i}'}
+            for i in range(1, count + 1)
+        ]
+    }
+
+class TestExpandPlaylist(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_entry_url(self):
+        self.assertEqual(entry_url({'id': 'abc', 'url': 'abc'}), "https://www.youtube.com/watch?v=abc")
+        self.assertEqual(entry_url({'url': 'https://vimeo.com/1'}), "https://vimeo.com/1")
+
+    def test_order_and_limit(self):
+        entries = expand_playlist(playlist_info(5), max_items=2, reverse_order=True)
+        self.assertEqual([entry.video_id for entry in entries], ['vid5', 'vid4'])
+        self.assertEqual([entry.index for entry in entries], [5, 4])
+        self.assertEqual(len(expand_playlist(playlist_info(5), max_items=0)), 5)
+
+    def test_skip_existing(self):
+        open(os.path.join(self.temp_dir, "Video 1.mp4"), 'w').close()
+        # Partial downloads do not count as existing
+        open(os.path.join(self.temp_dir, "Video 2.mp4.part"), 'w').close()
+
+        entries = expand_playlist(playlist_info(3), skip_existing=True, output_dir=self.temp_dir)
+        self.assertEqual([entry.video_id for entry in entries], ['vid2', 'vid3'])
+
+    def test_unavailable_entries_are_skipped(self):
+        info = playlist_info(2)
+        info['entries'].insert(1, None)
+        self.assertTrue(is_playlist(info))
+        self.assertEqual(len(expand_playlist(info)), 2)
+
+class TestPlaylistFanOut(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+        self.attempts = {}
+
+        def download(ydl, url):
+            with self.lock:
+                self.running += 1
+                self.peak = max(self.peak, self.running)
+                self.attempts[url] = self.attempts.get(url, 0) + 1
+                attempt = self.attempts[url]
+            time.sleep(0.05)
+            with self.lock:
+                self.running -= 1
+            # The second entry fails once and succeeds on retry
+            if url.endswith("vid2") and attempt == 1:
+                raise RuntimeError("HTTP Error 503")
+
+        self.downloader = make_downloader(self.temp_dir, fake_factory(download, info=playlist_info(6)))
+
+    def tearDown(self):
+        self.downloader.close()
+        shutil.rmtree(self.temp_dir)
+
+    @patch.dict('src.core.downloader.PLAYLIST_SETTINGS', {'retry_delay': 0, 'skip_existing': False})
+    def test_entries_download_in_parallel(self):
+        options = DownloadOptions(format="MP4", quality="720p", output_dir=self.temp_dir, playlist=True)
+        download_id = self.downloader.download("https://www.youtube.com/playlist?list=PL1", options)
+
+        deadline = time.monotonic() + 10
+        while self.downloader.get_download_status(download_id)['status'] == 'downloading':
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.02)
+
+        status = self.downloader.get_download_status(download_id)
+        self.assertEqual(status['status'], 'completed')
+        self.assertEqual(status['progress'], 100.0)
+        self.assertEqual(len(self.attempts), 6)
+        self.assertEqual(self.attempts["https://www.youtube.com/watch?v=vid2"], 2)
+        self.assertGreater(self.peak, 1)
+
+    @patch.dict('src.core.downloader.PLAYLIST_SETTINGS', {'retry_delay': 0, 'skip_existing': False})
+    def test_refused_entry_does_not_stop_the_others(self):
+        # Cached metadata puts the third entry over MAX_DOWNLOAD_SIZE
+        self.downloader._info_cache.set("https://www.youtube.com/watch?v=vid3",
+                                        {'id': 'vid3', 'filesize': 100 * 1024 ** 3})
+        options = DownloadOptions(format="MP4", quality="720p", output_dir=self.temp_dir, playlist=True)
+        download_id = self.downloader.download("https://www.youtube.com/playlist?list=PL1", options)
+
+        deadline = time.monotonic() + 10
+        while self.downloader.get_download_status(download_id)['status'] == 'downloading':
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.02)
+
+        status = self.downloader.get_download_status(download_id)
+        self.assertEqual((status['status'], status['error']), ('failed', "1 of 6 entries failed"))
+        self.assertEqual(len(self.attempts), 5)
+        self.assertNotIn("https://www.youtube.com/watch?v=vid3", self.attempts)
+
+    @patch.dict('src.core.downloader.PLAYLIST_SETTINGS', {'retry_delay': 0, 'skip_existing': False})
+    def test_forget_drops_the_entries(self):
+        options = DownloadOptions(format="MP4", quality="720p", output_dir=self.temp_dir, playlist=True)
+        download_id = self.downloader.download("https://www.youtube.com/playlist?list=PL1", options)
+        self.assertFalse(self.downloader.forget(download_id))
+
+        deadline = time.monotonic() + 10
+        while not self.downloader.forget(download_id):
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.02)
+
+        self.assertEqual(self.downloader._active_downloads, {})
+        self.assertEqual(self.downloader._scheduler._tasks, {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from src.core.downloader import DownloadOptions
+from src.core.postprocess import PostProcessingPool, split_postprocessors
+from tests.helpers import fake_factory, make_downloader
+
+EXTRACT_AUDIO = {'key': 'FFmpegExtractAudio', 'preferredcodec': 'mp3', 'preferredquality': '192'}
+
+class TestSplitPostprocessors(unittest.TestCase):
+    def test_audio_extraction_is_deferred(self):
+        embed = {'key': 'FFmpegMetadata'}
+        options, deferred = split_postprocessors({'format': 'bestaudio', 'postprocessors': [embed, EXTRACT_AUDIO]})
+        self.assertEqual(options, {'format': 'bestaudio', 'postprocessors': [embed]})
+        self.assertEqual(deferred, [EXTRACT_AUDIO])
+
+    def test_nothing_to_defer(self):
+        options = {'format': 'best'}
+        self.assertEqual(split_postprocessors(options), (options, []))
+
+class TestPostProcessingPool(unittest.TestCase):
+    def test_results_and_stats(self):
+        def runner(path, postprocessors):
+            if path == "bad.webm":
+                raise RuntimeError("ffmpeg exited with code 1")
+            return path.replace(".webm", ".mp3")
+
+        pool = PostProcessingPool(max_workers=2, runner=runner)
+        results = {}
+        done = threading.Semaphore(0)
+
+        def callback(name):
+            def record(path, error):
+                results[name] = (path, error)
+                done.release()
+            return record
+
+        pool.submit("a", "a.webm", [EXTRACT_AUDIO], callback("a"))
+        pool.submit("b", "bad.webm", [EXTRACT_AUDIO], callback("b"))
+        for _ in range(2):
+            self.assertTrue(done.acquire(timeout=5))
+        pool.shutdown()
+
+        self.assertEqual(results["a"], ("a.mp3", None))
+        self.assertIsInstance(results["b"][1], RuntimeError)
+        stats = pool.stats()
+        self.assertEqual((stats['completed'], stats['failed'], stats['max_workers']), (1, 1, 2))
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.download_options = []
+
+        def download(ydl, url):
+            self.download_options.append(ydl.params)
+            video_id = url.rsplit("=", 1)[1]
+            path = os.path.join(self.temp_dir, f"Song [{video_id}].webm")
+            open(path, 'w').close()
+            ydl.report_postprocessor({'status': 'finished', 'info_dict': {'id': video_id, 'filepath': path}})
+
+        def convert(path, postprocessors):
+            # A CPU-bound transcode
+            time.sleep(0.3)
+            new_path = path.replace(".webm", ".mp3")
+            os.replace(path, new_path)
+            return new_path
+
+        self.downloader = make_downloader(self.temp_dir, fake_factory(download),
+                                          postprocess=PostProcessingPool(max_workers=1, runner=convert))
+
+    def tearDown(self):
+        self.downloader.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_conversions_do_not_hold_download_workers(self):
+        options = DownloadOptions(format="mp3", quality="192kbps", output_dir=self.temp_dir,
+                                  convert_audio=True)
+        ids = [self.downloader.download(f"https://www.youtube.com/watch?v={i:011d}", options)
+               for i in range(4)]
+
+        # All four fetches finish while the single converter is still busy
+        deadline = time.monotonic() + 1
+        while len(self.download_options) < 4:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        self.assertGreater(self.downloader.pipeline_stats()['postprocess']['queued'], 0)
+        self.assertTrue(all('postprocessors' not in opts for opts in self.download_options))
+
+        deadline = time.monotonic() + 5
+        while any(self.downloader.get_download_status(i)['status'] != 'completed' for i in ids):
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.02)
+        self.assertEqual(sorted(os.listdir(self.temp_dir)),
+                         [f"Song [{i:011d}].mp3" for i in range(4)] + ["journal.jsonl"])
+        self.assertEqual(self.downloader.pipeline_stats()['postprocess']['completed'], 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+import errno
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from src.core.downloader import DownloadOptions, MediaDownloader
+from src.core.process_pool import ProcessYoutubeDLPool, WorkerError
+from src.core.ydl_pool import set_ratelimit
+from src.utils.archive import DownloadArchive
+from src.utils.info_cache import InfoCache
+from src.utils.retry import LOCAL, PERMANENT, classify_error
+from tests.helpers import make_downloader
+
+class FakeYoutubeDL:
+    """Stands in for YoutubeDL in the worker processes; the URL picks the behaviour."""
+
+    def __init__(self, options):
+        self.params = options
+
+    def extract_info(self, url, download=True):
+        return {'id': url.rsplit('/', 1)[-1], 'pid': os.getpid(), 'params': sorted(self.params)}
+
+    def sanitize_info(self, info):
+        return info
+
+    def download(self, urls):
+        url = urls[0]
+        if url.endswith('missing'):
+            raise Exception("ERROR: unable to download video data: HTTP Error 404: Not Found")
+        if url.endswith('diskfull'):
+            raise OSError(errno.ENOSPC, "No space left on device")
+        if url.endswith('stuck'):
+            self.hook({'status': 'downloading', 'downloaded_bytes': 1})
+            # Never calls a hook again, so it cannot see a cancel
+            time.sleep(60)
+        if url.endswith('slow'):
+            # Runs until a hook raises; reports its rate limit as speed
+            for _ in range(1000):
+                self.hook({'status': 'downloading', 'downloaded_bytes': 1,
+                           'speed': self.params.get('ratelimit')})
+                time.sleep(0.01)
+        for done in (512, 1024):
+            self.hook({'status': 'downloading', 'downloaded_bytes': done, 'total_bytes': 1024,
+                       'info_dict': {'id': 'abc', 'formats': [object()]}})
+        self.hook({'status': 'finished', 'downloaded_bytes': 1024, 'total_bytes': 1024,
+                   'filename': f'/tmp/{url[-3:]}.mp4'})
+        for hook in self.params['postprocessor_hooks']:
+            hook({'status': 'finished', 'postprocessor': 'MoveFiles',
+                  'info_dict': {'id': 'abc', 'filepath': f'/tmp/{url[-3:]}.mp4'}})
+        return 0
+
+    def hook(self, d):
+        for hook in self.params['progress_hooks']:
+            hook(d)
+
+    def close(self):
+        pass
+
+def make_fake(options):
+    return FakeYoutubeDL(options)
+
+class TestProcessYoutubeDLPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = ProcessYoutubeDLPool(workers=1, factory=make_fake, progress_rate_hz=0, cancel_timeout=1)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_jobs_run_on_a_long_lived_worker(self):
+        pids = set()
+        for i in range(3):
+            with self.pool.lease({'format': 'best'}) as ydl:
+                info = ydl.extract_info(f"https://example.com/v{i}", download=False)
+            self.assertEqual(info['id'], f"v{i}")
+            pids.add(info['pid'])
+        self.assertNotIn(os.getpid(), pids)
+        self.assertEqual(len(pids), 1)
+        self.assertEqual(self.pool.stats()['started'], 1)
+
+    def test_hooks_are_streamed_back(self):
+        progress, postprocessor = [], []
+        with self.pool.lease({'format': 'best'}, progress_hooks=[progress.append],
+                             postprocessor_hooks=[postprocessor.append]) as ydl:
+            self.assertEqual(ydl.download(["https://example.com/v01"]), 0)
+        self.assertEqual([d['status'] for d in progress], ['downloading', 'downloading', 'finished'])
+        # Only fields that can cross the pipe
+        self.assertEqual(progress[0]['info_dict'], {'id': 'abc'})
+        self.assertEqual(postprocessor[0]['info_dict']['filepath'], '/tmp/v01.mp4')
+
+    def test_errors_keep_their_category(self):
+        with self.pool.lease({}) as ydl:
+            with self.assertRaises(WorkerError) as missing:
+                ydl.download(["https://example.com/missing"])
+            with self.assertRaises(WorkerError) as diskfull:
+                ydl.download(["https://example.com/diskfull"])
+        self.assertEqual(classify_error(missing.exception), PERMANENT)
+        self.assertEqual(classify_error(diskfull.exception), LOCAL)
+
+    def test_cancel_stops_the_job_and_keeps_the_worker(self):
+        def cancel(d):
+            raise KeyboardInterrupt
+
+        with self.pool.lease({}, progress_hooks=[cancel]) as ydl:
+            start = time.monotonic()
+            with self.assertRaises(KeyboardInterrupt):
+                ydl.download(["https://example.com/slow"])
+            self.assertLess(time.monotonic() - start, 1)
+            pid = ydl.extract_info("https://example.com/after", download=False)['pid']
+        with self.pool.lease({}) as ydl:
+            self.assertEqual(ydl.extract_info("https://example.com/next", download=False)['pid'], pid)
+        self.assertEqual(self.pool.stats()['replaced'], 0)
+
+    def test_stuck_worker_is_replaced(self):
+        def cancel(d):
+            raise KeyboardInterrupt
+
+        with self.pool.lease({}, progress_hooks=[cancel]) as ydl:
+            with self.assertRaises(KeyboardInterrupt):
+                ydl.download(["https://example.com/stuck"])
+            stuck_pid = ydl._worker.process.pid
+        with self.pool.lease({}) as ydl:
+            self.assertNotEqual(ydl.extract_info("https://example.com/v", download=False)['pid'], stuck_pid)
+        self.assertEqual(self.pool.stats()['replaced'], 1)
+
+    def test_ratelimit_reaches_a_running_job(self):
+        speeds = []
+        changed = threading.Event()
+
+        def hook(d):
+            speeds.append(d.get('speed'))
+            if d.get('speed') == 500:
+                raise KeyboardInterrupt
+
+        with self.pool.lease({'ratelimit': 1000}, progress_hooks=[hook]) as ydl:
+            threading.Timer(0.1, lambda: (set_ratelimit(ydl, 500), changed.set())).start()
+            with self.assertRaises(KeyboardInterrupt):
+                ydl.download(["https://example.com/slow"])
+        self.assertTrue(changed.is_set())
+        self.assertEqual((speeds[0], speeds[-1]), (1000, 500))
+
+class TestProcessMode(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.downloader = make_downloader(self.temp_dir, execution_mode='process',
+                                          ydl_pool=ProcessYoutubeDLPool(workers=2, factory=make_fake))
+
+    def tearDown(self):
+        self.downloader.close()
+        shutil.rmtree(self.temp_dir)
+
+    def wait_for(self, download_id, status):
+        deadline = time.monotonic() + 30
+        while self.downloader.get_download_status(download_id)['status'] != status:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.02)
+
+    def test_download_and_cancel(self):
+        options = DownloadOptions(format="MP4", quality="720p", output_dir=self.temp_dir)
+        done = self.downloader.download("https://www.youtube.com/watch?v=video000001", options)
+        slow = self.downloader.download("https://www.youtube.com/watch?slow", options)
+        self.wait_for(done, 'completed')
+        self.assertEqual(self.downloader.get_download_status(done)['path'], '/tmp/001.mp4')
+        self.downloader.cancel_download(slow)
+        self.wait_for(slow, 'cancelled')
+        self.assertEqual(self.downloader._ydl_pool.stats()['replaced'], 0)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            MediaDownloader(info_cache=InfoCache(db_path=None), resume=False,
+                            archive=DownloadArchive(":memory:"), execution_mode='fiber')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import threading
+import unittest
+
+from src.utils.progress import (
+    ProgressBus, ProgressEvent, event_from_hook, parse_progress_line
+)
+
+class TestProgressParsing(unittest.TestCase):
+    def test_parse_progress_line(self):
+        event = parse_progress_line(
+            "[download]  45.0% of ~ 10.00MiB at  2.00MiB/s ETA 00:03", "t1"
+        )
+        self.assertEqual(event.task_id, "t1")
+        self.assertEqual(event.status, "downloading")
+        self.assertEqual(event.percent, 45.0)
+        self.assertEqual(event.total_bytes, 10 * 1024 ** 2)
+        self.assertEqual(event.speed, 2 * 1024 ** 2)
+        self.assertEqual(event.eta, 3)
+
+    def test_parse_final_and_unrelated_lines(self):
+        event = parse_progress_line("[download] 100% of 10.00MiB in 00:00:05 at 2.00MiB/s")
+        self.assertEqual(event.status, "finished")
+        self.assertIsNone(parse_progress_line("[download] Destination: video.mp4"))
+        self.assertIsNone(parse_progress_line("[youtube] abc: Downloading webpage"))
+
+    def test_event_from_hook(self):
+        event = event_from_hook({
+            'status': 'downloading',
+            'downloaded_bytes': 25,
+            'total_bytes_estimate': 100,
+            'tmpfilename': 'video.mp4.part'
+        }, "t1")
+        self.assertEqual(event.percent, 25.0)
+        self.assertEqual(event.filename, 'video.mp4.part')
+
+class TestProgressBus(unittest.TestCase):
+    def test_coalesces_per_task(self):
+        bus = ProgressBus(rate_hz=10)
+        batches = []
+        bus._subscribers.append(batches.append)
+
+        for i in range(100):
+            bus.publish(ProgressEvent("a", "downloading", percent=float(i)))
+            bus.publish(ProgressEvent("b", "downloading", percent=float(i) / 2))
+        bus.publish(ProgressEvent("a", "finished", percent=100.0))
+        bus.flush()
+
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(
+            [(e.task_id, e.status, e.percent) for e in batches[0]],
+            [("a", "downloading", 99.0), ("a", "finished", 100.0), ("b", "downloading", 49.5)]
+        )
+        self.assertEqual(bus.flush(), [])
+
+    def test_background_delivery(self):
+        bus = ProgressBus(rate_hz=50)
+        received = threading.Event()
+        unsubscribe = bus.subscribe(lambda batch: received.set())
+        bus.publish(ProgressEvent("a", "downloading", percent=1.0))
+
+        self.assertTrue(received.wait(2))
+        unsubscribe()
+        bus.close()
+
+if __name__ == '__main__':
+    unittest.main()
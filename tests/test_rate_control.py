@@ -0,0 +1,140 @@
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.core.downloader import DownloadError
+from src.core.engines import EngineError, InProcessEngine, SubprocessEngine
+from src.core.ydl_pool import YoutubeDLPool
+from src.utils.rate_control import AdaptiveRateController, is_throttling_error
+from src.utils.rate_limiter import HostRateLimiter
+from tests.helpers import make_downloader
+
+class FakeSiteHandler(BaseHTTPRequestHandler):
+    """Answers 429 while the server is throttling, a tiny video otherwise."""
+
+    def do_GET(self):
+        if self.server.throttling:
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = b"\x00" * 1024
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command == 'GET':
+            self.wfile.write(body)
+
+    do_HEAD = do_GET
+
+    def log_message(self, *args):
+        pass
+
+class HTTPError429(Exception):
+    status = 429
+
+class TestThrottlingErrors(unittest.TestCase):
+    def test_signatures(self):
+        self.assertTrue(is_throttling_error("ERROR: Unable to download webpage: HTTP Error 429: Too Many Requests"))
+        self.assertTrue(is_throttling_error("Sign in to confirm you’re not a bot"))
+        self.assertFalse(is_throttling_error("HTTP Error 404: Not Found"))
+        self.assertFalse(is_throttling_error(None))
+
+    def test_wrapped_status(self):
+        try:
+            try:
+                raise HTTPError429("upstream")
+            except HTTPError429 as e:
+                raise EngineError("extraction failed") from e
+        except EngineError as e:
+            self.assertTrue(is_throttling_error(e))
+
+class TestAdaptiveRateController(unittest.TestCase):
+    URL = "https://www.youtube.com/watch?v=a"
+
+    def setUp(self):
+        self.limiter = HostRateLimiter(rate=8, period=1, burst=8)
+        self.control = AdaptiveRateController(self.limiter, min_rate=1, hold_seconds=0)
+
+    def test_multiplicative_decrease_additive_increase(self):
+        self.assertTrue(self.control.record_failure(self.URL, "HTTP Error 429"))
+        self.assertEqual(self.control.current_rate(self.URL), 4)
+        # The bucket is emptied as well
+        self.assertFalse(self.limiter.try_acquire(self.URL))
+        for _ in range(4):
+            self.control.record_failure(self.URL, "HTTP Error 429")
+        self.assertEqual(self.control.current_rate(self.URL), 1)
+
+        for _ in range(20):
+            self.control.record_success(self.URL)
+        self.assertEqual(self.control.current_rate(self.URL), 8)
+
+    def test_other_errors_and_hosts_are_untouched(self):
+        self.assertFalse(self.control.record_failure(self.URL, "HTTP Error 404: Not Found"))
+        self.control.record_failure("https://vimeo.com/1", "Too Many Requests")
+        self.assertEqual(self.control.current_rate(self.URL), 8)
+        self.assertEqual(self.control.current_rate("https://vimeo.com/2"), 4)
+
+    def test_one_decrease_per_hold_window(self):
+        control = AdaptiveRateController(self.limiter, hold_seconds=60)
+        for _ in range(5):
+            control.record_failure(self.URL, "HTTP Error 429")
+        metrics = control.metrics()["youtube.com"]
+        self.assertEqual(metrics['rate'], 4)
+        self.assertEqual(metrics['throttled'], 5)
+        self.assertEqual(metrics['decreases'], 1)
+
+class TestAgainstFakeServer(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeSiteHandler)
+        self.server.throttling = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/video.mp4"
+        self.control = AdaptiveRateController(
+            HostRateLimiter(rate=100, period=1, burst=10), hold_seconds=0, increase_step=10
+        )
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_inprocess_engine_error(self):
+        engine = InProcessEngine()
+        with self.assertRaises(EngineError) as ctx:
+            engine.extract_info(self.url)
+        engine.close()
+        self.assertTrue(self.control.record_failure(self.url, ctx.exception))
+        self.assertEqual(self.control.current_rate(self.url), 50)
+
+    def test_subprocess_engine_stderr(self):
+        engine = SubprocessEngine([sys.executable, "-m", "yt_dlp"])
+        with self.assertRaises(EngineError) as ctx:
+            engine.extract_info(self.url)
+        self.assertTrue(self.control.record_failure(self.url, ctx.exception))
+
+    def test_downloader_backs_off_and_recovers(self):
+        temp_dir = tempfile.mkdtemp()
+        # Real yt-dlp instances, against the local site
+        downloader = make_downloader(temp_dir, ydl_pool=YoutubeDLPool(), rate_control=self.control)
+        try:
+            for _ in range(3):
+                with self.assertRaises(DownloadError):
+                    downloader.get_media_info(self.url, refresh=True)
+            self.assertEqual(self.control.current_rate(self.url), 12.5)
+
+            self.server.throttling = False
+            downloader.get_media_info(self.url, refresh=True)
+            self.assertEqual(self.control.current_rate(self.url), 22.5)
+            metrics = self.control.metrics()["127.0.0.1"]
+            self.assertEqual((metrics['throttled'], metrics['successes']), (3, 1))
+        finally:
+            downloader.close()
+            shutil.rmtree(temp_dir)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from src.utils.rate_limiter import HostRateLimiter, RateLimiter
+
+class TestRateLimiter(unittest.TestCase):
+    def test_burst_then_non_blocking_refusal(self):
+        limiter = RateLimiter(rate=1, period=60, burst=3)
+        self.assertTrue(all(limiter.try_acquire() for _ in range(3)))
+        self.assertFalse(limiter.try_acquire())
+
+    def test_waits_exactly_for_next_token(self):
+        limiter = RateLimiter(rate=20, period=1, burst=1, cooldown=5)
+        limiter.acquire()
+        start = time.monotonic()
+        self.assertTrue(limiter.acquire())
+        elapsed = time.monotonic() - start
+        # One token every 50 ms, not one attempt every cooldown
+        self.assertGreater(elapsed, 0.03)
+        self.assertLess(elapsed, 0.5)
+
+    def test_timeout(self):
+        limiter = RateLimiter(rate=1, period=60, burst=1)
+        limiter.acquire()
+        start = time.monotonic()
+        self.assertFalse(limiter.acquire(timeout=0.1))
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_weighted_cost(self):
+        limiter = RateLimiter(rate=1, period=60, burst=2)
+        self.assertTrue(limiter.try_acquire(cost=0.5))
+        self.assertTrue(limiter.try_acquire(cost=1.5))
+        self.assertFalse(limiter.try_acquire(cost=0.5))
+        with self.assertRaises(ValueError):
+            limiter.acquire(cost=3)
+
+    def test_fifo_order(self):
+        limiter = RateLimiter(rate=50, period=1, burst=1)
+        limiter.acquire()
+        order = []
+
+        def worker(i):
+            limiter.acquire()
+            order.append(i)
+
+        threads = []
+        for i in range(5):
+            thread = threading.Thread(target=worker, args=(i,))
+            thread.start()
+            threads.append(thread)
+            # Let each thread queue up before the next one
+            time.sleep(0.005)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, list(range(5)))
+
+    def test_throughput_under_contention(self):
+        limiter = RateLimiter(rate=200, period=1, burst=1)
+        count = 0
+        lock = threading.Lock()
+        stop = time.monotonic() + 0.5
+
+        def worker():
+            nonlocal count
+            while limiter.acquire(timeout=stop - time.monotonic()):
+                with lock:
+                    count += 1
+
+        threads = [threading.Thread(target=worker) for _ in range(32)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # 1 burst token + 200/s for 0.5 s
+        self.assertGreater(count, 80)
+        self.assertLess(count, 110)
+
+    def test_set_rate_wakes_waiter(self):
+        limiter = RateLimiter(rate=1, period=60, burst=1)
+        limiter.acquire()
+        threading.Timer(0.05, limiter.set_rate, args=(100, 1)).start()
+        start = time.monotonic()
+        self.assertTrue(limiter.acquire(timeout=5))
+        self.assertLess(time.monotonic() - start, 1)
+
+class TestAsyncAcquire(unittest.IsolatedAsyncioTestCase):
+    async def test_acquire_async_waits_without_blocking_loop(self):
+        limiter = RateLimiter(rate=20, period=1, burst=1)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        task = asyncio.create_task(ticker())
+        start = time.monotonic()
+        results = await asyncio.gather(*(limiter.acquire_async() for _ in range(4)))
+        elapsed = time.monotonic() - start
+        task.cancel()
+
+        self.assertEqual(results, [True] * 4)
+        # Three waits of 50 ms each after the burst token
+        self.assertGreater(elapsed, 0.12)
+        self.assertGreater(ticks, 10)
+
+    async def test_acquire_async_timeout(self):
+        limiter = RateLimiter(rate=1, period=60, burst=1)
+        await limiter.acquire_async()
+        self.assertFalse(await limiter.acquire_async(timeout=0.05))
+
+    async def test_threads_and_coroutines_share_queue(self):
+        limiter = RateLimiter(rate=50, period=1, burst=1)
+        limiter.acquire()
+        thread = threading.Thread(target=limiter.acquire)
+        thread.start()
+        await asyncio.sleep(0.005)
+        self.assertTrue(await limiter.acquire_async(timeout=1))
+        thread.join()
+
+class TestHostRateLimiter(unittest.TestCase):
+    def test_buckets_per_host(self):
+        limiter = HostRateLimiter(rate=1, period=60, burst=1)
+        self.assertTrue(limiter.try_acquire("https://www.youtube.com/watch?v=a"))
+        self.assertFalse(limiter.try_acquire("https://m.youtube.com/watch?v=b"))
+        self.assertTrue(limiter.try_acquire("https://vimeo.com/1"))
+        self.assertIs(limiter.for_url("youtube.com/x"), limiter.for_url("https://youtube.com/y"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+import errno
+import os
+import random
+import shutil
+import socket
+import struct
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from yt_dlp import YoutubeDL
+from yt_dlp.utils import DownloadError, ExtractorError, UnsupportedError
+
+from src.core.downloader import DownloadOptions
+from src.core.engines import EngineError
+from src.utils.retry import LOCAL, PERMANENT, THROTTLED, TRANSIENT, RetryPolicy, classify_error
+from tests.helpers import make_downloader
+
+class HTTPError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP Error {status}")
+        self.status = status
+
+class TestClassifyError(unittest.TestCase):
+    def test_categories(self):
+        self.assertEqual(classify_error("ERROR: [youtube] abc: Video unavailable"), PERMANENT)
+        self.assertEqual(classify_error("ERROR: Unable to download webpage: HTTP Error 429"), THROTTLED)
+        self.assertEqual(classify_error("ERROR: Unable to download webpage: HTTP Error 503"), TRANSIENT)
+        self.assertEqual(classify_error(ConnectionResetError(errno.ECONNRESET, "Connection reset by peer")),
+                         TRANSIENT)
+        self.assertEqual(classify_error("ERROR: unable to write data: [Errno 28] No space left on device"),
+                         LOCAL)
+
+    def test_wrapped_errors(self):
+        for cause, category in ((OSError(errno.ENOSPC, "disk"), LOCAL), (HTTPError(404), PERMANENT),
+                                (HTTPError(403), TRANSIENT), (HTTPError(500), TRANSIENT)):
+            try:
+                try:
+                    raise cause
+                except Exception as e:
+                    raise EngineError("download failed") from e
+            except EngineError as e:
+                self.assertEqual(classify_error(e), category, cause)
+
+    def test_extractor_errors(self):
+        self.assertEqual(classify_error(ExtractorError("This content is not here", expected=True)), PERMANENT)
+        self.assertEqual(classify_error(ExtractorError("Unable to extract player response")), TRANSIENT)
+        self.assertEqual(classify_error(UnsupportedError("https://example.com/page")), PERMANENT)
+        # As YoutubeDL.download() raises them
+        wrapped = ExtractorError("Sorry, this content is gone", expected=True)
+        self.assertEqual(classify_error(DownloadError("ERROR: gone", (type(wrapped), wrapped, None))), PERMANENT)
+        self.assertEqual(classify_error("ERROR: [youtube:truncated_id] abc: Incomplete YouTube ID abc."),
+                         PERMANENT)
+        self.assertEqual(classify_error("ERROR: [youtube:truncated_url] The URL you entered looks truncated"),
+                         PERMANENT)
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_exponential_backoff_with_full_jitter(self):
+        policy = RetryPolicy(max_retries=10, base_delay=1, max_delay=8, rng=random.Random(1))
+        for attempt, cap in enumerate([1, 2, 4, 8, 8, 8]):
+            delays = [policy.backoff(attempt) for _ in range(200)]
+            self.assertTrue(all(0 <= delay <= cap for delay in delays))
+            self.assertGreater(max(delays), cap * 0.9)
+
+    def test_only_retryable_categories(self):
+        policy = RetryPolicy(max_retries=2)
+        self.assertTrue(policy.should_retry(TRANSIENT, 1))
+        self.assertFalse(policy.should_retry(TRANSIENT, 2))
+        self.assertTrue(policy.should_retry(THROTTLED, 0))
+        self.assertFalse(policy.should_retry(PERMANENT, 0))
+        self.assertFalse(policy.should_retry(LOCAL, 0))
+
+class FaultyHandler(BaseHTTPRequestHandler):
+    """Serves BODY with Range support, injecting the server's queued faults."""
+
+    protocol_version = "HTTP/1.1"
+    BODY = bytes(range(256)) * 256
+
+    def do_GET(self):
+        if self.path != "/video.mp4":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        fault = self.server.faults.pop(0) if self.server.faults else None
+        requested = self.headers.get("Range")
+        self.server.requests.append((requested, fault))
+        if fault == '503':
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if fault == 'reset':
+            # Close with RST, without any response
+            self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+            self.close_connection = True
+            return
+        start = int(requested.split("=")[1].split("-")[0]) if requested else 0
+        body = self.BODY[start:]
+        self.send_response(206 if requested else 200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Accept-Ranges", "bytes")
+        if requested:
+            self.send_header("Content-Range", f"bytes {start}-{len(self.BODY) - 1}/{len(self.BODY)}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            if fault == 'truncate':
+                self.wfile.write(body[:len(body) // 4])
+                self.close_connection = True
+            else:
+                self.wfile.write(body)
+        except OSError:
+            pass
+
+    def log_message(self, *args):
+        pass
+
+class TestDownloaderAgainstFaults(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FaultyHandler)
+        self.server.faults = []
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.temp_dir = tempfile.mkdtemp()
+        # A plain file has no height to select on; yt-dlp's own retries
+        # are off so that every fault reaches the policy
+        self.downloader = make_downloader(
+            self.temp_dir,
+            lambda options: YoutubeDL(dict(options, format='best', retries=0, noprogress=True)),
+            retry_policy=RetryPolicy(max_retries=4, base_delay=0.01)
+        )
+
+    def tearDown(self):
+        self.downloader.close()
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.temp_dir)
+
+    def run_download(self, path):
+        options = DownloadOptions(format="MP4", quality="720p", output_dir=self.temp_dir)
+        download_id = self.downloader.download(f"http://127.0.0.1:{self.server.server_port}{path}", options)
+        deadline = time.monotonic() + 30
+        while self.downloader.get_download_status(download_id)['status'] == 'downloading':
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.02)
+        return self.downloader.get_download_status(download_id)
+
+    def test_transient_faults_are_retried_and_resumed(self):
+        # Extraction: 503, then a reset; download: cut after a quarter
+        self.server.faults = ['503', 'reset', None, 'truncate']
+        status = self.run_download("/video.mp4")
+
+        self.assertEqual((status['status'], status['retries']), ('completed', 3))
+        with open(os.path.join(self.temp_dir, "video [video].mp4"), 'rb') as f:
+            self.assertEqual(f.read(), FaultyHandler.BODY)
+        # The last attempt continued from the partial file
+        self.assertEqual(self.server.requests[-1], (f"bytes={len(FaultyHandler.BODY) // 4}-", None))
+
+    def test_permanent_errors_are_not_retried(self):
+        status = self.run_download("/missing.mp4")
+        self.assertEqual((status['status'], status['retries']), ('failed', 0))
+        self.assertIn("404", status['error'])
+
+if __name__ == '__main__':
+    unittest.main()
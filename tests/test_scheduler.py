@@ -0,0 +1,89 @@
+import queue
+import threading
+import time
+import unittest
+
+from src.utils.scheduler import DownloadScheduler, TaskCancelled
+
+class TestDownloadScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = DownloadScheduler(max_workers=2)
+
+    def tearDown(self):
+        self.scheduler.shutdown(cancel_pending=True)
+
+    def test_respects_max_workers(self):
+        lock = threading.Lock()
+        running = [0]
+        peak = [0]
+
+        def job():
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+
+        ids = [self.scheduler.submit(job) for _ in range(20)]
+        for task_id in ids:
+            self.scheduler.wait(task_id, timeout=5)
+
+        self.assertEqual(peak[0], 2)
+        self.assertLessEqual(self.scheduler.stats()['workers'], 2)
+
+    def test_priority_and_owner_fairness(self):
+        scheduler = DownloadScheduler(max_workers=1)
+        gate = threading.Event()
+        order = []
+        blocker = scheduler.submit(gate.wait)
+
+        for i in range(3):
+            scheduler.submit(order.append, f"a{i}", owner="a")
+        for i in range(2):
+            scheduler.submit(order.append, f"b{i}", owner="b")
+        last = scheduler.submit(order.append, "urgent", priority=-1, owner="c")
+
+        gate.set()
+        scheduler.wait(blocker, timeout=5)
+        scheduler.shutdown()
+
+        self.assertEqual(order, ["urgent", "a0", "b0", "a1", "b1", "a2"])
+        self.assertEqual(scheduler.get_status(last)['status'], "completed")
+
+    def test_backpressure(self):
+        scheduler = DownloadScheduler(max_workers=1, max_queue_size=1)
+        gate = threading.Event()
+        scheduler.submit(gate.wait)
+        # Wait for the worker to take the blocking task off the queue
+        while scheduler.stats()['running'] == 0:
+            time.sleep(0.001)
+        scheduler.submit(lambda: None)
+
+        with self.assertRaises(queue.Full):
+            scheduler.submit(lambda: None, block=False)
+        with self.assertRaises(queue.Full):
+            scheduler.submit(lambda: None, timeout=0.05)
+
+        gate.set()
+        scheduler.shutdown()
+
+    def test_cancel_and_errors(self):
+        scheduler = DownloadScheduler(max_workers=1)
+        gate = threading.Event()
+        scheduler.submit(gate.wait)
+        pending = scheduler.submit(lambda: None)
+        failing = scheduler.submit(lambda: 1 / 0)
+
+        self.assertTrue(scheduler.cancel(pending))
+        gate.set()
+
+        with self.assertRaises(TaskCancelled):
+            scheduler.wait(pending, timeout=5)
+        with self.assertRaises(ZeroDivisionError):
+            scheduler.wait(failing, timeout=5)
+        self.assertEqual(scheduler.get_status(failing)['status'], "failed")
+        scheduler.shutdown()
+
+if __name__ == '__main__':
+    unittest.main()
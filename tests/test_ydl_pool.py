@@ -0,0 +1,59 @@
+import unittest
+from unittest.mock import MagicMock
+
+from src.core.ydl_pool import YoutubeDLPool, pool_key
+
+class TestYoutubeDLPool(unittest.TestCase):
+    def setUp(self):
+        self.created = []
+
+        def factory(options):
+            ydl = MagicMock()
+            ydl.options = options
+            self.created.append(ydl)
+            return ydl
+
+        self.pool = YoutubeDLPool(factory=factory, max_idle=2, max_jobs=3)
+
+    def test_key_ignores_hooks(self):
+        base = {'format': 'bestaudio', 'outtmpl': '%(title)s.%(ext)s'}
+        self.assertEqual(pool_key(base), pool_key(dict(base, progress_hooks=[print])))
+        self.assertNotEqual(pool_key(base), pool_key(dict(base, format='best')))
+
+    def test_reuse_and_hook_swap(self):
+        options = {'format': 'bestaudio'}
+        first, second = [], []
+
+        with self.pool.lease(options, progress_hooks=[first.append]) as ydl:
+            ydl.options['progress_hooks'][0]({'status': 'downloading'})
+        with self.pool.lease(options, progress_hooks=[second.append]) as ydl:
+            ydl.options['progress_hooks'][0]({'status': 'finished'})
+
+        self.assertEqual(len(self.created), 1)
+        self.assertEqual(first, [{'status': 'downloading'}])
+        self.assertEqual(second, [{'status': 'finished'}])
+        self.assertEqual(self.pool.stats()['reused'], 1)
+
+    def test_recycle_after_max_jobs(self):
+        for _ in range(4):
+            with self.pool.lease({'format': 'best'}):
+                pass
+        self.assertEqual(len(self.created), 2)
+        self.assertTrue(self.created[0].close.called)
+
+    def test_recycle_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with self.pool.lease({'format': 'best'}):
+                raise RuntimeError("network down")
+        with self.pool.lease({'format': 'best'}):
+            pass
+        self.assertEqual(len(self.created), 2)
+        self.assertEqual(self.pool.stats()['recycled'], 1)
+
+    def test_concurrent_leases_get_distinct_instances(self):
+        with self.pool.lease({'format': 'best'}) as a:
+            with self.pool.lease({'format': 'best'}) as b:
+                self.assertIsNot(a, b)
+
+if __name__ == '__main__':
+    unittest.main()